@@ -5,30 +5,70 @@ FastAPI server that exposes endpoints for books, members, and loans.
 """
 
 import os
-from fastapi import FastAPI, HTTPException, Depends
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from anyio import from_thread
+from fastapi import FastAPI, HTTPException, Depends, Request, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from typing import Optional, List
 from datetime import date
-from library_system.database.connection import DatabaseConnection
-from library_system.services.book_service import BookService
-from library_system.services.member_service import MemberService
-from library_system.services.loan_service import LoanService
-from library_system.services.auth_service import AuthService
-from library_system.services.reservation_service import ReservationService
+from library_system.database.connection import configured_backend, BACKEND_LOCAL
+from library_system.database.instrumentation import track_queries
+from library_system.services.container import ServiceContainer
+from library_system.services.session_service import Principal
+from library_system.services.table_versions import TableVersions
+from library_system.services.async_services import (
+    AsyncBookService, AsyncMemberService, AsyncLoanService,
+    AsyncAuthService, AsyncReservationService, AsyncSessionService, AsyncImportService,
+    AsyncAvailabilityService, AsyncMemberSummaryService, AsyncFineService, AsyncCirculationStats
+)
 from library_system.models.loan import Loan
 from library_system.models.book import Book
 from library_system.models.member import Member
 from library_system.models.reservation import Reservation
-from library_system.utils.enums import MemberStatus
+from library_system.models.user import User
+from library_system.utils.enums import MemberStatus, RoleName, LoanStatus
+from library_system.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from library_system.utils.json_response import FastJSONResponse
+from library_system.services.import_service import IMPORT_FORMATS
 
 # Load environment variables
 load_dotenv()
 
+# One JSON line per request with its database round-trips
+request_logger = logging.getLogger('library_system.requests')
+import_logger = logging.getLogger('library_system.import')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create one connection pool and one set of services per worker process."""
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    
+    if configured_backend() != BACKEND_LOCAL and (not url or not key):
+        raise Exception("SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
+    if not os.getenv('SESSION_SECRET') and int(os.getenv('WEB_CONCURRENCY', '1')) > 1:
+        # Each worker would sign tokens with its own random key and reject the others'
+        raise Exception("SESSION_SECRET must be set when running more than one worker (WEB_CONCURRENCY).")
+    
+    app.state.container = ServiceContainer.from_env()
+    app.state.container.warm_up()
+    app.state.container.start_background_tasks()
+    try:
+        yield
+    finally:
+        await app.state.container.stop_background_tasks()
+        app.state.container.close()
+
+
 # Initialize FastAPI app
-app = FastAPI(title="Library Management System API", version="1.0.0")
+app = FastAPI(title="Library Management System API", version="1.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -37,18 +77,114 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries", "ETag"],
 )
 
-# Initialize database connection
-def get_db():
-    """Initialize and return database connection."""
-    url = os.getenv('SUPABASE_URL')
-    key = os.getenv('SUPABASE_KEY')
+
+@app.middleware("http")
+async def record_database_queries(request: Request, call_next):
+    """Report the database round-trips made by each request in headers and logs."""
+    start = time.perf_counter()
+    with track_queries() as stats:
+        response = await call_next(request)
+    total_ms = (time.perf_counter() - start) * 1000
     
-    if not url or not key:
-        raise Exception("SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
+    response.headers['Server-Timing'] = stats.server_timing(total_ms)
+    response.headers['X-DB-Queries'] = str(stats.count)
+    request_logger.info(json.dumps({
+        'method': request.method,
+        'path': request.url.path,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 2),
+        **stats.to_dict()
+    }))
+    return response
+
+
+# Dependencies handing out the shared services (async facades over a bounded threadpool)
+def get_container(request: Request) -> ServiceContainer:
+    """Return the service container created at startup."""
+    return request.app.state.container
+
+
+def get_book_service(container: ServiceContainer = Depends(get_container)) -> AsyncBookService:
+    """Return the shared book service."""
+    return container.async_book_service
+
+
+def get_member_service(container: ServiceContainer = Depends(get_container)) -> AsyncMemberService:
+    """Return the shared member service."""
+    return container.async_member_service
+
+
+def get_loan_service(container: ServiceContainer = Depends(get_container)) -> AsyncLoanService:
+    """Return the shared loan service."""
+    return container.async_loan_service
+
+
+def get_auth_service(container: ServiceContainer = Depends(get_container)) -> AsyncAuthService:
+    """Return the shared auth service."""
+    return container.async_auth_service
+
+
+def get_reservation_service(container: ServiceContainer = Depends(get_container)) -> AsyncReservationService:
+    """Return the shared reservation service."""
+    return container.async_reservation_service
+
+
+def get_session_service(container: ServiceContainer = Depends(get_container)) -> AsyncSessionService:
+    """Return the shared session service."""
+    return container.async_session_service
+
+
+def get_import_service(container: ServiceContainer = Depends(get_container)) -> AsyncImportService:
+    """Return the shared import service."""
+    return container.async_import_service
+
+
+def get_availability_service(container: ServiceContainer = Depends(get_container)) -> AsyncAvailabilityService:
+    """Return the shared availability service."""
+    return container.async_availability_service
+
+
+def get_member_summary_service(container: ServiceContainer = Depends(get_container)) -> AsyncMemberSummaryService:
+    """Return the shared member summary service."""
+    return container.async_member_summary_service
+
+
+def get_fine_service(container: ServiceContainer = Depends(get_container)) -> AsyncFineService:
+    """Return the shared fine service."""
+    return container.async_fine_service
+
+
+def get_circulation_stats(container: ServiceContainer = Depends(get_container)) -> AsyncCirculationStats:
+    """Return the shared circulation statistics."""
+    return container.async_circulation_stats
+
+
+def get_table_versions(container: ServiceContainer = Depends(get_container)) -> TableVersions:
+    """Return the shared table version counters."""
+    return container.table_versions
+
+
+def revalidation_headers(etag: str) -> dict:
+    """Headers asking clients to revalidate a listing with If-None-Match before reusing it."""
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+# Pagination parameters shared by the list endpoints
+class PageParams:
+    """Keyset pagination query parameters."""
     
-    return DatabaseConnection(url, key)
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum rows per page"),
+        after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        sort: Optional[str] = Query(None, description="Sort column, prefix '-' for descending")
+    ):
+        self.limit = limit
+        self.after = after
+        self.sort = sort
 
 
 # Pydantic models for request bodies
@@ -57,6 +193,10 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class RoleUpdateRequest(BaseModel):
+    role: RoleName
+
+
 class BookCreateRequest(BaseModel):
     isbn: str
     title: str
@@ -97,78 +237,111 @@ class ReturnBookRequest(BaseModel):
     loan_id: int
 
 
+class ReturnByBarcodeRequest(BaseModel):
+    barcode: str
+
+
+class IssueBatchRequest(BaseModel):
+    member_id: int
+    book_ids: List[int]
+    days: Optional[int] = 14
+
+
+class ReturnBatchRequest(BaseModel):
+    loan_ids: List[int]
+
+
 class ReservationCreateRequest(BaseModel):
     member_id: int
     book_id: int
     days_valid: Optional[int] = 14
 
 
+def bearer_token(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Extract the session token from an 'Authorization: Bearer' header."""
+    if authorization and authorization.lower().startswith('bearer '):
+        return authorization[7:].strip()
+    return None
+
+
 # Helper function to get authenticated user
-async def get_authenticated_user(email: str, password: str):
-    """Authenticate user and return user object."""
-    db = get_db()
-    auth_service = AuthService(db)
-    user = auth_service.authenticate(email, password)
-    if not user:
+async def get_authenticated_user(
+    token: Optional[str] = Depends(bearer_token),
+    email: Optional[str] = None,
+    password: Optional[str] = None,
+    session_service: AsyncSessionService = Depends(get_session_service)
+) -> Principal:
+    """
+    Resolve the caller from a session token.
+    
+    email/password query parameters are still accepted for clients that
+    have not switched to tokens, at the cost of a credential check per call.
+    """
+    if token:
+        principal = await session_service.resolve(token)
+        if not principal:
+            raise HTTPException(status_code=401, detail="Invalid or expired session")
+        return principal
+    
+    if email and password:
+        principal = await session_service.authenticate(email, password)
+        if principal:
+            return principal
         raise HTTPException(status_code=401, detail="Invalid email or password")
-    return user
+    
+    raise HTTPException(status_code=401, detail="Authentication required")
 
 
 # Helper function to check if user can manage books
-async def check_book_management_permission(email: str, password: str):
+async def check_book_management_permission(principal: Principal = Depends(get_authenticated_user),
+                                      auth_service: AsyncAuthService = Depends(get_auth_service)) -> Principal:
     """Check if user can manage books."""
-    user = await get_authenticated_user(email, password)
-    auth_service = AuthService(get_db())
-    if not auth_service.can_manage_books(user):
+    if not auth_service.can_manage_books(principal.user):
         raise HTTPException(status_code=403, detail="Librarian or administrator access required")
-    return user
+    return principal
 
 
 # Helper function to check if user can manage members
-async def check_member_management_permission(email: str, password: str):
+async def check_member_management_permission(principal: Principal = Depends(get_authenticated_user),
+                                        auth_service: AsyncAuthService = Depends(get_auth_service)) -> Principal:
     """Check if user can manage members."""
-    user = await get_authenticated_user(email, password)
-    auth_service = AuthService(get_db())
-    if not auth_service.can_manage_members(user):
+    if not auth_service.can_manage_members(principal.user):
         raise HTTPException(status_code=403, detail="Librarian or administrator access required")
-    return user
+    return principal
 
 
-# Helper function to get librarian_id from user
-def get_librarian_id(db: DatabaseConnection, user_id: int) -> Optional[int]:
-    """Get librarian employee_id from user_id."""
-    client = db.get_client()
-    result = client.table('librarian').select('employee_id').eq('user_id', user_id).execute()
-    if result.data:
-        return result.data[0]['employee_id']
-    return None
+# Helper function to check if user is an administrator
+async def check_administrator_permission(principal: Principal = Depends(get_authenticated_user),
+                                   auth_service: AsyncAuthService = Depends(get_auth_service)) -> Principal:
+    """Check if user is an administrator."""
+    if not auth_service.has_role(principal.user, [RoleName.ADMINISTRATOR]):
+        raise HTTPException(status_code=403, detail="Administrator access required")
+    return principal
 
 
 # Books endpoints
 @app.get("/api/books")
-async def get_all_books():
-    """Get all books."""
+async def get_all_books(
+    page: PageParams = Depends(),
+    book_service: AsyncBookService = Depends(get_book_service),
+    versions: TableVersions = Depends(get_table_versions),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of books (304 if the If-None-Match ETag is still current)."""
+    # Taken before reading, so a write racing with this request yields a stale ETag, never a stale page
+    etag = versions.etag('book')
+    if versions.matches(etag, if_none_match):
+        return Response(status_code=304, headers=revalidation_headers(etag))
     try:
-        db = get_db()
-        book_service = BookService(db)
-        books = book_service.get_all_books()
+        books = await book_service.get_books_page(page.limit, page.after, page.sort, raw=True)
         
         # Enrich with author and category info
-        enriched_books = []
-        for book in books:
-            book_dict = book.to_dict()
-            # Get authors and categories using search_books
-            search_results = book_service.search_books(title=book.title)
-            if search_results:
-                enriched = search_results[0]
-                book_dict['authors'] = enriched.get('authors', [])
-                book_dict['categories'] = enriched.get('categories', [])
-            else:
-                book_dict['authors'] = []
-                book_dict['categories'] = []
-            enriched_books.append(book_dict)
+        enriched_books = await book_service.enrich_books(books.items)
         
-        return {"books": enriched_books}
+        return FastJSONResponse({"books": enriched_books, "next_cursor": books.next_cursor},
+                                headers=revalidation_headers(etag))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -178,41 +351,65 @@ async def search_books(
     isbn: Optional[str] = None,
     title: Optional[str] = None,
     author: Optional[str] = None,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    book_service: AsyncBookService = Depends(get_book_service)
 ):
     """Search books by various criteria."""
     try:
-        db = get_db()
-        book_service = BookService(db)
-        results = book_service.search_books(isbn=isbn, title=title, author=author, category=category)
+        results = await book_service.search_books(isbn=isbn, title=title, author=author, category=category)
         return {"books": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/books/availability")
+async def get_books_availability(
+    ids: str = Query(..., description="Comma-separated book IDs"),
+    availability_service: AsyncAvailabilityService = Depends(get_availability_service)
+):
+    """Get copy counts (total, available, loaned, reserved, maintenance) for several books."""
+    try:
+        book_ids = [int(part) for part in ids.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not book_ids or len(book_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_PAGE_SIZE} ids are required")
+    try:
+        counts = await availability_service.get_many(book_ids)
+        return {"availability": {str(book_id): counts[book_id].to_dict() for book_id in counts}}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/books/{book_id}")
-async def get_book(book_id: int):
+async def get_book(book_id: int, book_service: AsyncBookService = Depends(get_book_service)):
     """Get a specific book by ID."""
     try:
-        db = get_db()
-        book_service = BookService(db)
-        book = book_service.get_book(book_id)
+        enriched = await book_service.get_books_enriched([book_id])
         
-        if not book:
+        if not enriched:
             raise HTTPException(status_code=404, detail="Book not found")
         
-        book_dict = book.to_dict()
-        # Enrich with author and category info
-        search_results = book_service.search_books(title=book.title)
-        if search_results:
-            enriched = search_results[0]
-            book_dict['authors'] = enriched.get('authors', [])
-            book_dict['categories'] = enriched.get('categories', [])
-        else:
-            book_dict['authors'] = []
-            book_dict['categories'] = []
-        
-        return {"book": book_dict}
+        return {"book": enriched[0]}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Copies endpoints
+@app.get("/api/copies/by-barcode/{barcode}")
+async def get_copy_by_barcode(
+    barcode: str,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
+    """Resolve a scanned barcode to its copy and open loan (Librarian/Administrator only)."""
+    try:
+        location = await loan_service.locate_copy(barcode)
+        if location is None:
+            raise HTTPException(status_code=404, detail=f"No copy with barcode {barcode}")
+        return {"copy": location.to_dict()}
     except HTTPException:
         raise
     except Exception as e:
@@ -221,24 +418,31 @@ async def get_book(book_id: int):
 
 # Members endpoints
 @app.get("/api/members")
-async def get_all_members():
-    """Get all members."""
+async def get_all_members(
+    page: PageParams = Depends(),
+    member_service: AsyncMemberService = Depends(get_member_service),
+    versions: TableVersions = Depends(get_table_versions),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Get one page of members (304 if the If-None-Match ETag is still current)."""
+    etag = versions.etag('member')
+    if versions.matches(etag, if_none_match):
+        return Response(status_code=304, headers=revalidation_headers(etag))
     try:
-        db = get_db()
-        member_service = MemberService(db)
-        members = member_service.get_all_members()
-        return {"members": [member.to_dict() for member in members]}
+        members = await member_service.get_members_page(page.limit, page.after, page.sort, raw=True)
+        return FastJSONResponse({"members": members.items, "next_cursor": members.next_cursor},
+                                headers=revalidation_headers(etag))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/members/{member_id}")
-async def get_member(member_id: int):
+async def get_member(member_id: int, member_service: AsyncMemberService = Depends(get_member_service)):
     """Get a specific member by ID."""
     try:
-        db = get_db()
-        member_service = MemberService(db)
-        member = member_service.get_member(member_id)
+        member = await member_service.get_member(member_id)
         
         if not member:
             raise HTTPException(status_code=404, detail="Member not found")
@@ -250,53 +454,69 @@ async def get_member(member_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/members/{member_id}/summary")
+async def get_member_summary(
+    member_id: int,
+    summary_service: AsyncMemberSummaryService = Depends(get_member_summary_service)
+):
+    """Get a member's record, open loans with titles, holds with queue positions, and counts."""
+    try:
+        summary = await summary_service.get_summary(member_id)
+        
+        if summary is None:
+            raise HTTPException(status_code=404, detail="Member not found")
+        
+        return FastJSONResponse(summary)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Loans endpoints
 @app.get("/api/loans")
-async def get_all_loans():
-    """Get all loans."""
-    try:
-        db = get_db()
-        loan_service = LoanService(db)
-        # Get all loans by querying the database directly
-        client = db.get_client()
-        result = client.table('loan').select('*').execute()
-        loans = [Loan.from_dict(row) for row in result.data]
-        return {"loans": [loan.to_dict() for loan in loans]}
+async def get_all_loans(page: PageParams = Depends(), loan_service: AsyncLoanService = Depends(get_loan_service)):
+    """Get one page of loans."""
+    try:
+        loans = await loan_service.get_loans_page(limit=page.limit, after=page.after, sort=page.sort, raw=True)
+        return FastJSONResponse({"loans": loans.items, "next_cursor": loans.next_cursor})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/loans/overdue")
-async def get_overdue_loans():
-    """Get all overdue loans."""
+async def get_overdue_loans(page: PageParams = Depends(), loan_service: AsyncLoanService = Depends(get_loan_service)):
+    """Get one page of overdue loans."""
     try:
-        db = get_db()
-        loan_service = LoanService(db)
-        overdue = loan_service.get_overdue_loans()
-        return {"loans": [loan.to_dict() for loan in overdue]}
+        loans = await loan_service.get_loans_page(LoanStatus.OVERDUE, limit=page.limit, after=page.after,
+                                                  sort=page.sort, raw=True)
+        return FastJSONResponse({"loans": loans.items, "next_cursor": loans.next_cursor})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/loans/active")
-async def get_active_loans():
-    """Get all active loans."""
+async def get_active_loans(page: PageParams = Depends(), loan_service: AsyncLoanService = Depends(get_loan_service)):
+    """Get one page of active loans."""
     try:
-        db = get_db()
-        loan_service = LoanService(db)
-        active = loan_service.get_active_loans()
-        return {"loans": [loan.to_dict() for loan in active]}
+        loans = await loan_service.get_loans_page(LoanStatus.ACTIVE, limit=page.limit, after=page.after,
+                                                  sort=page.sort, raw=True)
+        return FastJSONResponse({"loans": loans.items, "next_cursor": loans.next_cursor})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/loans/member/{member_id}")
-async def get_member_loans(member_id: int):
+async def get_member_loans(member_id: int, loan_service: AsyncLoanService = Depends(get_loan_service)):
     """Get all loans for a specific member."""
     try:
-        db = get_db()
-        loan_service = LoanService(db)
-        loans = loan_service.get_member_loans(member_id)
+        loans = await loan_service.get_member_loans(member_id)
         return {"loans": [loan.to_dict() for loan in loans]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -304,20 +524,16 @@ async def get_member_loans(member_id: int):
 
 # Authentication endpoints
 @app.post("/api/auth/login")
-async def login(request: LoginRequest):
-    """Authenticate a user."""
+async def login(request: LoginRequest, session_service: AsyncSessionService = Depends(get_session_service)):
+    """Authenticate a user and open a session."""
     try:
-        db = get_db()
-        auth_service = AuthService(db)
-        user = auth_service.authenticate(request.email, request.password)
+        session = await session_service.login(request.email, request.password)
         
-        if not user:
+        if not session:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        # Get librarian_id if user is a librarian
-        librarian_id = None
-        if user.role.value in ['librarian', 'administrator']:
-            librarian_id = get_librarian_id(db, user.user_id)
+        token, principal = session
+        user = principal.user
         
         return {
             "user": {
@@ -326,7 +542,9 @@ async def login(request: LoginRequest):
                 "email": user.email,
                 "role": user.role.value
             },
-            "librarian_id": librarian_id
+            "librarian_id": principal.librarian_id,
+            "token": token,
+            "expires_at": principal.expires_at
         }
     except HTTPException:
         raise
@@ -334,15 +552,47 @@ async def login(request: LoginRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/auth/logout")
+async def logout(token: Optional[str] = Depends(bearer_token),
+                 session_service: AsyncSessionService = Depends(get_session_service)):
+    """End the current session."""
+    if not token or not await session_service.logout(token):
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    return {"message": "Logged out successfully"}
+
+
+@app.put("/api/users/{user_id}/role")
+async def set_user_role(
+    user_id: int,
+    request: RoleUpdateRequest,
+    principal: Principal = Depends(check_administrator_permission),
+    auth_service: AsyncAuthService = Depends(get_auth_service),
+    session_service: AsyncSessionService = Depends(get_session_service)
+):
+    """Change a user's role (Administrator only)."""
+    try:
+        user = await auth_service.set_role(user_id, request.role)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Cached sessions still carry the old role
+        session_service.evict_user(user_id)
+        return {"user": {"user_id": user.user_id, "name": user.name, "email": user.email, "role": user.role.value}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Books CRUD endpoints
 @app.post("/api/books")
-async def create_book(request: BookCreateRequest, email: str, password: str):
+async def create_book(
+    request: BookCreateRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    book_service: AsyncBookService = Depends(get_book_service)
+):
     """Create a new book (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        book_service = BookService(db)
-        
         book = Book(
             isbn=request.isbn,
             title=request.title,
@@ -351,18 +601,10 @@ async def create_book(request: BookCreateRequest, email: str, password: str):
             description=request.description
         )
         
-        created_book = book_service.create_book(book, request.author_ids or [], request.category_ids or [])
-        book_dict = created_book.to_dict()
+        created_book = await book_service.create_book(book, request.author_ids or [], request.category_ids or [])
         
         # Enrich with author and category info
-        search_results = book_service.search_books(title=created_book.title)
-        if search_results:
-            enriched = search_results[0]
-            book_dict['authors'] = enriched.get('authors', [])
-            book_dict['categories'] = enriched.get('categories', [])
-        else:
-            book_dict['authors'] = []
-            book_dict['categories'] = []
+        book_dict = (await book_service.enrich_books([created_book.to_dict()]))[0]
         
         return {"book": book_dict}
     except HTTPException:
@@ -372,15 +614,16 @@ async def create_book(request: BookCreateRequest, email: str, password: str):
 
 
 @app.put("/api/books/{book_id}")
-async def update_book(book_id: int, request: BookUpdateRequest, email: str, password: str):
+async def update_book(
+    book_id: int,
+    request: BookUpdateRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    book_service: AsyncBookService = Depends(get_book_service)
+):
     """Update a book (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        book_service = BookService(db)
-        
         # Get existing book
-        existing_book = book_service.get_book(book_id)
+        existing_book = await book_service.get_book(book_id)
         if not existing_book:
             raise HTTPException(status_code=404, detail="Book not found")
         
@@ -399,21 +642,13 @@ async def update_book(book_id: int, request: BookUpdateRequest, email: str, pass
         
         if update_dict:
             book = Book(**{**existing_book.to_dict(), **update_dict})
-            updated_book = book_service.update_book(book_id, book)
+            updated_book = await book_service.update_book(book_id, book)
             if updated_book:
-                book_dict = updated_book.to_dict()
                 # Enrich with author and category info
-                search_results = book_service.search_books(title=updated_book.title)
-                if search_results:
-                    enriched = search_results[0]
-                    book_dict['authors'] = enriched.get('authors', [])
-                    book_dict['categories'] = enriched.get('categories', [])
-                else:
-                    book_dict['authors'] = []
-                    book_dict['categories'] = []
+                book_dict = (await book_service.enrich_books([updated_book.to_dict()]))[0]
                 return {"book": book_dict}
         
-        return {"book": existing_book.to_dict()}
+        return {"book": (await book_service.enrich_books([existing_book.to_dict()]))[0]}
     except HTTPException:
         raise
     except Exception as e:
@@ -421,14 +656,14 @@ async def update_book(book_id: int, request: BookUpdateRequest, email: str, pass
 
 
 @app.delete("/api/books/{book_id}")
-async def delete_book(book_id: int, email: str, password: str):
+async def delete_book(
+    book_id: int,
+    principal: Principal = Depends(check_book_management_permission),
+    book_service: AsyncBookService = Depends(get_book_service)
+):
     """Delete a book (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        book_service = BookService(db)
-        
-        if book_service.delete_book(book_id):
+        if await book_service.delete_book(book_id):
             return {"message": f"Book {book_id} deleted successfully"}
         else:
             raise HTTPException(status_code=400, detail="Cannot delete book. Book has active loans.")
@@ -440,13 +675,13 @@ async def delete_book(book_id: int, email: str, password: str):
 
 # Members CRUD endpoints
 @app.post("/api/members")
-async def register_member(request: MemberRegisterRequest, email: str, password: str):
+async def register_member(
+    request: MemberRegisterRequest,
+    principal: Principal = Depends(check_member_management_permission),
+    member_service: AsyncMemberService = Depends(get_member_service)
+):
     """Register a new member (Librarian/Administrator only)."""
     try:
-        user = await check_member_management_permission(email, password)
-        db = get_db()
-        member_service = MemberService(db)
-        
         member = Member(
             name=request.name,
             email=request.email,
@@ -455,7 +690,7 @@ async def register_member(request: MemberRegisterRequest, email: str, password:
             join_date=date.today()
         )
         
-        created_member = member_service.register_member(member)
+        created_member = await member_service.register_member(member)
         return {"member": created_member.to_dict()}
     except HTTPException:
         raise
@@ -464,15 +699,16 @@ async def register_member(request: MemberRegisterRequest, email: str, password:
 
 
 @app.put("/api/members/{member_id}")
-async def update_member(member_id: int, request: MemberUpdateRequest, email: str, password: str):
+async def update_member(
+    member_id: int,
+    request: MemberUpdateRequest,
+    principal: Principal = Depends(check_member_management_permission),
+    member_service: AsyncMemberService = Depends(get_member_service)
+):
     """Update member information (Librarian/Administrator only)."""
     try:
-        user = await check_member_management_permission(email, password)
-        db = get_db()
-        member_service = MemberService(db)
-        
         # Get existing member
-        existing_member = member_service.get_member(member_id)
+        existing_member = await member_service.get_member(member_id)
         if not existing_member:
             raise HTTPException(status_code=404, detail="Member not found")
         
@@ -487,7 +723,7 @@ async def update_member(member_id: int, request: MemberUpdateRequest, email: str
         
         if update_dict:
             member = Member(**{**existing_member.to_dict(), **update_dict})
-            updated_member = member_service.update_member(member_id, member)
+            updated_member = await member_service.update_member(member_id, member)
             if updated_member:
                 return {"member": updated_member.to_dict()}
         
@@ -499,14 +735,14 @@ async def update_member(member_id: int, request: MemberUpdateRequest, email: str
 
 
 @app.post("/api/members/{member_id}/suspend")
-async def suspend_member(member_id: int, email: str, password: str):
+async def suspend_member(
+    member_id: int,
+    principal: Principal = Depends(check_member_management_permission),
+    member_service: AsyncMemberService = Depends(get_member_service)
+):
     """Suspend a member (Librarian/Administrator only)."""
     try:
-        user = await check_member_management_permission(email, password)
-        db = get_db()
-        member_service = MemberService(db)
-        
-        if member_service.suspend_member(member_id):
+        if await member_service.suspend_member(member_id):
             return {"message": f"Member {member_id} suspended successfully"}
         else:
             raise HTTPException(status_code=400, detail="Failed to suspend member")
@@ -517,14 +753,14 @@ async def suspend_member(member_id: int, email: str, password: str):
 
 
 @app.delete("/api/members/{member_id}")
-async def delete_member(member_id: int, email: str, password: str):
+async def delete_member(
+    member_id: int,
+    principal: Principal = Depends(check_member_management_permission),
+    member_service: AsyncMemberService = Depends(get_member_service)
+):
     """Delete a member (Librarian/Administrator only)."""
     try:
-        user = await check_member_management_permission(email, password)
-        db = get_db()
-        member_service = MemberService(db)
-        
-        if member_service.delete_member(member_id):
+        if await member_service.delete_member(member_id):
             return {"message": f"Member {member_id} deleted successfully"}
         else:
             raise HTTPException(status_code=400, detail="Cannot delete member. Member has active loans.")
@@ -536,19 +772,19 @@ async def delete_member(member_id: int, email: str, password: str):
 
 # Loan operations
 @app.post("/api/loans/issue")
-async def issue_book(request: IssueBookRequest, email: str, password: str):
+async def issue_book(
+    request: IssueBookRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
     """Issue a book to a member (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        loan_service = LoanService(db)
-        
-        # Get librarian_id from user
-        librarian_id = get_librarian_id(db, user.user_id)
+        # librarian_id was resolved when the session was opened
+        librarian_id = principal.librarian_id
         if not librarian_id:
             raise HTTPException(status_code=400, detail="User is not a librarian")
         
-        loan = loan_service.issue_book(
+        loan = await loan_service.issue_book(
             request.member_id,
             request.book_id,
             librarian_id,
@@ -566,14 +802,14 @@ async def issue_book(request: IssueBookRequest, email: str, password: str):
 
 
 @app.post("/api/loans/return")
-async def return_book(request: ReturnBookRequest, email: str, password: str):
+async def return_book(
+    request: ReturnBookRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
     """Return a book (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        loan_service = LoanService(db)
-        
-        if loan_service.return_book(request.loan_id):
+        if await loan_service.return_book(request.loan_id):
             return {"message": f"Book returned successfully: Loan ID={request.loan_id}"}
         else:
             raise HTTPException(status_code=400, detail=f"Failed to return book. Loan ID {request.loan_id} not found.")
@@ -583,15 +819,90 @@ async def return_book(request: ReturnBookRequest, email: str, password: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/loans/return-by-barcode")
+async def return_by_barcode(
+    request: ReturnByBarcodeRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
+    """Return the copy with a scanned barcode (Librarian/Administrator only)."""
+    try:
+        location = await loan_service.return_by_barcode(request.barcode)
+        if location is None:
+            raise HTTPException(status_code=404, detail=f"No copy with barcode {request.barcode}")
+        if location.loan_id is None:
+            raise HTTPException(status_code=400, detail=f"Copy {request.barcode} is not on loan")
+        return {
+            "loan_id": location.loan_id,
+            "copy_id": location.copy_id,
+            "book_id": location.book_id,
+            "message": f"Book returned successfully: Loan ID={location.loan_id}"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/loans/issue-batch")
+async def issue_books(
+    request: IssueBatchRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
+    """Issue a stack of books to one member, with a result per item (Librarian/Administrator only)."""
+    try:
+        librarian_id = principal.librarian_id
+        if not librarian_id:
+            raise HTTPException(status_code=400, detail="User is not a librarian")
+        
+        results = await loan_service.issue_books(
+            request.member_id,
+            request.book_ids,
+            librarian_id,
+            request.days or 14
+        )
+        issued = sum(1 for result in results if result.loan)
+        return {
+            "results": [result.to_dict() for result in results],
+            "message": f"Issued {issued} of {len(results)} item(s)"
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/loans/return-batch")
+async def return_books(
+    request: ReturnBatchRequest,
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
+    """Return a stack of loans, with a result per item (Librarian/Administrator only)."""
+    try:
+        results = await loan_service.return_books(request.loan_ids)
+        returned = sum(1 for result in results if result.returned)
+        return {
+            "results": [result.to_dict() for result in results],
+            "message": f"Returned {returned} of {len(results)} item(s)"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/loans/update-overdue")
-async def update_overdue_loans(email: str, password: str):
+async def update_overdue_loans(
+    principal: Principal = Depends(check_book_management_permission),
+    loan_service: AsyncLoanService = Depends(get_loan_service)
+):
     """Update overdue loans (Librarian/Administrator only)."""
     try:
-        user = await check_book_management_permission(email, password)
-        db = get_db()
-        loan_service = LoanService(db)
-        
-        count = loan_service.update_overdue_loans()
+        count = await loan_service.update_overdue_loans()
         return {"message": f"Updated {count} overdue loan(s)"}
     except HTTPException:
         raise
@@ -601,38 +912,58 @@ async def update_overdue_loans(email: str, password: str):
 
 # Reservation endpoints
 @app.get("/api/reservations")
-async def get_all_reservations():
-    """Get all reservations."""
-    try:
-        db = get_db()
-        reservation_service = ReservationService(db)
-        client = db.get_client()
-        result = client.table('reservation').select('*').execute()
-        reservations = [Reservation.from_dict(row) for row in result.data]
-        return {"reservations": [r.to_dict() for r in reservations]}
+async def get_all_reservations(
+    page: PageParams = Depends(),
+    reservation_service: AsyncReservationService = Depends(get_reservation_service)
+):
+    """Get one page of reservations."""
+    try:
+        reservations = await reservation_service.get_reservations_page(page.limit, page.after, page.sort, raw=True)
+        return FastJSONResponse({"reservations": reservations.items, "next_cursor": reservations.next_cursor})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/reservations/member/{member_id}")
-async def get_member_reservations(member_id: int):
+async def get_member_reservations(
+    member_id: int,
+    reservation_service: AsyncReservationService = Depends(get_reservation_service)
+):
     """Get all reservations for a member."""
     try:
-        db = get_db()
-        reservation_service = ReservationService(db)
-        reservations = reservation_service.get_member_reservations(member_id)
+        reservations = await reservation_service.get_member_reservations(member_id)
         return {"reservations": [r.to_dict() for r in reservations]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/reservations/{reservation_id}/position")
+async def get_reservation_position(
+    reservation_id: int,
+    reservation_service: AsyncReservationService = Depends(get_reservation_service)
+):
+    """Get a reservation's place in its book's hold queue (0 once a copy is held for it)."""
+    try:
+        position = await reservation_service.queue_position(reservation_id)
+        if position is None:
+            raise HTTPException(status_code=404, detail="Reservation not waiting in a hold queue")
+        return {"reservation_id": reservation_id, "position": position}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/api/reservations")
-async def create_reservation(request: ReservationCreateRequest):
+async def create_reservation(
+    request: ReservationCreateRequest,
+    reservation_service: AsyncReservationService = Depends(get_reservation_service)
+):
     """Create a new reservation."""
     try:
-        db = get_db()
-        reservation_service = ReservationService(db)
-        reservation = reservation_service.create_reservation(
+        reservation = await reservation_service.create_reservation(
             request.member_id,
             request.book_id,
             request.days_valid or 14
@@ -643,12 +974,13 @@ async def create_reservation(request: ReservationCreateRequest):
 
 
 @app.post("/api/reservations/{reservation_id}/cancel")
-async def cancel_reservation(reservation_id: int):
+async def cancel_reservation(
+    reservation_id: int,
+    reservation_service: AsyncReservationService = Depends(get_reservation_service)
+):
     """Cancel a reservation."""
     try:
-        db = get_db()
-        reservation_service = ReservationService(db)
-        if reservation_service.cancel_reservation(reservation_id):
+        if await reservation_service.cancel_reservation(reservation_id):
             return {"message": f"Reservation {reservation_id} cancelled successfully"}
         else:
             raise HTTPException(status_code=400, detail="Failed to cancel reservation")
@@ -658,6 +990,172 @@ async def cancel_reservation(reservation_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Administration endpoints
+@app.post("/api/admin/import-catalog")
+async def import_catalog(
+    request: Request,
+    format: str = Query('csv', description=f"Body format: {' or '.join(IMPORT_FORMATS)}"),
+    principal: Principal = Depends(check_administrator_permission),
+    import_service: AsyncImportService = Depends(get_import_service)
+):
+    """
+    Bulk import books from a CSV or JSONL request body (Administrator only).
+    
+    The body is read as it arrives and imported a batch at a time. Books whose
+    ISBN already exists are skipped, so a failed upload can be resent.
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format '{format}'")
+    body = request.stream()
+
+    async def next_chunk():
+        return await body.__anext__()
+
+    def chunks():
+        # Runs in the import's worker thread, pulling the upload as it arrives
+        while True:
+            try:
+                yield from_thread.run(next_chunk)
+            except StopAsyncIteration:
+                return
+
+    try:
+        totals = await import_service.import_chunks(
+            chunks(), format, progress=lambda progress: import_logger.info(json.dumps(progress.to_dict()))
+        )
+        return {"import": totals.to_dict()}
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import data: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Fines endpoints
+@app.get("/api/fines")
+async def get_fines(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum fined loans returned"),
+    principal: Principal = Depends(check_book_management_permission),
+    fine_service: AsyncFineService = Depends(get_fine_service)
+):
+    """Fines of overdue and late-returned loans, largest first, with totals (Librarian/Administrator only)."""
+    try:
+        fines = await fine_service.current()
+        return FastJSONResponse({**fines.summary(), "fines": fines.rows(limit=limit)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/fines/members")
+async def get_member_fine_totals(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum members returned"),
+    principal: Principal = Depends(check_book_management_permission),
+    fine_service: AsyncFineService = Depends(get_fine_service)
+):
+    """Total fine per member, largest first (Librarian/Administrator only)."""
+    try:
+        fines = await fine_service.current()
+        return FastJSONResponse({**fines.summary(), "members": fines.member_totals(limit=limit)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/fines/members/{member_id}")
+async def get_member_fines(
+    member_id: int,
+    principal: Principal = Depends(check_book_management_permission),
+    fine_service: AsyncFineService = Depends(get_fine_service)
+):
+    """Fined loans and total of one member (Librarian/Administrator only)."""
+    try:
+        return FastJSONResponse(await fine_service.member_fines(member_id))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Statistics endpoints
+@app.get("/api/stats/circulation")
+async def get_circulation_stats_by_day(
+    start: Optional[date] = Query(None, description="First day (defaults to 30 days before end)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    principal: Principal = Depends(check_book_management_permission),
+    stats: AsyncCirculationStats = Depends(get_circulation_stats)
+):
+    """Loans issued and returned per day (Librarian/Administrator only)."""
+    try:
+        return FastJSONResponse(await stats.circulation(start, end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/stats/categories")
+async def get_category_stats(
+    start: Optional[date] = Query(None, description="First day (defaults to 30 days before end)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    principal: Principal = Depends(check_book_management_permission),
+    stats: AsyncCirculationStats = Depends(get_circulation_stats)
+):
+    """Loans issued and returned per category, busiest first (Librarian/Administrator only)."""
+    try:
+        return FastJSONResponse(await stats.by_category(start, end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/stats/librarians")
+async def get_librarian_stats(
+    start: Optional[date] = Query(None, description="First day (defaults to 30 days before end)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    principal: Principal = Depends(check_book_management_permission),
+    stats: AsyncCirculationStats = Depends(get_circulation_stats)
+):
+    """Loans issued per librarian, busiest first (Librarian/Administrator only)."""
+    try:
+        return FastJSONResponse(await stats.by_librarian(start, end))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/admin/stats/rebuild")
+async def rebuild_circulation_stats(
+    principal: Principal = Depends(check_book_management_permission),
+    stats: AsyncCirculationStats = Depends(get_circulation_stats)
+):
+    """Recount the circulation statistics from the loan history (Librarian/Administrator only)."""
+    try:
+        loans = await stats.rebuild()
+        return {"message": "Statistics rebuilt", "loans": loans}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/admin/availability/rebuild")
+async def rebuild_availability(
+    principal: Principal = Depends(check_book_management_permission),
+    availability_service: AsyncAvailabilityService = Depends(get_availability_service)
+):
+    """Recount per-book availability from book_copy (Librarian/Administrator only)."""
+    try:
+        books = await availability_service.rebuild()
+        return {"message": "Availability rebuilt", "books": books}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/admin/metrics")
+async def get_metrics(
+    principal: Principal = Depends(check_book_management_permission),
+    container: ServiceContainer = Depends(get_container)
+):
+    """Metrics of background jobs and caches (Librarian/Administrator only)."""
+    return {"metrics": container.metrics()}
+
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
@@ -667,5 +1165,6 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(message)s')
+    uvicorn.run("api_server:app", host="0.0.0.0", port=8000, workers=int(os.getenv('WEB_CONCURRENCY', '1')))
 
@@ -0,0 +1,176 @@
+"""
+Concurrency benchmark for issuing loans under contention.
+
+Usage:
+    python -m benchmarks.contention
+    python -m benchmarks.contention --threads 32 --books 5 --copies 400 --issues 2000
+
+Many threads issue a handful of hot books at the same time against a local
+SQLite database. Each strategy is run on a fresh copy of the same data and
+reported with issues per second and the number of copies loaned more than
+once. 'unguarded' replays the old read-then-write flow for comparison.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from library_system.database.connection import DatabaseConnection
+from library_system.database.local_backend import LocalClient
+from library_system.services.loan_service import LoanService
+
+STRATEGIES = ('procedure', 'conditional_update', 'unguarded')
+
+
+def create_library(client: LocalClient, books: int, copies: int, members: int):
+    """Insert one librarian, members, and books with the given number of copies each."""
+    client.table('user').insert({'user_id': 1, 'name': 'Librarian', 'email': 'librarian@example.com',
+                                 'password_hash': 'x', 'role': 'librarian'}).execute()
+    client.table('librarian').insert({'employee_id': 1, 'user_id': 1}).execute()
+    client.table('member').insert([
+        {'member_id': n, 'name': f'Member {n}', 'email': f'member{n}@example.com'}
+        for n in range(1, members + 1)
+    ], returning='minimal').execute()
+    client.table('book').insert([
+        {'book_id': n, 'isbn': f'978-{n:09d}', 'title': f'Book {n}'}
+        for n in range(1, books + 1)
+    ], returning='minimal').execute()
+    client.table('book_copy').insert([
+        {'book_id': book_id, 'barcode': f'BC{book_id:05d}-{n}', 'status': 'available',
+         'acquired_on': date.today().isoformat()}
+        for book_id in range(1, books + 1) for n in range(1, copies + 1)
+    ], returning='minimal').execute()
+
+
+def unguarded_issue(loan_service: LoanService, member_id: int, book_id: int, librarian_id: int) -> Optional[Dict]:
+    """The former issue flow: read the available copies, insert the loan, then mark the copy loaned."""
+    client = loan_service.client
+    copies = client.table('book_copy').select('*').eq('book_id', book_id).eq('status', 'available').execute()
+    if not copies.data:
+        return None
+    copy_id = copies.data[0]['copy_id']
+    loan = client.table('loan').insert({
+        'member_id': member_id, 'copy_id': copy_id, 'librarian_id': librarian_id,
+        'issue_date': date.today().isoformat(),
+        'due_date': (date.today() + timedelta(days=14)).isoformat(), 'status': 'active'
+    }).execute()
+    client.table('book_copy').update({'status': 'loaned'}).eq('copy_id', copy_id).execute()
+    return loan.data[0]
+
+
+def run_strategy(strategy: str, threads: int, books: int, copies: int, issues: int, seed: int) -> Dict:
+    """
+    Issue loans from many threads at once and check every copy was loaned at most once.
+
+    Returns:
+        Throughput and allocation counts for the strategy
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        local = LocalClient(os.path.join(tmp, 'contention.db'))
+        members = max(threads, 10)
+        create_library(local, books, copies, members)
+        db = DatabaseConnection(local_client=local, instrument=False)
+        loan_service = LoanService(db, claim_procedure=(strategy == 'procedure'))
+        issue = (lambda *args: unguarded_issue(loan_service, *args)) if strategy == 'unguarded' \
+            else loan_service.issue_book
+
+        per_thread = [issues // threads + (1 if n < issues % threads else 0) for n in range(threads)]
+        counts = {'issued': 0, 'refused': 0, 'errors': 0}
+        counts_lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(n: int):
+            rng = random.Random(seed + n)
+            local_counts = {'issued': 0, 'refused': 0, 'errors': 0}
+            barrier.wait()
+            for _ in range(per_thread[n]):
+                try:
+                    loan = issue(rng.randint(1, members), rng.randint(1, books), 1)
+                    local_counts['issued' if loan is not None else 'refused'] += 1
+                except Exception:
+                    local_counts['errors'] += 1
+            with counts_lock:
+                for key, value in local_counts.items():
+                    counts[key] += value
+
+        workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        loans = local.table('loan').select('copy_id').execute().data
+        loans_per_copy: Dict[int, int] = {}
+        for row in loans:
+            loans_per_copy[row['copy_id']] = loans_per_copy.get(row['copy_id'], 0) + 1
+        loaned_copies = len(local.table('book_copy').select('copy_id').eq('status', 'loaned').execute().data)
+        db.close()
+
+    return {
+        **counts,
+        'attempts': issues,
+        'seconds': round(elapsed, 3),
+        'attempts_per_second': round(issues / elapsed, 1) if elapsed else 0.0,
+        'issues_per_second': round(counts['issued'] / elapsed, 1) if elapsed else 0.0,
+        'loans': len(loans),
+        'copies_loaned': loaned_copies,
+        'double_allocations': sum(n - 1 for n in loans_per_copy.values() if n > 1),
+    }
+
+
+def run_contention(threads: int = 16, books: int = 5, copies: int = 200, issues: int = 1000,
+                   seed: int = 42, strategies: List[str] = STRATEGIES) -> Dict:
+    """Run every strategy on the same dataset and workload."""
+    return {
+        'benchmark': 'issue_contention',
+        'threads': threads,
+        'books': books,
+        'copies_per_book': copies,
+        'attempts': issues,
+        'seed': seed,
+        'strategies': {
+            strategy: run_strategy(strategy, threads, books, copies, issues, seed)
+            for strategy in strategies
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent issue_book calls on a few hot books')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent issuing threads')
+    parser.add_argument('--books', type=int, default=5, help='Number of hot books')
+    parser.add_argument('--copies', type=int, default=200, help='Copies per book')
+    parser.add_argument('--issues', type=int, default=1000, help='Total issue attempts across all threads')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--strategy', choices=STRATEGIES, action='append',
+                        help='Strategy to run (repeatable, default: all)')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = run_contention(args.threads, args.books, args.copies, args.issues, args.seed,
+                             args.strategy or STRATEGIES)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+    if any(result['double_allocations'] for name, result in results['strategies'].items()
+           if name != 'unguarded'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark for the overdue fine engine.
+
+Usage:
+    python -m benchmarks.fines
+    python -m benchmarks.fines --loans 2000000 --iterations 3
+
+Builds a synthetic loan history as a LoanTable (most loans returned, some
+late, the rest active or overdue) and times compute_fines() with NumPy and
+with the pure-Python fallback, checking that both charge the same fines.
+No database is used, so the numbers isolate the computation a nightly run
+does after loading the history.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from library_system.models.loan_table import LoanTable, STATUS_CODES, NO_DATE
+from library_system.services import fine_engine
+from library_system.services.fine_engine import FinePolicy, compute_fines
+from library_system.utils.enums import LoanStatus
+
+
+def make_table(count: int, seed: int = 42) -> LoanTable:
+    """Loan history over the last three years, filled straight into the column arrays."""
+    rng = random.Random(seed)
+    today = date.today().toordinal()
+    table = LoanTable()
+    table.loan_id = array('q', range(1, count + 1))
+    table.member_id = array('q', (rng.randint(1, 50_000) for _ in range(count)))
+    table.copy_id = array('q', (rng.randint(1, 200_000) for _ in range(count)))
+    table.librarian_id = array('q', (rng.randint(1, 20) for _ in range(count)))
+    issue, due, returned, status = array('i'), array('i'), array('i'), array('b')
+    for _ in range(count):
+        issued = today - rng.randint(0, 3 * 365)
+        issue.append(issued)
+        due.append(issued + 14)
+        if issued + 14 < today - 30 or rng.random() < 0.5:
+            returned.append(min(issued + rng.randint(1, 30), today))
+            status.append(STATUS_CODES[LoanStatus.RETURNED])
+        else:
+            returned.append(NO_DATE)
+            status.append(STATUS_CODES[LoanStatus.OVERDUE if issued + 14 < today else LoanStatus.ACTIVE])
+    table.issue_date, table.due_date, table.return_date, table.status = issue, due, returned, status
+    return table
+
+
+def time_path(table: LoanTable, policy: FinePolicy, use_numpy: bool, iterations: int) -> Dict:
+    """Best and median time of one compute path."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fines = compute_fines(table, policy, use_numpy=use_numpy)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'best_ms': round(timings[0] * 1000, 1),
+        'median_ms': round(timings[len(timings) // 2] * 1000, 1),
+        'fined_loans': len(fines),
+        'total_cents': fines.total_cents,
+    }
+
+
+def run_fines(loans: int = 1_000_000, iterations: int = 3, seed: int = 42) -> Dict:
+    """Time both compute paths on the same history and check they agree."""
+    table = make_table(loans, seed)
+    policy = FinePolicy()
+    paths = {'python': False}
+    if fine_engine.numpy is not None:
+        paths['numpy'] = True
+        if compute_fines(table, policy, use_numpy=True) != compute_fines(table, policy, use_numpy=False):
+            raise AssertionError('NumPy and pure-Python fines differ')
+
+    results = {name: time_path(table, policy, use_numpy, iterations) for name, use_numpy in paths.items()}
+    baseline = results['python']['best_ms']
+    for result in results.values():
+        result['speedup'] = round(baseline / result['best_ms'], 1) if result['best_ms'] else None
+    return {
+        'benchmark': 'fines',
+        'loans': loans,
+        'iterations': iterations,
+        'seed': seed,
+        'policy': policy.to_dict(),
+        'paths': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark computing fines over a loan history')
+    parser.add_argument('--loans', type=int, default=1_000_000, help='Loans in the synthetic history')
+    parser.add_argument('--iterations', type=int, default=3, help='Timed runs per path')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    text = json.dumps(run_fines(args.loans, args.iterations, args.seed), indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
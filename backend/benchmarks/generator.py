@@ -0,0 +1,218 @@
+"""Seeded generator for synthetic library datasets."""
+
+import random
+from dataclasses import dataclass, asdict
+from datetime import date, timedelta
+from typing import Dict, Iterator, List
+
+# Named scales, keyed by the number of loans in the history
+SCALES = {
+    '1k': 1_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Rows per insert call while loading
+LOAD_BATCH_SIZE = 5000
+
+HISTORY_YEARS = 3
+LOAN_DAYS = 14
+
+WORDS = [
+    'shadow', 'river', 'garden', 'empire', 'silent', 'winter', 'golden', 'night',
+    'ocean', 'storm', 'forgotten', 'city', 'secret', 'journey', 'machine', 'house',
+    'light', 'iron', 'glass', 'crown', 'forest', 'letter', 'island', 'memory',
+    'stone', 'fire', 'paper', 'moon', 'north', 'kingdom', 'song', 'dream',
+]
+FIRST_NAMES = ['Ada', 'Ben', 'Chen', 'Dana', 'Eli', 'Fatima', 'Grace', 'Hugo', 'Iris', 'Jonas',
+               'Kemal', 'Lena', 'Mateo', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sami', 'Tara']
+LAST_NAMES = ['Adams', 'Brooks', 'Costa', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ito',
+              'Jensen', 'Khan', 'Lopez', 'Moreau', 'Novak', 'Okafor', 'Petrov', 'Rossi', 'Silva']
+CATEGORY_NAMES = ['Fiction', 'Mystery', 'Science', 'History', 'Biography', 'Poetry', 'Fantasy',
+                  'Romance', 'Philosophy', 'Travel', 'Children', 'Art', 'Business', 'Health',
+                  'Technology', 'Religion', 'Cooking', 'Sports', 'Music', 'Law']
+
+
+@dataclass
+class DatasetSize:
+    """Row counts for each table of a generated dataset."""
+    loans: int
+    books: int
+    copies: int
+    authors: int
+    categories: int
+    members: int
+    reservations: int
+    active_loans: int
+
+    @classmethod
+    def for_loans(cls, loans: int) -> 'DatasetSize':
+        """Derive table sizes from the length of the loan history."""
+        books = max(100, loans // 10)
+        copies = books * 2
+        return cls(
+            loans=loans,
+            books=books,
+            copies=copies,
+            authors=max(30, books // 3),
+            categories=len(CATEGORY_NAMES),
+            members=max(50, loans // 20),
+            reservations=max(10, loans // 100),
+            # Roughly one copy in ten is out on loan, capped by the history length
+            active_loans=min(copies // 10, loans // 2)
+        )
+
+    def to_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class LibraryGenerator:
+    """
+    Deterministic generator for books, authors, categories, copies, members,
+    a multi-year loan history and reservations.
+
+    The same seed and size always produce the same rows, so runs of different
+    code versions are compared on identical data.
+    """
+
+    def __init__(self, size: DatasetSize, seed: int = 42, today: date = None):
+        """
+        Initialize generator.
+
+        Args:
+            size: Row counts to generate
+            seed: Random seed
+            today: Reference date for the loan history (defaults to today)
+        """
+        self.size = size
+        self.seed = seed
+        self.today = today or date.today()
+
+    def load(self, client) -> Dict[str, int]:
+        """
+        Generate the dataset and insert it through a database client.
+
+        IDs are assigned explicitly so related rows can be generated without
+        reading anything back.
+
+        Returns:
+            Dictionary with the librarian's employee_id and user_id
+        """
+        rng = random.Random(self.seed)
+        size = self.size
+
+        client.table('user').insert({
+            'user_id': 1, 'name': 'Benchmark Librarian', 'email': 'librarian@bench.test',
+            'password_hash': 'x', 'role': 'librarian'
+        }).execute()
+        client.table('librarian').insert({'employee_id': 1, 'user_id': 1}).execute()
+
+        self._insert(client, 'category', (
+            {'category_id': i + 1, 'name': name} for i, name in enumerate(CATEGORY_NAMES[:size.categories])
+        ))
+        self._insert(client, 'author', (
+            {'author_id': i, 'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}'}
+            for i in range(1, size.authors + 1)
+        ))
+        self._insert(client, 'book', (
+            {
+                'book_id': i,
+                'isbn': f'978{i:010d}',
+                'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))).title() + f' {i}',
+                'publisher': f'{rng.choice(LAST_NAMES)} Press',
+                'published_year': rng.randint(1900, self.today.year)
+            }
+            for i in range(1, size.books + 1)
+        ))
+        self._insert(client, 'book_author', self._links(rng, 'author_id', size.authors, max_links=2))
+        self._insert(client, 'book_category', self._links(rng, 'category_id', size.categories, max_links=3))
+
+        active_copies = set(rng.sample(range(1, size.copies + 1), size.active_loans))
+        self._insert(client, 'book_copy', (
+            {
+                'copy_id': i,
+                'book_id': (i - 1) % size.books + 1,
+                'barcode': f'BC{i:09d}',
+                'status': 'loaned' if i in active_copies else 'available'
+            }
+            for i in range(1, size.copies + 1)
+        ))
+        self._insert(client, 'member', (
+            {
+                'member_id': i,
+                'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                'email': f'member{i}@bench.test',
+                'status': 'active' if rng.random() > 0.05 else 'suspended',
+                'join_date': (self.today - timedelta(days=rng.randint(0, 365 * HISTORY_YEARS))).isoformat()
+            }
+            for i in range(1, size.members + 1)
+        ))
+        self._insert(client, 'loan', self._loans(rng, sorted(active_copies)))
+        self._insert(client, 'reservation', self._reservations(rng))
+        return {'librarian_id': 1, 'user_id': 1}
+
+    def _links(self, rng: random.Random, column: str, count: int, max_links: int) -> Iterator[Dict]:
+        for book_id in range(1, self.size.books + 1):
+            for other_id in rng.sample(range(1, count + 1), rng.randint(1, max_links)):
+                yield {'book_id': book_id, column: other_id}
+
+    def _loans(self, rng: random.Random, active_copies: List[int]) -> Iterator[Dict]:
+        """
+        Yield the loan history: returned loans spread over HISTORY_YEARS, then
+        one open loan per loaned copy, about a fifth of which are past due.
+        """
+        size = self.size
+        history_days = 365 * HISTORY_YEARS
+        loan_id = 0
+        for _ in range(size.loans - len(active_copies)):
+            loan_id += 1
+            issue_date = self.today - timedelta(days=rng.randint(LOAN_DAYS + 1, history_days))
+            due_date = issue_date + timedelta(days=LOAN_DAYS)
+            returned_after = rng.randint(1, LOAN_DAYS + 10)
+            yield {
+                'loan_id': loan_id,
+                'member_id': rng.randint(1, size.members),
+                'copy_id': rng.randint(1, size.copies),
+                'librarian_id': 1,
+                'issue_date': issue_date.isoformat(),
+                'due_date': due_date.isoformat(),
+                'return_date': (issue_date + timedelta(days=returned_after)).isoformat(),
+                'status': 'returned'
+            }
+        for copy_id in active_copies:
+            loan_id += 1
+            issue_date = self.today - timedelta(days=rng.randint(0, LOAN_DAYS * 2))
+            yield {
+                'loan_id': loan_id,
+                'member_id': rng.randint(1, size.members),
+                'copy_id': copy_id,
+                'librarian_id': 1,
+                'issue_date': issue_date.isoformat(),
+                'due_date': (issue_date + timedelta(days=LOAN_DAYS)).isoformat(),
+                'return_date': None,
+                'status': 'active'
+            }
+
+    def _reservations(self, rng: random.Random) -> Iterator[Dict]:
+        """Yield reservations made over the last month; those under 14 days old are active."""
+        for reservation_id in range(1, self.size.reservations + 1):
+            created_at = self.today - timedelta(days=rng.randint(0, 30))
+            yield {
+                'reservation_id': reservation_id,
+                'member_id': rng.randint(1, self.size.members),
+                'book_id': rng.randint(1, self.size.books),
+                'created_at': created_at.isoformat(),
+                'expires_at': (created_at + timedelta(days=14)).isoformat(),
+                'active': created_at > self.today - timedelta(days=14)
+            }
+    
+    @staticmethod
+    def _insert(client, table: str, rows: Iterator[Dict]):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= LOAD_BATCH_SIZE:
+                client.table(table).insert(batch, returning='minimal').execute()
+                batch = []
+        if batch:
+            client.table(table).insert(batch, returning='minimal').execute()
@@ -0,0 +1,200 @@
+"""
+Benchmark runner for the key service paths.
+
+Usage:
+    python -m benchmarks.run --scale 1k
+    python -m benchmarks.run --scale 100k --iterations 100 --output results.json
+
+Each run generates a seeded dataset in a local SQLite database (no network)
+and reports latency percentiles, database round-trips per call and peak
+memory for every operation as JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.generator import SCALES, DatasetSize, LibraryGenerator, WORDS
+from library_system.database.connection import DatabaseConnection
+from library_system.database.instrumentation import track_queries
+from library_system.database.local_backend import LocalClient
+from library_system.services.book_service import BookService
+from library_system.services.circulation_stats import CirculationStats
+from library_system.services.loan_service import LoanService
+from library_system.utils.enums import LoanStatus
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(operation: Callable[[int], None], iterations: int,
+            setup: Optional[Callable[[int], None]] = None) -> Dict:
+    """
+    Time an operation and summarize its latency, round-trips and peak memory.
+
+    Args:
+        operation: Called with the iteration number
+        iterations: Number of timed calls
+        setup: Untimed preparation run before each call
+
+    Returns:
+        Dictionary of results (latencies in milliseconds, memory in KiB)
+    """
+    latencies = []
+    round_trips = []
+    for i in range(iterations):
+        if setup:
+            setup(i)
+        with track_queries() as stats:
+            start = time.perf_counter()
+            operation(i)
+            latencies.append((time.perf_counter() - start) * 1000)
+        round_trips.append(stats.count)
+
+    # Peak memory is measured on one extra call, since tracing slows every allocation
+    if setup:
+        setup(iterations)
+    tracemalloc.start()
+    operation(iterations)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'round_trips_per_call': round(statistics.fmean(round_trips), 2),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(loans: int, iterations: int = 50, seed: int = 42,
+                   db_path: Optional[str] = None) -> Dict:
+    """
+    Generate a dataset and benchmark the key service paths.
+
+    Args:
+        loans: Number of loans in the generated history
+        iterations: Timed calls per cheap operation (full scans use a tenth)
+        seed: Random seed for the dataset and the operation inputs
+        db_path: SQLite file to use (defaults to a temporary file)
+
+    Returns:
+        JSON-serializable results
+    """
+    size = DatasetSize.for_loans(loans)
+    with tempfile.TemporaryDirectory() as tmp:
+        local = LocalClient(db_path or os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        ids = LibraryGenerator(size, seed=seed).load(local)
+        generate_seconds = time.perf_counter() - start
+
+        db = DatabaseConnection(local_client=local, instrument=True)
+        book_service = BookService(db)
+        loan_service = LoanService(db, book_service=book_service)
+        rng = random.Random(seed)
+        scans = max(3, iterations // 10)
+
+        results = {}
+        terms = [rng.choice(WORDS) for _ in range(iterations + 1)]
+        results['search_books'] = measure(
+            lambda i: book_service.search_books(title=terms[i]), iterations)
+
+        results['get_all_books_enriched'] = measure(
+            lambda i: book_service.enrich_books(db.get_client().table('book').select('*').execute().data),
+            scans)
+
+        issued = []
+        books = [rng.randint(1, size.books) for _ in range(iterations + 1)]
+        members = [rng.randint(1, size.members) for _ in range(iterations + 1)]
+        results['issue_book'] = measure(
+            lambda i: issued.append(loan_service.issue_book(members[i], books[i], ids['librarian_id'])),
+            iterations)
+
+        returnable = [loan.loan_id for loan in issued if loan is not None]
+        results['return_book'] = measure(
+            lambda i: loan_service.return_book(returnable[i % len(returnable)]),
+            min(iterations, max(1, len(returnable) - 1)))
+
+        # Whole loan history: Loan objects versus the column-oriented LoanTable
+        results['get_all_loans'] = measure(lambda i: loan_service.get_all_loans(), scans)
+        results['get_loan_table'] = measure(lambda i: loan_service.get_loan_table(), scans)
+        history = loan_service.get_loan_table()
+        results['loan_table_filter_overdue'] = measure(
+            lambda i: history.where(status=LoanStatus.ACTIVE, due_before=date.today()), iterations)
+
+        # Circulation statistics: one streaming pass to build, then queries from the counters
+        stats = CirculationStats(db, categories=book_service.categories)
+        results['circulation_stats_rebuild'] = measure(lambda i: stats.rebuild(), scans)
+        results['circulation_stats_by_category'] = measure(lambda i: stats.by_category(), iterations)
+
+        def reset_overdue(_):
+            local.table('loan').update({'status': 'active'}, returning='minimal') \
+                .eq('status', 'overdue').is_('return_date', 'null').execute()
+        results['update_overdue_loans'] = measure(
+            lambda i: loan_service.update_overdue_loans(), scans, setup=reset_overdue)
+
+        # Books whose copies are on loan, so the active-loan check refuses the delete
+        loaned = local.table('book_copy').select('book_id').eq('status', 'loaned') \
+            .limit(iterations + 1).execute().data
+        blocked = [row['book_id'] for row in loaned] or [1]
+        results['delete_book_active_loan_check'] = measure(
+            lambda i: book_service.delete_book(blocked[i % len(blocked)]), iterations)
+
+        db.close()
+
+    return {
+        'benchmark': 'library_services',
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'backend': 'local',
+        'seed': seed,
+        'dataset': size.to_dict(),
+        'generate_seconds': round(generate_seconds, 2),
+        'operations': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark library service paths on a synthetic dataset')
+    parser.add_argument('--scale', choices=SCALES.keys(), default='1k', help='Loan history size')
+    parser.add_argument('--loans', type=int, help='Custom number of loans (overrides --scale)')
+    parser.add_argument('--iterations', type=int, default=50, help='Timed calls per operation')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--db-path', help='SQLite file to generate into (default: temporary file)')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.loans or SCALES[args.scale], args.iterations, args.seed, args.db_path)
+    results['scale'] = args.scale if not args.loans else str(args.loans)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
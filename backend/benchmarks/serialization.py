@@ -0,0 +1,133 @@
+"""
+Micro-benchmark for encoding list responses.
+
+Usage:
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 50000 --iterations 20
+
+Encodes the same synthetic loan rows the way list endpoints used to (rows
+to Loan objects, back to dictionaries, then FastAPI's jsonable_encoder and
+json.dumps) and the way they do now (rows straight to the JSON encoder),
+and reports the best time per 10k rows for each path. No database is used,
+so the numbers isolate serialization.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from library_system.models.loan import Loan
+from library_system.utils import json_response
+from library_system.utils.enums import LoanStatus
+
+ROWS_PER_REPORT = 10_000
+
+
+def make_rows(count: int, seed: int = 42) -> List[Dict]:
+    """Loan rows shaped as the database returns them (ISO date strings, status values)."""
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for loan_id in range(1, count + 1):
+        issue_date = today - timedelta(days=rng.randint(0, 365))
+        returned = rng.random() < 0.7
+        rows.append({
+            'loan_id': loan_id,
+            'member_id': rng.randint(1, 5000),
+            'copy_id': rng.randint(1, 50000),
+            'librarian_id': rng.randint(1, 20),
+            'issue_date': issue_date.isoformat(),
+            'due_date': (issue_date + timedelta(days=14)).isoformat(),
+            'return_date': (issue_date + timedelta(days=rng.randint(1, 30))).isoformat() if returned else None,
+            'status': (LoanStatus.RETURNED if returned else rng.choice([LoanStatus.ACTIVE, LoanStatus.OVERDUE])).value,
+        })
+    return rows
+
+
+def model_round_trip(rows: List[Dict]) -> bytes:
+    """The former list path: build models, convert back, then encode like JSONResponse."""
+    content = jsonable_encoder({'loans': [Loan.from_dict(row).to_dict() for row in rows], 'next_cursor': None})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def raw_rows(rows: List[Dict]) -> bytes:
+    """The current list path: encode the fetched rows directly."""
+    return json_response.dumps({'loans': rows, 'next_cursor': None})
+
+
+def raw_rows_stdlib(rows: List[Dict]) -> bytes:
+    """The current list path without orjson installed."""
+    orjson, json_response.orjson = json_response.orjson, None
+    try:
+        return json_response.dumps({'loans': rows, 'next_cursor': None})
+    finally:
+        json_response.orjson = orjson
+
+
+def time_path(encode: Callable[[List[Dict]], bytes], rows: List[Dict], iterations: int) -> Dict:
+    """Best and median time of an encoding path, scaled to ROWS_PER_REPORT rows."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = encode(rows)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    scale = ROWS_PER_REPORT / len(rows) * 1000
+    return {
+        'best_ms_per_10k': round(timings[0] * scale, 2),
+        'median_ms_per_10k': round(timings[len(timings) // 2] * scale, 2),
+        'bytes': len(body),
+    }
+
+
+def run_serialization(rows: int = 10_000, iterations: int = 10, seed: int = 42) -> Dict:
+    """Time every encoding path on the same rows and check they produce the same document."""
+    data = make_rows(rows, seed)
+    paths = {'model_round_trip': model_round_trip, 'raw_rows_stdlib': raw_rows_stdlib}
+    if json_response.orjson is not None:
+        paths['raw_rows_orjson'] = raw_rows
+    expected = json.loads(model_round_trip(data))
+    for name, encode in paths.items():
+        if json.loads(encode(data)) != expected:
+            raise AssertionError(f'{name} does not match the model round trip')
+
+    results = {name: time_path(encode, data, iterations) for name, encode in paths.items()}
+    baseline = results['model_round_trip']['best_ms_per_10k']
+    for result in results.values():
+        result['speedup'] = round(baseline / result['best_ms_per_10k'], 1) if result['best_ms_per_10k'] else None
+    return {
+        'benchmark': 'list_serialization',
+        'rows': rows,
+        'iterations': iterations,
+        'seed': seed,
+        'paths': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark encoding loan list responses')
+    parser.add_argument('--rows', type=int, default=10_000, help='Rows encoded per call')
+    parser.add_argument('--iterations', type=int, default=10, help='Timed calls per path')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    text = json.dumps(run_serialization(args.rows, args.iterations, args.seed), indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ import os
 import sys
 import hashlib
 from dotenv import load_dotenv
-from library_system.database.connection import DatabaseConnection
+from library_system.database.connection import DatabaseConnection, configured_backend, BACKEND_LOCAL
 
 load_dotenv()
 
@@ -21,11 +21,13 @@ def change_password(email: str, new_password: str):
     url = os.getenv('SUPABASE_URL')
     key = os.getenv('SUPABASE_KEY')
     
-    if not url or not key:
+    if configured_backend() == BACKEND_LOCAL:
+        db = DatabaseConnection(backend=BACKEND_LOCAL)
+    elif not url or not key:
         print("Error: SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
         sys.exit(1)
-    
-    db = DatabaseConnection(url, key)
+    else:
+        db = DatabaseConnection(url, key)
     client = db.get_client()
     
     # Check if user exists
@@ -1,33 +1,105 @@
-"""Database connection module for Supabase."""
+"""Database connection module for Supabase and the embedded local backend."""
 
 import os
-from supabase import create_client, Client
+import httpx
+from supabase import create_client, Client, ClientOptions
 from typing import Optional
+from library_system.database.local_backend import LocalClient, local_client_from_env
+from library_system.database.instrumentation import InstrumentedClient
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_SECONDS = 30.0
+DEFAULT_TIMEOUT_SECONDS = 120.0
+
+BACKEND_SUPABASE = 'supabase'
+BACKEND_LOCAL = 'local'
+
+
+def configured_backend() -> str:
+    """Return the backend selected by the DATABASE_BACKEND env var (default 'supabase')."""
+    return os.getenv('DATABASE_BACKEND', BACKEND_SUPABASE).lower()
 
 
 class DatabaseConnection:
-    """Manages database connection to Supabase."""
+    """Manages database connection to Supabase, or to the embedded local backend."""
     
-    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 pool_size: Optional[int] = None, keepalive: Optional[float] = None,
+                 backend: Optional[str] = None, local_client: Optional[LocalClient] = None,
+                 instrument: Optional[bool] = None):
         """
         Initialize database connection.
         
+        The Supabase client shares a single pooled HTTP session, so one
+        connection object should be reused for the lifetime of a process.
+        
         Args:
             url: Supabase project URL (defaults to SUPABASE_URL env var)
             key: Supabase anon key (defaults to SUPABASE_KEY env var)
+            pool_size: Maximum pooled HTTP connections (defaults to DB_POOL_SIZE env var or 10)
+            keepalive: Seconds an idle pooled connection is kept open
+                (defaults to DB_KEEPALIVE_SECONDS env var or 30)
+            backend: 'supabase' or 'local' (defaults to DATABASE_BACKEND env var or 'supabase')
+            local_client: Existing local client to use (implies the local backend)
+            instrument: Wrap the client to record per-request query counts and timings
+                (defaults to DB_INSTRUMENTATION env var, enabled unless '0'/'false')
         """
+        if instrument is None:
+            instrument = os.getenv('DB_INSTRUMENTATION', '1').lower() not in ('0', 'false', 'no')
+        
+        self.backend = BACKEND_LOCAL if local_client else (backend or configured_backend())
+        self.http_client = None
+        
+        if self.backend == BACKEND_LOCAL:
+            # SQLite database at LOCAL_DB_PATH (in-memory if unset)
+            self.url = self.key = None
+            self.raw_client = local_client or local_client_from_env()
+        elif self.backend == BACKEND_SUPABASE:
+            self.raw_client = self._create_supabase_client(url, key, pool_size, keepalive)
+        else:
+            raise ValueError(f"Unknown database backend: {self.backend}")
+        
+        self.client = InstrumentedClient(self.raw_client) if instrument else self.raw_client
+    
+    def _create_supabase_client(self, url: Optional[str], key: Optional[str],
+                                pool_size: Optional[int], keepalive: Optional[float]) -> Client:
+        """Create a Supabase client on a pooled HTTP session."""
         self.url = url or os.getenv('SUPABASE_URL')
         self.key = key or os.getenv('SUPABASE_KEY')
         
         if not self.url or not self.key:
             raise ValueError("Supabase URL and key must be provided either as parameters or environment variables")
         
-        self.client: Client = create_client(self.url, self.key)
+        self.pool_size = pool_size or int(os.getenv('DB_POOL_SIZE', DEFAULT_POOL_SIZE))
+        self.keepalive = keepalive if keepalive is not None else float(
+            os.getenv('DB_KEEPALIVE_SECONDS', DEFAULT_KEEPALIVE_SECONDS))
+        
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.pool_size,
+                max_keepalive_connections=self.pool_size,
+                keepalive_expiry=self.keepalive
+            ),
+            timeout=DEFAULT_TIMEOUT_SECONDS
+        )
+        return create_client(self.url, self.key, options=ClientOptions(httpx_client=self.http_client))
+    
+    @property
+    def is_local(self) -> bool:
+        """True when running on the embedded local backend."""
+        return self.backend == BACKEND_LOCAL
     
     def get_client(self) -> Client:
         """Get Supabase client."""
         return self.client
     
+    def close(self):
+        """Close the pooled HTTP connections, or the local database."""
+        if self.http_client is not None:
+            self.http_client.close()
+        else:
+            self.raw_client.close()
+    
     def execute_sql(self, sql: str) -> dict:
         """
         Execute raw SQL query.
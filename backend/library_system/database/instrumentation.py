@@ -0,0 +1,145 @@
+"""Per-request accounting of database round-trips and time spent in them."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+
+@dataclass
+class TableStats:
+    """Round-trips and time spent on one table."""
+    count: int = 0
+    duration_ms: float = 0.0
+
+
+@dataclass
+class QueryStats:
+    """Database round-trips made while handling one request."""
+    count: int = 0
+    duration_ms: float = 0.0
+    tables: Dict[str, TableStats] = field(default_factory=dict)
+
+    def record(self, table: str, duration_ms: float):
+        """Account one execute() call."""
+        self.count += 1
+        self.duration_ms += duration_ms
+        stats = self.tables.get(table)
+        if stats is None:
+            stats = self.tables[table] = TableStats()
+        stats.count += 1
+        stats.duration_ms += duration_ms
+
+    def server_timing(self, total_ms: Optional[float] = None) -> str:
+        """
+        Format the stats as a Server-Timing header value.
+
+        Args:
+            total_ms: Total request duration, reported as the 'app' metric
+
+        Returns:
+            e.g. 'db;dur=4.1;desc="3 queries", db-book;dur=2.5;desc="2 queries", app;dur=9.8'
+        """
+        metrics = [f'db;dur={self.duration_ms:.1f};desc="{self.count} queries"']
+        for name, stats in self.tables.items():
+            # Metric names are tokens, so ':' in 'rpc:<name>' is replaced
+            metrics.append(f'db-{name.replace(":", "-")};dur={stats.duration_ms:.1f};desc="{stats.count} queries"')
+        if total_ms is not None:
+            metrics.append(f'app;dur={total_ms:.1f}')
+        return ', '.join(metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'db_queries': self.count,
+            'db_ms': round(self.duration_ms, 2),
+            'tables': {
+                name: {'queries': stats.count, 'ms': round(stats.duration_ms, 2)}
+                for name, stats in self.tables.items()
+            }
+        }
+
+
+# Stats of the request being handled; copied into worker threads with the context
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar('db_query_stats', default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Collect stats for every query executed inside the block, including in
+    threads started with a copy of the current context.
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Return the stats being collected for the current request, if any."""
+    return _current_stats.get()
+
+
+class InstrumentedClient:
+    """
+    Wrapper around a database client timing every execute() call.
+
+    Query builders are wrapped transparently, so services use it exactly like
+    the underlying client. Outside track_queries() the only cost is one
+    context variable lookup per query.
+    """
+
+    def __init__(self, client):
+        """
+        Args:
+            client: Supabase client or LocalClient to wrap
+        """
+        self.client = client
+
+    def table(self, name: str) -> '_InstrumentedQuery':
+        return _InstrumentedQuery(self.client.table(name), name)
+
+    def from_(self, name: str) -> '_InstrumentedQuery':
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict] = None, **kwargs) -> '_InstrumentedQuery':
+        return _InstrumentedQuery(self.client.rpc(name, params or {}, **kwargs), f'rpc:{name}')
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+
+class _InstrumentedQuery:
+    """Query builder proxy recording the duration of execute()."""
+
+    __slots__ = ('_query', '_table')
+
+    def __init__(self, query, table: str):
+        self._query = query
+        self._table = table
+
+    def execute(self):
+        stats = _current_stats.get()
+        if stats is None:
+            return self._query.execute()
+        start = time.perf_counter()
+        try:
+            return self._query.execute()
+        finally:
+            stats.record(self._table, (time.perf_counter() - start) * 1000)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Builder methods return a new or the same builder; keep it wrapped
+            if hasattr(result, 'execute'):
+                return _InstrumentedQuery(result, self._table)
+            return result
+        return chain
@@ -0,0 +1,551 @@
+"""
+Embedded SQLite backend implementing the subset of the Supabase client used by the services.
+
+Selected with DATABASE_BACKEND=local. It loads the project's schema.sql
+(translated from PostgreSQL) including its indexes, so the API, CLI, tests and
+benchmarks can run without the hosted service.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DATABASE_DIR = Path(__file__).parent
+SCHEMA_PATH = DATABASE_DIR / 'schema.sql'
+SEED_PATH = DATABASE_DIR / 'seed_data.sql'
+
+# Maximum rows per multi-row INSERT statement, keeping bound parameters under SQLite's limit
+INSERT_BATCH_SIZE = 500
+
+
+class LocalBackendError(Exception):
+    """Raised when the local database rejects a query."""
+
+
+def translate_schema(sql: str) -> str:
+    """
+    Translate the PostgreSQL schema into SQLite DDL.
+
+    Enum types become TEXT columns, BIGSERIAL keys become AUTOINCREMENT
+    integer keys, and PL/pgSQL functions are dropped (their logic is
+    implemented in Python by LocalClient.rpc).
+    """
+    enum_types = re.findall(r'CREATE TYPE (\w+) AS ENUM', sql)
+    sql = re.sub(r'CREATE TYPE \w+ AS ENUM \([^)]*\);', '', sql)
+    sql = re.sub(r'CREATE OR REPLACE FUNCTION.*?\$\$ LANGUAGE plpgsql;', '', sql, flags=re.S)
+    sql = re.sub(r'\s+CASCADE;', ';', sql)
+    sql = sql.replace('BIGSERIAL PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT')
+    for enum_type in enum_types:
+        sql = re.sub(rf'\b{enum_type}\b', 'TEXT', sql)
+    return sql
+
+
+def _quote_identifier(name: str) -> str:
+    if not re.fullmatch(r'\w+', name):
+        raise LocalBackendError(f"Invalid identifier: {name!r}")
+    return f'"{name}"'
+
+
+def _to_sql_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _like_pattern(pattern: str) -> str:
+    """Accept PostgREST's '*' wildcard as well as SQL's '%'."""
+    return pattern.replace('*', '%')
+
+
+def _split_top_level(text: str) -> List[str]:
+    """Split a PostgREST logical filter on commas outside parentheses and quotes."""
+    parts, depth, quoted, escaped, current = [], 0, False, False, ''
+    for char in text:
+        if escaped:
+            current += char
+            escaped = False
+            continue
+        if char == '\\':
+            current += char
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+class LocalResponse:
+    """Query result mirroring the attributes of a PostgREST response."""
+
+    def __init__(self, data: List[Dict], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class LocalProcedureCall:
+    """Pending call of a stored procedure stand-in, run by execute()."""
+
+    def __init__(self, client: 'LocalClient', name: str, params: Dict[str, Any]):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> LocalResponse:
+        procedure = self.client._procedures.get(self.name)
+        if procedure is None:
+            raise LocalBackendError(f"Unknown procedure: {self.name}")
+        with self.client.transaction() as conn:
+            data = procedure(self.client, conn, **self.params)
+        return LocalResponse(data if data is not None else [])
+
+
+class LocalQuery:
+    """Filterable select/update/delete/insert query against one table."""
+
+    COMPARISONS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+    def __init__(self, client: 'LocalClient', table: str, action: str,
+                 columns: str = '*', payload: Any = None, count: Optional[str] = None,
+                 returning: str = 'representation'):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.columns = columns
+        self.payload = payload
+        self.count = count
+        self.returning = returning
+        self.conditions: List[str] = []
+        self.params: List[Any] = []
+        self.ordering: List[str] = []
+        self.row_limit: Optional[int] = None
+        self.row_offset: Optional[int] = None
+
+    # Filters
+    def _compare(self, column: str, op: str, value: Any) -> 'LocalQuery':
+        self.conditions.append(f'{_quote_identifier(column)} {op} ?')
+        self.params.append(_to_sql_value(value))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '=', value)
+
+    def neq(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '!=', value)
+
+    def gt(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '>', value)
+
+    def gte(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '>=', value)
+
+    def lt(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '<', value)
+
+    def lte(self, column: str, value: Any) -> 'LocalQuery':
+        return self._compare(column, '<=', value)
+
+    def like(self, column: str, pattern: str) -> 'LocalQuery':
+        self.conditions.append(f"CAST({_quote_identifier(column)} AS TEXT) GLOB ?")
+        self.params.append(_like_pattern(pattern).replace('%', '*').replace('_', '?'))
+        return self
+
+    def ilike(self, column: str, pattern: str) -> 'LocalQuery':
+        self.conditions.append(f"LOWER({_quote_identifier(column)}) LIKE LOWER(?)")
+        self.params.append(_like_pattern(pattern))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> 'LocalQuery':
+        values = list(values)
+        if not values:
+            self.conditions.append('0')
+            return self
+        placeholders = ', '.join('?' for _ in values)
+        self.conditions.append(f'{_quote_identifier(column)} IN ({placeholders})')
+        self.params.extend(_to_sql_value(v) for v in values)
+        return self
+
+    def is_(self, column: str, value: Any) -> 'LocalQuery':
+        if value is None or str(value).lower() == 'null':
+            self.conditions.append(f'{_quote_identifier(column)} IS NULL')
+        elif str(value).lower() in ('true', 'false'):
+            self.conditions.append(f'{_quote_identifier(column)} IS {str(value).upper()}')
+        else:
+            raise LocalBackendError(f"Unsupported is_ value: {value!r}")
+        return self
+
+    def or_(self, filters: str) -> 'LocalQuery':
+        sql, params = self._logical('or', filters)
+        self.conditions.append(sql)
+        self.params.extend(params)
+        return self
+
+    def _logical(self, operator: str, filters: str) -> Tuple[str, List[Any]]:
+        """Translate a PostgREST logical filter such as 'a.gt.1,and(b.eq.2,c.lt.3)'."""
+        clauses, params = [], []
+        for part in _split_top_level(filters):
+            nested = re.fullmatch(r'(and|or)\((.*)\)', part, flags=re.S)
+            if nested:
+                sql, nested_params = self._logical(nested.group(1), nested.group(2))
+                clauses.append(sql)
+                params.extend(nested_params)
+                continue
+            column, op, value = part.split('.', 2)
+            value = _unquote(value)
+            if op in self.COMPARISONS:
+                clauses.append(f'{_quote_identifier(column)} {self.COMPARISONS[op]} ?')
+                params.append(value)
+            elif op == 'is' and value.lower() == 'null':
+                clauses.append(f'{_quote_identifier(column)} IS NULL')
+            elif op == 'ilike':
+                clauses.append(f'LOWER({_quote_identifier(column)}) LIKE LOWER(?)')
+                params.append(_like_pattern(value))
+            elif op == 'in':
+                values = [_unquote(v) for v in _split_top_level(value.strip('()'))]
+                clauses.append(f"{_quote_identifier(column)} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            else:
+                raise LocalBackendError(f"Unsupported filter operator: {op}")
+        joiner = ' AND ' if operator == 'and' else ' OR '
+        return '(' + joiner.join(clauses) + ')', params
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> 'LocalQuery':
+        clause = f"{_quote_identifier(column)} {'DESC' if desc else 'ASC'}"
+        if nullsfirst is not None:
+            clause += ' NULLS FIRST' if nullsfirst else ' NULLS LAST'
+        self.ordering.append(clause)
+        return self
+
+    def limit(self, size: int) -> 'LocalQuery':
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int) -> 'LocalQuery':
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    # Execution
+    def _where(self) -> str:
+        return f" WHERE {' AND '.join(self.conditions)}" if self.conditions else ''
+
+    def _select_list(self) -> str:
+        if self.columns.strip() == '*':
+            return '*'
+        return ', '.join(_quote_identifier(c.strip()) for c in self.columns.split(',') if c.strip())
+
+    def execute(self) -> LocalResponse:
+        """Run the query and return its rows."""
+        table = _quote_identifier(self.table)
+        with self.client.transaction() as conn:
+            if self.action == 'select':
+                return self._execute_select(conn, table)
+            if self.action == 'insert':
+                return self._execute_insert(conn, table)
+
+            returning = ' RETURNING *' if self.returning == 'representation' or self.count else ''
+            if self.action == 'update':
+                values = {k: _to_sql_value(v) for k, v in self.payload.items()}
+                assignments = ', '.join(f'{_quote_identifier(k)} = ?' for k in values)
+                sql = f'UPDATE {table} SET {assignments}{self._where()}{returning}'
+                params = list(values.values()) + self.params
+            elif self.action == 'delete':
+                sql = f'DELETE FROM {table}{self._where()}{returning}'
+                params = self.params
+            else:
+                raise LocalBackendError(f"Unsupported action: {self.action}")
+
+            rows = self.client.fetch(conn, self.table, sql, params)
+            count = len(rows) if self.count else None
+            return LocalResponse(rows if self.returning == 'representation' else [], count)
+
+    def _execute_select(self, conn: sqlite3.Connection, table: str) -> LocalResponse:
+        sql = f'SELECT {self._select_list()} FROM {table}{self._where()}'
+        if self.ordering:
+            sql += ' ORDER BY ' + ', '.join(self.ordering)
+        row_limit = self.row_limit
+        if self.client.max_rows is not None:
+            row_limit = min(row_limit, self.client.max_rows) if row_limit is not None else self.client.max_rows
+        if row_limit is not None:
+            sql += f' LIMIT {int(row_limit)}'
+            if self.row_offset:
+                sql += f' OFFSET {int(self.row_offset)}'
+        rows = self.client.fetch(conn, self.table, sql, self.params)
+
+        count = None
+        if self.count:
+            count_sql = f'SELECT COUNT(*) FROM {table}{self._where()}'
+            count = conn.execute(count_sql, self.params).fetchone()[0]
+        return LocalResponse(rows, count)
+
+    def _execute_insert(self, conn: sqlite3.Connection, table: str) -> LocalResponse:
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        inserted = []
+        # Rows with the same columns are inserted together; omitted columns take their defaults
+        groups: Dict[Tuple[str, ...], List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(row.keys()), []).append(row)
+        returning = ' RETURNING *' if self.returning == 'representation' else ''
+        for columns, group in groups.items():
+            column_sql = ', '.join(_quote_identifier(c) for c in columns)
+            placeholders = '(' + ', '.join('?' for _ in columns) + ')'
+            for start in range(0, len(group), INSERT_BATCH_SIZE):
+                batch = group[start:start + INSERT_BATCH_SIZE]
+                sql = (f'INSERT INTO {table} ({column_sql}) VALUES '
+                       + ', '.join(placeholders for _ in batch) + returning)
+                params = [_to_sql_value(row[c]) for row in batch for c in columns]
+                inserted.extend(self.client.fetch(conn, self.table, sql, params))
+        count = len(rows) if self.count else None
+        return LocalResponse(inserted if self.returning == 'representation' else [], count)
+
+
+class LocalTable:
+    """Entry point for queries on one table, mirroring client.table(name)."""
+
+    def __init__(self, client: 'LocalClient', name: str):
+        self.client = client
+        self.name = name
+
+    def select(self, columns: str = '*', count: Optional[str] = None) -> LocalQuery:
+        return LocalQuery(self.client, self.name, 'select', columns=columns, count=count)
+
+    def insert(self, json: Any, count: Optional[str] = None, returning: str = 'representation',
+               **kwargs) -> LocalQuery:
+        return LocalQuery(self.client, self.name, 'insert', payload=json, count=count,
+                          returning=getattr(returning, 'value', returning))
+
+    def update(self, json: Dict, count: Optional[str] = None, returning: str = 'representation',
+               **kwargs) -> LocalQuery:
+        return LocalQuery(self.client, self.name, 'update', payload=json, count=count,
+                          returning=getattr(returning, 'value', returning))
+
+    def delete(self, count: Optional[str] = None, returning: str = 'representation',
+               **kwargs) -> LocalQuery:
+        return LocalQuery(self.client, self.name, 'delete', count=count,
+                          returning=getattr(returning, 'value', returning))
+
+
+class LocalClient:
+    """
+    SQLite-backed stand-in for the Supabase client.
+
+    A single connection is shared by all threads; every statement runs under
+    a lock inside its own transaction, matching PostgREST's one transaction
+    per request.
+    """
+
+    def __init__(self, path: str = ':memory:', seed: bool = False, max_rows: Optional[int] = None):
+        """
+        Open (and if needed create) a local database.
+
+        Args:
+            path: SQLite file path, or ':memory:' for a private in-memory database
+            seed: Load seed_data.sql when the schema is first created
+            max_rows: Most rows a select returns, like PostgREST's max-rows
+                (None for no limit)
+        """
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('PRAGMA synchronous = NORMAL')
+        self._boolean_columns: Dict[str, set] = {}
+        self._procedures: Dict[str, Callable] = {
+            'issue_loan': _issue_loan,
+            'return_loans': _return_loans,
+            'expire_reservations': _expire_reservations,
+            'update_overdue_loans': _update_overdue_loans,
+        }
+
+        if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'book'").fetchone():
+            self._conn.executescript(translate_schema(SCHEMA_PATH.read_text()))
+            if seed:
+                self._conn.executescript(SEED_PATH.read_text())
+
+    def table(self, name: str) -> LocalTable:
+        """Start a query on a table."""
+        return LocalTable(self, name)
+
+    def from_(self, name: str) -> LocalTable:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> LocalProcedureCall:
+        """Call one of the schema's PL/pgSQL functions, implemented in Python."""
+        return LocalProcedureCall(self, name, params or {})
+
+    def register_procedure(self, name: str, procedure: Callable):
+        """
+        Add an rpc() procedure.
+
+        The procedure is called as procedure(client, conn, **params) inside a
+        transaction and returns the result rows.
+        """
+        self._procedures[name] = procedure
+
+    def transaction(self):
+        """Context manager running statements atomically under the client lock."""
+        return _Transaction(self)
+
+    def fetch(self, conn: sqlite3.Connection, table: str, sql: str, params: List[Any]) -> List[Dict]:
+        """Run a statement and return rows as dictionaries, with BOOLEAN columns as bools."""
+        try:
+            cursor = conn.execute(sql, params)
+            rows = [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise LocalBackendError(str(e)) from e
+        booleans = self._boolean_columns_for(conn, table)
+        if booleans:
+            for row in rows:
+                for column in booleans & row.keys():
+                    if row[column] is not None:
+                        row[column] = bool(row[column])
+        return rows
+
+    def _boolean_columns_for(self, conn: sqlite3.Connection, table: str) -> set:
+        if table not in self._boolean_columns:
+            info = conn.execute(f'PRAGMA table_info({_quote_identifier(table)})').fetchall()
+            self._boolean_columns[table] = {row['name'] for row in info if row['type'].upper() == 'BOOLEAN'}
+        return self._boolean_columns[table]
+
+    def close(self):
+        """Close the database."""
+        self._conn.close()
+
+
+class _Transaction:
+    def __init__(self, client: LocalClient):
+        self.client = client
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.client._lock.acquire()
+        self.client._conn.execute('BEGIN IMMEDIATE')
+        return self.client._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.client._conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.client._lock.release()
+        return False
+
+
+def _issue_loan(client: LocalClient, conn: sqlite3.Connection, p_member_id: int, p_book_id: int,
+                p_librarian_id: int, p_due_date: str) -> List[Dict]:
+    """Stand-in for the issue_loan() function: collect a held copy or claim one, and create the loan."""
+    copy = conn.execute(
+        "SELECT reservation_id, copy_id FROM reservation WHERE member_id = ? AND book_id = ? AND active "
+        "AND copy_id IS NOT NULL ORDER BY created_at, reservation_id LIMIT 1",
+        [p_member_id, p_book_id]
+    ).fetchone()
+    if copy is not None:
+        conn.execute("UPDATE reservation SET active = 0 WHERE reservation_id = ?", [copy['reservation_id']])
+    else:
+        copy = conn.execute(
+            "SELECT copy_id FROM book_copy WHERE book_id = ? AND status = 'available' ORDER BY copy_id LIMIT 1",
+            [p_book_id]
+        ).fetchone()
+    if copy is None:
+        return []
+    conn.execute("UPDATE book_copy SET status = 'loaned' WHERE copy_id = ?", [copy['copy_id']])
+    return client.fetch(
+        conn, 'loan',
+        "INSERT INTO loan (member_id, copy_id, librarian_id, issue_date, due_date, status) "
+        "VALUES (?, ?, ?, ?, ?, 'active') RETURNING *",
+        [p_member_id, copy['copy_id'], p_librarian_id, date.today().isoformat(), p_due_date]
+    )
+
+
+def _return_loans(client: LocalClient, conn: sqlite3.Connection, p_loan_ids: List[int]) -> List[Dict]:
+    """Stand-in for the return_loans() function: close loans and hold each copy for the next reservation."""
+    today = date.today().isoformat()
+    rows = []
+    for loan_id in dict.fromkeys(p_loan_ids):
+        loan = conn.execute(
+            "UPDATE loan SET status = 'returned', return_date = ? "
+            "WHERE loan_id = ? AND status IN ('active', 'overdue') RETURNING copy_id",
+            [today, loan_id]
+        ).fetchone()
+        if loan is None:
+            continue
+        book_id = conn.execute("SELECT book_id FROM book_copy WHERE copy_id = ?", [loan['copy_id']]).fetchone()[0]
+        reservation = conn.execute(
+            "SELECT reservation_id FROM reservation WHERE book_id = ? AND active AND copy_id IS NULL "
+            "AND expires_at >= ? ORDER BY created_at, reservation_id LIMIT 1",
+            [book_id, today]
+        ).fetchone()
+        reservation_id = reservation['reservation_id'] if reservation else None
+        if reservation_id is not None:
+            conn.execute("UPDATE reservation SET copy_id = ? WHERE reservation_id = ?", [loan['copy_id'], reservation_id])
+        conn.execute("UPDATE book_copy SET status = ? WHERE copy_id = ?",
+                     ['reserved' if reservation_id is not None else 'available', loan['copy_id']])
+        rows.append({'loan_id': loan_id, 'copy_id': loan['copy_id'], 'book_id': book_id,
+                     'reservation_id': reservation_id})
+    return rows
+
+
+def _expire_reservations(client: LocalClient, conn: sqlite3.Connection, p_today: str) -> List[Dict]:
+    """Stand-in for the expire_reservations() function: deactivate expired reservations, passing on held copies."""
+    expired = client.fetch(
+        conn, 'reservation',
+        "UPDATE reservation SET active = 0 WHERE active AND expires_at < ? RETURNING reservation_id, book_id, copy_id",
+        [p_today]
+    )
+    for row in expired:
+        row['next_reservation_id'] = None
+        if row['copy_id'] is None:
+            continue
+        waiting = conn.execute(
+            "SELECT reservation_id FROM reservation WHERE book_id = ? AND active AND copy_id IS NULL "
+            "AND expires_at >= ? ORDER BY created_at, reservation_id LIMIT 1",
+            [row['book_id'], p_today]
+        ).fetchone()
+        if waiting is not None:
+            row['next_reservation_id'] = waiting['reservation_id']
+            conn.execute("UPDATE reservation SET copy_id = ? WHERE reservation_id = ?",
+                         [row['copy_id'], waiting['reservation_id']])
+        else:
+            conn.execute("UPDATE book_copy SET status = 'available' WHERE copy_id = ? AND status = 'reserved'",
+                         [row['copy_id']])
+    return expired
+
+
+def _update_overdue_loans(client: LocalClient, conn: sqlite3.Connection) -> List[Dict]:
+    """Stand-in for the update_overdue_loans() function."""
+    conn.execute(
+        "UPDATE loan SET status = 'overdue' WHERE status = 'active' AND due_date < ? AND return_date IS NULL",
+        [date.today().isoformat()]
+    )
+    return []
+
+
+def local_client_from_env() -> LocalClient:
+    """Create a LocalClient from LOCAL_DB_PATH and LOCAL_DB_SEED."""
+    return LocalClient(
+        path=os.getenv('LOCAL_DB_PATH', ':memory:'),
+        seed=os.getenv('LOCAL_DB_SEED', '').lower() in ('1', 'true', 'yes')
+    )
@@ -12,6 +12,7 @@ DROP TABLE IF EXISTS member CASCADE;
 DROP TABLE IF EXISTS book CASCADE;
 DROP TABLE IF EXISTS author CASCADE;
 DROP TABLE IF EXISTS category CASCADE;
+DROP TABLE IF EXISTS revoked_session CASCADE;
 DROP TABLE IF EXISTS "user" CASCADE;
 
 -- Create ENUM types
@@ -98,7 +99,10 @@ CREATE TABLE reservation (
     book_id BIGINT NOT NULL REFERENCES book(book_id) ON DELETE CASCADE,
     created_at DATE NOT NULL DEFAULT CURRENT_DATE,
     expires_at DATE NOT NULL,
-    active BOOLEAN NOT NULL DEFAULT TRUE
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    -- Copy held for the member once one is returned; NULL while waiting in the queue
+    -- (older databases: ALTER TABLE reservation ADD COLUMN IF NOT EXISTS, see README)
+    copy_id BIGINT REFERENCES book_copy(copy_id) ON DELETE SET NULL
 );
 
 -- Loan table
@@ -113,8 +117,16 @@ CREATE TABLE loan (
     status loan_status NOT NULL DEFAULT 'active'
 );
 
+-- Logged-out session tokens (SHA-256 of the token), kept until the token expires
+CREATE TABLE revoked_session (
+    token_hash VARCHAR(64) PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES "user"(user_id) ON DELETE CASCADE,
+    expires_at BIGINT NOT NULL  -- Unix time the token expires
+);
+
 -- Create indexes for better query performance
 CREATE INDEX idx_user_email ON "user"(email);
+CREATE INDEX idx_revoked_session_expires ON revoked_session(expires_at);
 CREATE INDEX idx_member_email ON member(email);
 CREATE INDEX idx_member_status ON member(status);
 CREATE INDEX idx_book_isbn ON book(isbn);
@@ -122,6 +134,7 @@ CREATE INDEX idx_book_title ON book(title);
 CREATE INDEX idx_book_copy_book_id ON book_copy(book_id);
 CREATE INDEX idx_book_copy_status ON book_copy(status);
 CREATE INDEX idx_book_copy_barcode ON book_copy(barcode);
+CREATE INDEX idx_book_copy_available ON book_copy(book_id, copy_id) WHERE status = 'available';
 CREATE INDEX idx_loan_member_id ON loan(member_id);
 CREATE INDEX idx_loan_copy_id ON loan(copy_id);
 CREATE INDEX idx_loan_status ON loan(status);
@@ -129,6 +142,8 @@ CREATE INDEX idx_loan_due_date ON loan(due_date);
 CREATE INDEX idx_reservation_member_id ON reservation(member_id);
 CREATE INDEX idx_reservation_book_id ON reservation(book_id);
 CREATE INDEX idx_reservation_active ON reservation(active);
+CREATE INDEX idx_reservation_queue ON reservation(book_id, created_at, reservation_id) WHERE active;
+CREATE INDEX idx_reservation_expiry ON reservation(expires_at) WHERE active;
 
 -- Create function to automatically update overdue loans
 CREATE OR REPLACE FUNCTION update_overdue_loans()
@@ -142,3 +157,142 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Create function to claim an available copy and create the loan atomically.
+-- Concurrent callers skip copies locked by each other instead of waiting, so
+-- two desks issuing the same book never get the same copy.
+-- A copy held for the member by a reservation is collected first.
+CREATE OR REPLACE FUNCTION issue_loan(
+    p_member_id BIGINT,
+    p_book_id BIGINT,
+    p_librarian_id BIGINT,
+    p_due_date DATE
+)
+RETURNS SETOF loan AS $$
+DECLARE
+    v_copy_id BIGINT;
+    v_reservation_id BIGINT;
+BEGIN
+    SELECT reservation_id, copy_id INTO v_reservation_id, v_copy_id
+    FROM reservation
+    WHERE member_id = p_member_id
+    AND book_id = p_book_id
+    AND active
+    AND copy_id IS NOT NULL
+    ORDER BY created_at, reservation_id
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+
+    IF v_reservation_id IS NOT NULL THEN
+        UPDATE reservation SET active = FALSE WHERE reservation_id = v_reservation_id;
+    ELSE
+        SELECT copy_id INTO v_copy_id
+        FROM book_copy
+        WHERE book_id = p_book_id
+        AND status = 'available'
+        ORDER BY copy_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED;
+    END IF;
+
+    IF v_copy_id IS NULL THEN
+        RETURN;
+    END IF;
+
+    UPDATE book_copy SET status = 'loaned' WHERE copy_id = v_copy_id;
+
+    RETURN QUERY
+    INSERT INTO loan (member_id, copy_id, librarian_id, issue_date, due_date, status)
+    VALUES (p_member_id, v_copy_id, p_librarian_id, CURRENT_DATE, p_due_date, 'active')
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create function to return loans and pass each copy to the book's hold queue.
+-- Each returned copy is held for the oldest unexpired reservation still waiting
+-- for its book (status 'reserved') or made available if nobody is waiting.
+CREATE OR REPLACE FUNCTION return_loans(p_loan_ids BIGINT[])
+RETURNS TABLE (loan_id BIGINT, copy_id BIGINT, book_id BIGINT, reservation_id BIGINT) AS $$
+DECLARE
+    v_loan RECORD;
+    v_book_id BIGINT;
+    v_reservation_id BIGINT;
+BEGIN
+    FOR v_loan IN
+        UPDATE loan l
+        SET status = 'returned', return_date = CURRENT_DATE
+        WHERE l.loan_id = ANY(p_loan_ids)
+        AND l.status IN ('active', 'overdue')
+        RETURNING l.loan_id, l.copy_id
+    LOOP
+        SELECT c.book_id INTO v_book_id FROM book_copy c WHERE c.copy_id = v_loan.copy_id;
+
+        SELECT r.reservation_id INTO v_reservation_id
+        FROM reservation r
+        WHERE r.book_id = v_book_id
+        AND r.active
+        AND r.copy_id IS NULL
+        AND r.expires_at >= CURRENT_DATE
+        ORDER BY r.created_at, r.reservation_id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED;
+
+        IF v_reservation_id IS NOT NULL THEN
+            UPDATE reservation r SET copy_id = v_loan.copy_id WHERE r.reservation_id = v_reservation_id;
+            UPDATE book_copy c SET status = 'reserved' WHERE c.copy_id = v_loan.copy_id;
+        ELSE
+            UPDATE book_copy c SET status = 'available' WHERE c.copy_id = v_loan.copy_id;
+        END IF;
+
+        loan_id := v_loan.loan_id;
+        copy_id := v_loan.copy_id;
+        book_id := v_book_id;
+        reservation_id := v_reservation_id;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Create function to deactivate every reservation that expired before p_today in one
+-- update. A copy held for an expired reservation passes to the next unexpired
+-- reservation waiting for its book, or is made available if nobody is waiting.
+CREATE OR REPLACE FUNCTION expire_reservations(p_today DATE)
+RETURNS TABLE (reservation_id BIGINT, book_id BIGINT, copy_id BIGINT, next_reservation_id BIGINT) AS $$
+DECLARE
+    v_expired RECORD;
+    v_next_id BIGINT;
+BEGIN
+    FOR v_expired IN
+        UPDATE reservation r
+        SET active = FALSE
+        WHERE r.active
+        AND r.expires_at < p_today
+        RETURNING r.reservation_id, r.book_id, r.copy_id
+    LOOP
+        v_next_id := NULL;
+        IF v_expired.copy_id IS NOT NULL THEN
+            SELECT r.reservation_id INTO v_next_id
+            FROM reservation r
+            WHERE r.book_id = v_expired.book_id
+            AND r.active
+            AND r.copy_id IS NULL
+            AND r.expires_at >= p_today
+            ORDER BY r.created_at, r.reservation_id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED;
+
+            IF v_next_id IS NOT NULL THEN
+                UPDATE reservation r SET copy_id = v_expired.copy_id WHERE r.reservation_id = v_next_id;
+            ELSE
+                UPDATE book_copy c SET status = 'available'
+                WHERE c.copy_id = v_expired.copy_id AND c.status = 'reserved';
+            END IF;
+        END IF;
+
+        reservation_id := v_expired.reservation_id;
+        book_id := v_expired.book_id;
+        copy_id := v_expired.copy_id;
+        next_reservation_id := v_next_id;
+        RETURN NEXT;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,174 @@
+"""Column-oriented loan store for bulk loan processing."""
+
+import operator
+from array import array
+from datetime import date
+from itertools import compress
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from library_system.models.loan import Loan
+from library_system.utils.enums import LoanStatus
+
+# Small-int code of each loan status, in enum order
+STATUS_CODES = {status: code for code, status in enumerate(LoanStatus)}
+STATUSES = list(LoanStatus)
+
+# Day ordinal stored for a missing date (real ordinals start at 1)
+NO_DATE = 0
+
+ID_COLUMNS = ('loan_id', 'member_id', 'copy_id', 'librarian_id')
+DATE_COLUMNS = ('issue_date', 'due_date', 'return_date')
+COLUMNS = ID_COLUMNS + DATE_COLUMNS + ('status',)
+
+
+class LoanTable:
+    """
+    Loans stored as typed arrays, one per column.
+
+    IDs are 64-bit integers, dates are day ordinals and the status is a
+    one-byte code, so a loan takes about 45 bytes instead of a Loan object
+    with three date objects and an enum (several hundred bytes). Filters
+    run over whole columns and return row positions; rows are only turned
+    into Loan objects or dictionaries on demand.
+    """
+
+    def __init__(self):
+        """Initialize an empty table."""
+        for column in ID_COLUMNS:
+            setattr(self, column, array('q'))
+        for column in DATE_COLUMNS:
+            setattr(self, column, array('i'))
+        self.status = array('b')
+        self._ordinals: Dict[str, int] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict]) -> 'LoanTable':
+        """Build a table from loan rows as returned by the database."""
+        table = cls()
+        table.extend(rows)
+        return table
+
+    def extend(self, rows: Iterable[Dict]):
+        """Append loan rows (dates as ISO strings or date objects, status as a string)."""
+        for row in rows:
+            self.loan_id.append(row['loan_id'])
+            self.member_id.append(row['member_id'])
+            self.copy_id.append(row['copy_id'])
+            self.librarian_id.append(row['librarian_id'])
+            self.issue_date.append(self._ordinal(row.get('issue_date')))
+            self.due_date.append(self._ordinal(row.get('due_date')))
+            self.return_date.append(self._ordinal(row.get('return_date')))
+            self.status.append(STATUS_CODES[LoanStatus(row['status'])])
+
+    def __len__(self) -> int:
+        return len(self.loan_id)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the column arrays."""
+        return sum(len(getattr(self, column)) * getattr(self, column).itemsize for column in COLUMNS)
+
+    def where(self, status: Optional[LoanStatus] = None, due_before: Optional[date] = None,
+              member_id: Optional[int] = None) -> List[int]:
+        """
+        Find rows matching every given condition.
+
+        Args:
+            status: Loan status
+            due_before: Due date strictly before this date
+            member_id: Member holding the loan
+
+        Returns:
+            Ascending row positions
+        """
+        selectors = None
+        if status is not None:
+            selectors = map(STATUS_CODES[LoanStatus(status)].__eq__, self.status)
+        if due_before is not None:
+            selectors = self._and(selectors, map(due_before.toordinal().__gt__, self.due_date))
+        if member_id is not None:
+            selectors = self._and(selectors, map(member_id.__eq__, self.member_id))
+        if selectors is None:
+            return list(range(len(self)))
+        return list(compress(range(len(self)), selectors))
+
+    def count(self, **conditions) -> int:
+        """Number of rows matching where(**conditions)."""
+        return len(self.where(**conditions))
+
+    def take(self, rows: Sequence[int]) -> 'LoanTable':
+        """Return a new table holding the given rows."""
+        table = LoanTable()
+        for column in COLUMNS:
+            source = getattr(self, column)
+            setattr(table, column, array(source.typecode, map(source.__getitem__, rows)))
+        return table
+
+    def filter(self, **conditions) -> 'LoanTable':
+        """Return a new table with the rows matching where(**conditions)."""
+        return self.take(self.where(**conditions))
+
+    def loan(self, row: int) -> Loan:
+        """Build the Loan object of one row."""
+        return Loan(
+            loan_id=self.loan_id[row],
+            member_id=self.member_id[row],
+            copy_id=self.copy_id[row],
+            librarian_id=self.librarian_id[row],
+            issue_date=_date(self.issue_date[row]),
+            due_date=_date(self.due_date[row]),
+            return_date=_date(self.return_date[row]),
+            status=STATUSES[self.status[row]]
+        )
+
+    def __iter__(self) -> Iterator[Loan]:
+        return (self.loan(row) for row in range(len(self)))
+
+    def to_columns(self) -> Dict[str, List]:
+        """
+        Serialize as one list per column, the most compact JSON shape.
+
+        Dates become ISO strings (or None) and statuses their string values.
+        """
+        iso = _IsoDates()
+        columns = {column: getattr(self, column).tolist() for column in ID_COLUMNS}
+        for column in DATE_COLUMNS:
+            columns[column] = list(map(iso, getattr(self, column)))
+        columns['status'] = [STATUSES[code].value for code in self.status]
+        return columns
+
+    def to_dicts(self) -> List[Dict]:
+        """Serialize as one dictionary per loan, matching Loan.to_dict()."""
+        columns = self.to_columns()
+        return [dict(zip(COLUMNS, values)) for values in zip(*(columns[column] for column in COLUMNS))]
+
+    def _ordinal(self, value) -> int:
+        if not value:
+            return NO_DATE
+        if isinstance(value, date):
+            return value.toordinal()
+        # Dates repeat heavily across loans, so each distinct string is parsed once
+        ordinal = self._ordinals.get(value)
+        if ordinal is None:
+            ordinal = self._ordinals[value] = date.fromisoformat(value).toordinal()
+        return ordinal
+
+    @staticmethod
+    def _and(selectors, more):
+        return more if selectors is None else map(operator.and_, selectors, more)
+
+
+class _IsoDates:
+    """Ordinal -> ISO string conversion, formatting each distinct day once."""
+
+    def __init__(self):
+        self._strings: Dict[int, Optional[str]] = {NO_DATE: None}
+
+    def __call__(self, ordinal: int) -> Optional[str]:
+        text = self._strings.get(ordinal, False)
+        if text is False:
+            text = self._strings[ordinal] = date.fromordinal(ordinal).isoformat()
+        return text
+
+
+def _date(ordinal: int) -> Optional[date]:
+    return date.fromordinal(ordinal) if ordinal != NO_DATE else None
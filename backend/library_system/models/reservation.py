@@ -7,13 +7,14 @@ from datetime import date
 
 @dataclass
 class Reservation:
-    """Represents a book reservation."""
+    """Represents a book reservation (copy_id is set once a copy is held for it)."""
     reservation_id: Optional[int] = None
     member_id: Optional[int] = None
     book_id: Optional[int] = None
     created_at: Optional[date] = None
     expires_at: Optional[date] = None
     active: Optional[bool] = None
+    copy_id: Optional[int] = None
 
     def to_dict(self) -> dict:
         """Convert reservation to dictionary."""
@@ -23,7 +24,8 @@ class Reservation:
             'book_id': self.book_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None,
-            'active': self.active
+            'active': self.active,
+            'copy_id': self.copy_id
         }
 
     @classmethod
@@ -49,6 +51,7 @@ class Reservation:
             book_id=data.get('book_id'),
             created_at=created_at,
             expires_at=expires_at,
-            active=data.get('active')
+            active=data.get('active'),
+            copy_id=data.get('copy_id')
         )
 
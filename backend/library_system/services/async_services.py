@@ -0,0 +1,180 @@
+"""Async facades running the synchronous services on a bounded threadpool."""
+
+import asyncio
+import functools
+from typing import Any, Callable, Dict, List, Optional
+from anyio import CapacityLimiter, to_thread
+from library_system.services.book_service import BookService
+from library_system.services.member_service import MemberService
+from library_system.services.loan_service import LoanService
+from library_system.services.auth_service import AuthService
+from library_system.services.reservation_service import ReservationService
+from library_system.services.session_service import SessionService
+from library_system.services.import_service import ImportService
+from library_system.services.availability_service import AvailabilityService
+from library_system.services.member_summary import MemberSummaryService
+from library_system.services.fine_service import FineService
+from library_system.services.circulation_stats import CirculationStats
+
+
+class AsyncService:
+    """
+    Awaitable view of a synchronous service.
+
+    Every public method of the wrapped service is available as a coroutine
+    that runs the call on a worker thread, so database round-trips never
+    block the event loop. All facades of a container share one limiter,
+    which caps concurrent database calls at the size of the connection pool
+    instead of queueing requests behind a single slow one.
+    """
+
+    def __init__(self, service: Any, limiter: CapacityLimiter):
+        """
+        Args:
+            service: Synchronous service to wrap
+            limiter: Limiter bounding the worker threads used for database calls
+        """
+        self.service = service
+        self.limiter = limiter
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on a worker thread."""
+        return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=self.limiter)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.service, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        call.__name__ = name
+        call.__doc__ = attr.__doc__
+        return call
+
+
+class AsyncBookService(AsyncService):
+    """Async book service; author and category lookups run concurrently."""
+
+    service: BookService
+
+    async def enrich_books(self, books: List[Dict]) -> List[Dict]:
+        """Attach author and category names and copy counts, fetching them at the same time."""
+        book_ids = [book['book_id'] for book in books]
+        if not book_ids:
+            return []
+        authors_by_book, categories_by_book, availability_by_book = await asyncio.gather(
+            self.run(self.service.author_names, book_ids),
+            self.run(self.service.category_names, book_ids),
+            self.run(self.service.availability_counts, book_ids)
+        )
+        return self.service.attach_details(books, authors_by_book, categories_by_book, availability_by_book)
+
+    async def get_books_enriched(self, book_ids: List[int]) -> List[Dict]:
+        """Get books by ID with author and category information attached."""
+        return await self.enrich_books(await self.run(self.service.get_book_rows, book_ids))
+
+    async def search_books(self, isbn: Optional[str] = None, title: Optional[str] = None,
+                           author: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """Search and filter books."""
+        rows = await self.run(self.service.search_book_rows, isbn=isbn, title=title, author=author, category=category)
+        return await self.enrich_books(rows)
+
+
+class AsyncMemberService(AsyncService):
+    """Async member service."""
+
+    service: MemberService
+
+
+class AsyncMemberSummaryService(AsyncService):
+    """Async member summary service; independent queries run concurrently."""
+
+    service: MemberSummaryService
+
+    async def get_summary(self, member_id: int) -> Optional[Dict]:
+        """Get the account summary of a member in three rounds of concurrent queries."""
+        member, loans, reservations = await asyncio.gather(
+            self.run(self.service.member_service.get_member, member_id),
+            self.run(self.service.open_loans, member_id),
+            self.run(self.service.active_reservations, member_id)
+        )
+        if member is None:
+            return None
+        books, positions = await asyncio.gather(
+            self.run(self.service.books_by_copy, [loan['copy_id'] for loan in loans]),
+            self.run(self.service.queue_positions, reservations)
+        )
+        titles = await self.run(self.service.titles, list(books.values()) + [row['book_id'] for row in reservations])
+        return self.service.assemble(member.to_dict(), loans, reservations, books, titles, positions)
+
+
+class AsyncLoanService(AsyncService):
+    """Async loan service."""
+
+    service: LoanService
+
+
+class AsyncAuthService(AsyncService):
+    """Async auth service; role checks need no database and stay synchronous."""
+
+    service: AuthService
+
+    def has_role(self, user, required_roles) -> bool:
+        return self.service.has_role(user, required_roles)
+
+    def can_manage_books(self, user) -> bool:
+        return self.service.can_manage_books(user)
+
+    def can_manage_members(self, user) -> bool:
+        return self.service.can_manage_members(user)
+
+
+class AsyncReservationService(AsyncService):
+    """Async reservation service."""
+
+    service: ReservationService
+
+
+class AsyncFineService(AsyncService):
+    """Async fine service."""
+
+    service: FineService
+
+
+class AsyncCirculationStats(AsyncService):
+    """Async circulation statistics."""
+
+    service: CirculationStats
+
+
+class AsyncSessionService(AsyncService):
+    """Async session service; cached tokens resolve without leaving the event loop."""
+
+    service: SessionService
+
+    async def logout(self, token: str) -> bool:
+        """Log out on a worker thread; recording the revocation writes to the database."""
+        return await self.run(self.service.logout, token)
+
+    def evict_user(self, user_id: int) -> int:
+        return self.service.evict_user(user_id)
+
+    async def resolve(self, token: str):
+        """Resolve a token, only using a worker thread when the cache misses."""
+        principal = self.service.cache.get(token)
+        if principal is not None:
+            return self.service.resolve(token)
+        return await self.run(self.service.resolve, token)
+
+
+class AsyncImportService(AsyncService):
+    """Async import service."""
+
+    service: ImportService
+
+
+class AsyncAvailabilityService(AsyncService):
+    """Async availability service."""
+
+    service: AvailabilityService
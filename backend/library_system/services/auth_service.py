@@ -5,6 +5,7 @@ from library_system.models.user import User
 from library_system.database.connection import DatabaseConnection
 from library_system.utils.enums import RoleName
 import hashlib
+import time
 
 
 class AuthService:
@@ -38,6 +39,20 @@ class AuthService:
             return User.from_dict(user_data)
         return None
     
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Get user by ID."""
+        result = self.client.table('user').select('*').eq('user_id', user_id).execute()
+        if result.data:
+            return User.from_dict(result.data[0])
+        return None
+    
+    def set_role(self, user_id: int, role: RoleName) -> Optional[User]:
+        """Change a user's role."""
+        result = self.client.table('user').update({'role': role.value}).eq('user_id', user_id).execute()
+        if result.data:
+            return User.from_dict(result.data[0])
+        return None
+    
     def has_role(self, user: User, required_roles: List[RoleName]) -> bool:
         """Check if user has one of the required roles."""
         return user.role in required_roles
@@ -50,6 +65,13 @@ class AuthService:
         """Check if user can manage members (librarian or administrator)."""
         return user.role in [RoleName.LIBRARIAN, RoleName.ADMINISTRATOR]
     
+    def get_librarian_id(self, user_id: int) -> Optional[int]:
+        """Get librarian employee_id from user_id."""
+        result = self.client.table('librarian').select('employee_id').eq('user_id', user_id).execute()
+        if result.data:
+            return result.data[0]['employee_id']
+        return None
+    
     def create_user(self, user: User, password: str) -> User:
         """Create a new user."""
         user.password_hash = self.hash_password(password)
@@ -57,4 +79,16 @@ class AuthService:
         if result.data:
             return User.from_dict(result.data[0])
         raise Exception("Failed to create user")
-
+    
+    def revoke_session(self, token_hash: str, user_id: int, expires_at: int):
+        """Record a logged-out session token, and drop records of tokens that have expired."""
+        self.client.table('revoked_session').insert(
+            {'token_hash': token_hash, 'user_id': user_id, 'expires_at': expires_at}, returning='minimal'
+        ).execute()
+        self.client.table('revoked_session').delete(returning='minimal') \
+            .lte('expires_at', int(time.time())).execute()
+    
+    def is_session_revoked(self, token_hash: str) -> bool:
+        """Check whether a session token was logged out (on any worker)."""
+        result = self.client.table('revoked_session').select('token_hash').eq('token_hash', token_hash).execute()
+        return bool(result.data)
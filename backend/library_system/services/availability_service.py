@@ -0,0 +1,210 @@
+"""Per-book availability counters maintained alongside copy status changes."""
+
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+from library_system.database.connection import DatabaseConnection
+from library_system.models.bookcopy import BookCopy
+from library_system.models.loan import Loan
+from library_system.services.book_service import IN_FILTER_CHUNK_SIZE
+from library_system.utils.enums import CopyStatus
+from library_system.utils.pagination import fetch_all
+from library_system.utils.ttl_cache import TTLCache
+
+DEFAULT_AVAILABILITY_CACHE_SIZE = 100_000
+
+# Counters are re-read from book_copy at least this often, bounding drift from
+# copy changes made by other processes
+DEFAULT_AVAILABILITY_TTL_SECONDS = 300
+
+# Copy rows fetched per request when rebuilding all counters
+REBUILD_PAGE_SIZE = 1000
+
+
+@dataclass
+class BookAvailability:
+    """Number of copies of one book in each status."""
+    book_id: int
+    available: int = 0
+    loaned: int = 0
+    reserved: int = 0
+    maintenance: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.available + self.loaned + self.reserved + self.maintenance
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), 'total': self.total}
+
+
+class AvailabilityService:
+    """
+    Per-book copy counts, loaded once and adjusted in place.
+
+    Counters are read through from book_copy with one query per chunk of
+    missing books (paged past PostgREST's max-rows), then moved between statuses under a lock as
+    copies are issued, returned and added, so showing "3 of 5 available"
+    for a page of books costs no copy rows at all once warm. Entries expire
+    after a TTL and rebuild() reloads everything from book_copy.
+    """
+
+    def __init__(self, db: DatabaseConnection, max_size: int = DEFAULT_AVAILABILITY_CACHE_SIZE,
+                 ttl_seconds: float = DEFAULT_AVAILABILITY_TTL_SECONDS):
+        """
+        Initialize availability service with database connection.
+
+        Args:
+            db: Database connection
+            max_size: Maximum number of books whose counters are kept
+            ttl_seconds: Seconds before a book's counters are re-read from book_copy
+        """
+        self.db = db
+        self.client = db.get_client()
+        self.cache = TTLCache(max_size, ttl_seconds)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    def get(self, book_id: int) -> BookAvailability:
+        """Get the counters of one book."""
+        return self.get_many([book_id])[book_id]
+
+    def get_many(self, book_ids: Iterable[int]) -> Dict[int, BookAvailability]:
+        """
+        Get the counters of several books.
+
+        Args:
+            book_ids: Book IDs (books without copies get zero counts)
+
+        Returns:
+            Dictionary mapping each book ID to its counters
+        """
+        found = {}
+        missing = []
+        for book_id in dict.fromkeys(book_ids):
+            entry = self.cache.get(book_id)
+            if entry is None:
+                missing.append(book_id)
+            else:
+                found[book_id] = entry
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        for start in range(0, len(missing), IN_FILTER_CHUNK_SIZE):
+            loaded = self._load(missing[start:start + IN_FILTER_CHUNK_SIZE])
+            with self._lock:
+                for book_id, entry in loaded.items():
+                    self.cache.set(book_id, entry)
+            found.update(loaded)
+
+        return {book_id: BookAvailability(**asdict(entry)) for book_id, entry in found.items()}
+
+    def copy_added(self, book_copy: BookCopy):
+        """BookService listener: count a new copy of a book."""
+        with self._lock:
+            entry = self.cache.get(book_copy.book_id)
+            if entry is not None:
+                field = CopyStatus(book_copy.status).value
+                setattr(entry, field, getattr(entry, field) + 1)
+
+    def book_deleted(self, book_id: int):
+        """BookService listener: forget the counters of a deleted book."""
+        self.invalidate(book_id)
+
+    def copy_moved(self, book_id: int, old_status: CopyStatus, new_status: CopyStatus):
+        """
+        Move one copy of a book from one status to another.
+
+        A counter that would go negative means the cached entry has drifted
+        from the database, so it is dropped and re-read on the next lookup.
+        """
+        old_field, new_field = CopyStatus(old_status).value, CopyStatus(new_status).value
+        with self._lock:
+            entry = self.cache.get(book_id)
+            if entry is None:
+                return
+            if getattr(entry, old_field) <= 0:
+                self.cache.pop(book_id)
+                return
+            setattr(entry, old_field, getattr(entry, old_field) - 1)
+            setattr(entry, new_field, getattr(entry, new_field) + 1)
+
+    def invalidate(self, book_id: int):
+        """Forget the counters of a book so they are re-read on the next lookup."""
+        self.cache.pop(book_id)
+
+    def loan_issued(self, loan: Loan, book_id: Optional[int] = None):
+        """LoanService listener: a copy went from available to loaned."""
+        if book_id is not None:
+            self.copy_moved(book_id, CopyStatus.AVAILABLE, CopyStatus.LOANED)
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: a copy went from loaned back to available."""
+        if book_id is not None:
+            self.copy_moved(book_id, CopyStatus.LOANED, CopyStatus.AVAILABLE)
+
+    def copy_held(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: a returned copy went from available to held for a reservation."""
+        if book_id is not None:
+            self.copy_moved(book_id, CopyStatus.AVAILABLE, CopyStatus.RESERVED)
+
+    def hold_collected(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: a held copy is being issued (its loan_issued follows)."""
+        if book_id is not None:
+            self.copy_moved(book_id, CopyStatus.RESERVED, CopyStatus.AVAILABLE)
+
+    def hold_released(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """ReservationService listener: a held copy went back on the shelf."""
+        if book_id is not None:
+            self.copy_moved(book_id, CopyStatus.RESERVED, CopyStatus.AVAILABLE)
+
+    def rebuild(self) -> int:
+        """
+        Recount every book from book_copy and replace the cached counters.
+
+        Returns:
+            Number of books with at least one copy
+        """
+        counts: Dict[int, BookAvailability] = {}
+        last_id = 0
+        while True:
+            result = self.client.table('book_copy').select('copy_id, book_id, status') \
+                .gt('copy_id', last_id).order('copy_id').limit(REBUILD_PAGE_SIZE).execute()
+            self._count(result.data, counts)
+            if len(result.data) < REBUILD_PAGE_SIZE:
+                break
+            last_id = result.data[-1]['copy_id']
+
+        with self._lock:
+            self.cache.clear()
+            for book_id, entry in counts.items():
+                self.cache.set(book_id, entry)
+        self.rebuilds += 1
+        return len(counts)
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        return {
+            'cached_books': len(self.cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rebuilds': self.rebuilds,
+        }
+
+    def _load(self, book_ids: List[int]) -> Dict[int, BookAvailability]:
+        counts = {book_id: BookAvailability(book_id) for book_id in book_ids}
+        rows = fetch_all(lambda: self.client.table('book_copy').select('copy_id, book_id, status')
+                         .in_('book_id', book_ids), order=['copy_id'])
+        self._count(rows, counts)
+        return counts
+
+    @staticmethod
+    def _count(rows: List[Dict], counts: Dict[int, BookAvailability]):
+        for row in rows:
+            entry = counts.get(row['book_id'])
+            if entry is None:
+                entry = counts[row['book_id']] = BookAvailability(row['book_id'])
+            field = CopyStatus(row['status']).value
+            setattr(entry, field, getattr(entry, field) + 1)
@@ -0,0 +1,173 @@
+"""In-process barcode -> copy -> open loan index for the circulation desk."""
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from library_system.database.connection import DatabaseConnection
+from library_system.models.bookcopy import BookCopy
+from library_system.models.loan import Loan
+from library_system.utils.enums import LoanStatus
+
+# Rows fetched per request when loading copies and open loans
+BARCODE_PAGE_SIZE = 1000
+
+OPEN_LOAN_STATUSES = [LoanStatus.ACTIVE.value, LoanStatus.OVERDUE.value]
+
+
+@dataclass
+class CopyLocation:
+    """A scanned copy and the loan it is currently out on, if any."""
+    barcode: str
+    copy_id: int
+    book_id: int
+    loan_id: Optional[int] = None
+
+    def to_dict(self):
+        return {
+            'barcode': self.barcode,
+            'copy_id': self.copy_id,
+            'book_id': self.book_id,
+            'loan_id': self.loan_id,
+            'on_loan': self.loan_id is not None,
+        }
+
+
+class BarcodeIndex:
+    """
+    Maps barcodes to copies and copies to their open loan.
+
+    Loaded once from book_copy and the open loans, then kept current as a
+    BookService and LoanService listener, so a scan at the desk resolves to
+    a loan without a query. Barcodes not in the index (copies created by
+    another process or by a bulk import) are read through from the database
+    and added. The loan found here is only a hint: writes based on it are
+    guarded by the loan's status, so a stale entry costs a retry, never a
+    wrong return.
+    """
+
+    def __init__(self, db: DatabaseConnection):
+        """
+        Initialize an empty index.
+
+        Args:
+            db: Database connection used to load the index and read through misses
+        """
+        self.db = db
+        self.client = db.get_client()
+        self._copies: Dict[str, Tuple[int, int]] = {}
+        self._barcodes: Dict[int, str] = {}
+        self._open_loans: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> int:
+        """
+        Rebuild the index from book_copy and the open loans.
+
+        Returns:
+            Number of copies indexed
+        """
+        copies, barcodes = {}, {}
+        for row in self._pages('book_copy', 'copy_id', 'copy_id, book_id, barcode'):
+            copies[row['barcode']] = (row['copy_id'], row['book_id'])
+            barcodes[row['copy_id']] = row['barcode']
+        open_loans = {
+            row['copy_id']: row['loan_id']
+            for row in self._pages('loan', 'loan_id', 'loan_id, copy_id', open_only=True)
+        }
+        with self._lock:
+            self._copies, self._barcodes, self._open_loans = copies, barcodes, open_loans
+            self.ready = True
+        return len(copies)
+
+    def lookup(self, barcode: str) -> Optional[CopyLocation]:
+        """
+        Resolve a scanned barcode.
+
+        Returns:
+            The copy and its open loan, or None if no copy has this barcode
+        """
+        with self._lock:
+            copy = self._copies.get(barcode)
+            if copy is not None:
+                self.hits += 1
+                return CopyLocation(barcode, copy[0], copy[1], self._open_loans.get(copy[0]))
+            self.misses += 1
+
+        result = self.client.table('book_copy').select('copy_id, book_id, barcode').eq('barcode', barcode).execute()
+        if not result.data:
+            return None
+        copy_id, book_id = result.data[0]['copy_id'], result.data[0]['book_id']
+        loan_id = self.find_open_loan(copy_id)
+        with self._lock:
+            self._copies[barcode] = (copy_id, book_id)
+            self._barcodes[copy_id] = barcode
+            if loan_id is not None:
+                self._open_loans[copy_id] = loan_id
+        return CopyLocation(barcode, copy_id, book_id, loan_id)
+
+    def find_open_loan(self, copy_id: int) -> Optional[int]:
+        """Read the open loan of a copy from the database and record it."""
+        result = self.client.table('loan').select('loan_id').eq('copy_id', copy_id) \
+            .in_('status', OPEN_LOAN_STATUSES).order('loan_id', desc=True).limit(1).execute()
+        loan_id = result.data[0]['loan_id'] if result.data else None
+        with self._lock:
+            if loan_id is None:
+                self._open_loans.pop(copy_id, None)
+            else:
+                self._open_loans[copy_id] = loan_id
+        return loan_id
+
+    def copy_added(self, book_copy: BookCopy):
+        """BookService listener: index a new copy."""
+        if book_copy.copy_id is None or not book_copy.barcode:
+            return
+        with self._lock:
+            self._copies[book_copy.barcode] = (book_copy.copy_id, book_copy.book_id)
+            self._barcodes[book_copy.copy_id] = book_copy.barcode
+
+    def book_deleted(self, book_id: int):
+        """BookService listener: drop the copies of a deleted book."""
+        with self._lock:
+            for barcode, (copy_id, copy_book_id) in list(self._copies.items()):
+                if copy_book_id == book_id:
+                    del self._copies[barcode]
+                    self._barcodes.pop(copy_id, None)
+                    self._open_loans.pop(copy_id, None)
+
+    def loan_issued(self, loan: Loan, book_id: Optional[int] = None):
+        """LoanService listener: record the open loan of a copy."""
+        if loan.loan_id is not None:
+            with self._lock:
+                self._open_loans[loan.copy_id] = loan.loan_id
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: the copy is back on the shelf."""
+        with self._lock:
+            if self._open_loans.get(copy_id) == loan_id:
+                del self._open_loans[copy_id]
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'copies': len(self._copies),
+                'open_loans': len(self._open_loans),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _pages(self, table: str, key: str, columns: str, open_only: bool = False):
+        last_id = 0
+        while True:
+            query = self.client.table(table).select(columns).gt(key, last_id)
+            if open_only:
+                query = query.in_('status', OPEN_LOAN_STATUSES)
+            result = query.order(key).limit(BARCODE_PAGE_SIZE).execute()
+            yield from result.data
+            if len(result.data) < BARCODE_PAGE_SIZE:
+                return
+            last_id = result.data[-1][key]
@@ -1,21 +1,84 @@
 """Book service for managing book operations."""
 
-from typing import List, Optional, Dict
+from typing import TYPE_CHECKING, List, Optional, Dict
 from library_system.models.book import Book
 from library_system.models.bookcopy import BookCopy
-from library_system.models.author import Author
-from library_system.models.category import Category
 from library_system.database.connection import DatabaseConnection
+from library_system.services.catalog_index import CatalogIndex
+from library_system.services.dimension_map import DimensionMap
+from library_system.services.entity_cache import EntityCache, read_through
 from library_system.utils.enums import CopyStatus
+from library_system.utils.pagination import Page, fetch_all, paginate, DEFAULT_PAGE_SIZE
+
+if TYPE_CHECKING:
+    from library_system.services.availability_service import AvailabilityService
+    from library_system.services.table_versions import TableVersions
+
+# Maximum number of IDs sent in a single in_() filter, keeping request URLs bounded
+IN_FILTER_CHUNK_SIZE = 500
+
+# NOT NULL columns books can be sorted on besides book_id
+BOOK_SORT_COLUMNS = ('title', 'isbn')
+
+# Columns of a book row, selected explicitly by listings
+BOOK_COLUMNS = 'book_id, isbn, title, publisher, published_year, description'
 
 
 class BookService:
     """Service for book-related operations."""
     
-    def __init__(self, db: DatabaseConnection):
-        """Initialize book service with database connection."""
+    def __init__(self, db: DatabaseConnection, catalog_index: Optional[CatalogIndex] = None,
+                 availability: Optional['AvailabilityService'] = None,
+                 versions: Optional['TableVersions'] = None, cache: Optional[EntityCache] = None):
+        """
+        Initialize book service with database connection.
+        
+        Args:
+            db: Database connection
+            catalog_index: Optional in-process search index, kept current by
+                create/update/delete and used by search_books once built
+            availability: Optional per-book copy counters, attached to enriched
+                books and registered as a listener
+            versions: Optional table version counters, bumped by every write
+                so book listings can be revalidated with an ETag
+            cache: Optional shared entity cache serving get_book, invalidated by
+                every update and delete
+        """
         self.db = db
         self.client = db.get_client()
+        self.catalog_index = catalog_index
+        self.availability = availability
+        self.versions = versions
+        self.cache = cache
+        self.authors = DimensionMap(db, 'author', 'author_id', 'full_name')
+        self.categories = DimensionMap(db, 'category', 'category_id', 'name')
+        self._listeners = []
+        if availability is not None:
+            self.add_listener(availability)
+    
+    def add_listener(self, listener):
+        """
+        Register an object notified of copy changes made through this service.
+        
+        Listeners may implement copy_added(book_copy) and book_deleted(book_id);
+        missing methods are skipped.
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: str, *args):
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+    
+    def _changed(self, book_id: Optional[int] = None, cascade: bool = False):
+        if self.versions is not None:
+            self.versions.bump('book')
+        if self.cache is not None and book_id is not None:
+            self.cache.invalidate('book', book_id)
+            if cascade:
+                # Deleting a book deletes its reservations
+                self.cache.invalidate_table('reservation')
     
     def create_book(self, book: Book, author_ids: List[int], category_ids: List[int]) -> Book:
         """
@@ -48,24 +111,53 @@ class BookService:
             book_category_data = [{'book_id': book_id, 'category_id': cid} for cid in category_ids]
             self.client.table('book_category').insert(book_category_data).execute()
         
+        if self.catalog_index is not None:
+            self.catalog_index.add(self.enrich_books([result.data[0]])[0])
+        self._changed()
+        
         return Book.from_dict(result.data[0])
     
     def get_book(self, book_id: int) -> Optional[Book]:
         """Get book by ID."""
-        result = self.client.table('book').select('*').eq('book_id', book_id).execute()
-        if result.data:
-            return Book.from_dict(result.data[0])
-        return None
+        def load():
+            result = self.client.table('book').select('*').eq('book_id', book_id).execute()
+            return result.data[0] if result.data else None
+        
+        row = read_through(self.cache, 'book', book_id, load)
+        return Book.from_dict(row) if row else None
     
     def get_all_books(self) -> List[Book]:
         """Get all books."""
         result = self.client.table('book').select('*').execute()
         return [Book.from_dict(row) for row in result.data]
     
+    def get_books_page(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                       sort: Optional[str] = None, raw: bool = False) -> Page:
+        """
+        Get one page of books.
+        
+        Args:
+            limit: Maximum number of books
+            after: Cursor returned with the previous page
+            sort: 'book_id' (default), 'title' or 'isbn'; prefix '-' for descending
+            raw: Return the rows as fetched (same keys and values as Book.to_dict())
+                instead of building Book objects
+            
+        Returns:
+            Page of Book objects, or of row dictionaries if raw
+        """
+        query = self.client.table('book').select(BOOK_COLUMNS)
+        rows, next_cursor = paginate(query, 'book_id', limit, after, sort, BOOK_SORT_COLUMNS)
+        return Page(rows if raw else [Book.from_dict(row) for row in rows], next_cursor)
+    
     def update_book(self, book_id: int, book: Book) -> Optional[Book]:
         """Update book record."""
         result = self.client.table('book').update(book.to_dict()).eq('book_id', book_id).execute()
         if result.data:
+            if self.catalog_index is not None:
+                row = result.data[0]
+                self.catalog_index.update(book_id, title=row.get('title'), isbn=row.get('isbn'))
+            self._changed(book_id)
             return Book.from_dict(result.data[0])
         return None
     
@@ -90,6 +182,10 @@ class BookService:
         
         # Delete book (cascade will handle related records)
         self.client.table('book').delete().eq('book_id', book_id).execute()
+        if self.catalog_index is not None:
+            self.catalog_index.remove(book_id)
+        self._notify('book_deleted', book_id)
+        self._changed(book_id, cascade=True)
         return True
     
     def search_books(self, isbn: Optional[str] = None, title: Optional[str] = None,
@@ -100,6 +196,22 @@ class BookService:
         Returns:
             List of books with author and category information
         """
+        if self.catalog_index is not None and self.catalog_index.ready:
+            return self.get_books_enriched(self.catalog_index.search(isbn=isbn, title=title, author=author, category=category))
+        return self.enrich_books(self.search_book_rows(isbn=isbn, title=title, author=author, category=category))
+    
+    def search_book_rows(self, isbn: Optional[str] = None, title: Optional[str] = None,
+                         author: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """
+        Search and filter books without enriching them.
+        
+        Returns:
+            List of matching book rows
+        """
+        if self.catalog_index is not None and self.catalog_index.ready:
+            book_ids = self.catalog_index.search(isbn=isbn, title=title, author=author, category=category)
+            return self.get_book_rows(book_ids)
+        
         query = self.client.table('book').select('*')
         
         if isbn:
@@ -112,8 +224,7 @@ class BookService:
         
         # Filter by author if specified
         if author:
-            author_result = self.client.table('author').select('author_id').ilike('full_name', f'%{author}%').execute()
-            author_ids = [a['author_id'] for a in author_result.data]
+            author_ids = self.authors.search(author)
             if author_ids:
                 book_author_result = self.client.table('book_author').select('book_id').in_('author_id', author_ids).execute()
                 book_ids = {ba['book_id'] for ba in book_author_result.data}
@@ -123,8 +234,7 @@ class BookService:
         
         # Filter by category if specified
         if category:
-            category_result = self.client.table('category').select('category_id').ilike('name', f'%{category}%').execute()
-            category_ids = [c['category_id'] for c in category_result.data]
+            category_ids = self.categories.search(category)
             if category_ids:
                 book_category_result = self.client.table('book_category').select('book_id').in_('category_id', category_ids).execute()
                 book_ids = {bc['book_id'] for bc in book_category_result.data}
@@ -132,30 +242,124 @@ class BookService:
             else:
                 books = []
         
-        # Enrich with author and category info
-        enriched_books = []
-        for book in books:
-            book_id = book['book_id']
-            
-            # Get authors
-            author_ids_result = self.client.table('book_author').select('author_id').eq('book_id', book_id).execute()
-            author_ids = [a['author_id'] for a in author_ids_result.data]
-            authors_result = self.client.table('author').select('*').in_('author_id', author_ids).execute() if author_ids else []
-            authors = [Author.from_dict(a).full_name for a in authors_result.data] if author_ids else []
+        return books
+    
+    def build_catalog_index(self) -> int:
+        """
+        Load every book into the catalog index.
+        
+        Returns:
+            Number of books indexed
+        """
+        if self.catalog_index is None:
+            return 0
+        books = [book.to_dict() for book in self.get_all_books()]
+        self.catalog_index.build(self.enrich_books(books))
+        return len(self.catalog_index)
+    
+    def get_books_enriched(self, book_ids: List[int]) -> List[Dict]:
+        """
+        Get books by ID with author and category information attached.
+        
+        Args:
+            book_ids: IDs of the books to fetch
             
-            # Get categories
-            category_ids_result = self.client.table('book_category').select('category_id').eq('book_id', book_id).execute()
-            category_ids = [c['category_id'] for c in category_ids_result.data]
-            categories_result = self.client.table('category').select('*').in_('category_id', category_ids).execute() if category_ids else []
-            categories = [Category.from_dict(c).name for c in categories_result.data] if category_ids else []
+        Returns:
+            List of enriched books in the order of book_ids (missing IDs are skipped)
+        """
+        return self.enrich_books(self.get_book_rows(book_ids))
+    
+    def get_book_rows(self, book_ids: List[int]) -> List[Dict]:
+        """
+        Get book rows by ID.
+        
+        Returns:
+            List of book rows in the order of book_ids (missing IDs are skipped)
+        """
+        if not book_ids:
+            return []
+        
+        rows_by_id = {}
+        for chunk in self._chunks(list(dict.fromkeys(book_ids))):
+            result = self.client.table('book').select('*').in_('book_id', chunk).execute()
+            for row in result.data:
+                rows_by_id[row['book_id']] = row
+        
+        return [rows_by_id[book_id] for book_id in dict.fromkeys(book_ids) if book_id in rows_by_id]
+    
+    def enrich_books(self, books: List[Dict]) -> List[Dict]:
+        """
+        Attach author and category names to book rows.
+        
+        Uses one query per junction table (per chunk of IDs, and per
+        thousand links) regardless of how many books are passed in; names
+        come from the in-memory author and category maps.
+        With availability counters configured, each book also gets its copy
+        counts.
+        
+        Args:
+            books: Book rows as dictionaries
             
-            enriched_books.append({
+        Returns:
+            Copies of the rows with 'authors' and 'categories' lists added
+        """
+        book_ids = [book['book_id'] for book in books]
+        availability_by_book = self.availability_counts(book_ids)
+        return self.attach_details(books, self.author_names(book_ids), self.category_names(book_ids),
+                                   availability_by_book)
+    
+    def author_names(self, book_ids: List[int]) -> Dict[int, List[str]]:
+        """Map each book ID to the names of its authors."""
+        return self._names_by_book(book_ids, 'book_author', 'author_id', self.authors)
+    
+    def category_names(self, book_ids: List[int]) -> Dict[int, List[str]]:
+        """Map each book ID to the names of its categories."""
+        return self._names_by_book(book_ids, 'book_category', 'category_id', self.categories)
+    
+    def availability_counts(self, book_ids: List[int]) -> Optional[Dict[int, Dict]]:
+        """Map each book ID to its copy counts, or None without availability counters."""
+        if self.availability is None or not book_ids:
+            return None
+        return {book_id: counts.to_dict() for book_id, counts in self.availability.get_many(book_ids).items()}
+    
+    @staticmethod
+    def attach_details(books: List[Dict], authors_by_book: Dict[int, List[str]],
+                       categories_by_book: Dict[int, List[str]],
+                       availability_by_book: Optional[Dict[int, Dict]] = None) -> List[Dict]:
+        """Return copies of book rows with 'authors', 'categories' and, if given, 'availability' added."""
+        enriched = []
+        for book in books:
+            row = {
                 **book,
-                'authors': authors,
-                'categories': categories
-            })
+                'authors': authors_by_book.get(book['book_id'], []),
+                'categories': categories_by_book.get(book['book_id'], [])
+            }
+            if availability_by_book is not None:
+                row['availability'] = availability_by_book.get(book['book_id'])
+            enriched.append(row)
+        return enriched
+    
+    def _names_by_book(self, book_ids: List[int], link_table: str, link_column: str,
+                       dimension: DimensionMap) -> Dict[int, List[str]]:
+        """Map each book ID to the names linked to it through a junction table."""
+        links = []
+        for chunk in self._chunks(book_ids):
+            links.extend(fetch_all(lambda: self.client.table(link_table).select(f'book_id, {link_column}')
+                                   .in_('book_id', chunk), order=['book_id', link_column]))
         
-        return enriched_books
+        names = dimension.names(link[link_column] for link in links) if links else {}
+        
+        names_by_book = {}
+        for link in links:
+            if link[link_column] in names:
+                names_by_book.setdefault(link['book_id'], []).append(names[link[link_column]])
+        return names_by_book
+    
+    @staticmethod
+    def _chunks(ids: List[int], size: int = IN_FILTER_CHUNK_SIZE):
+        """Split IDs into chunks small enough for a single in_() filter."""
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
     
     def get_available_copies(self, book_id: int) -> List[BookCopy]:
         """Get available copies of a book."""
@@ -166,6 +370,9 @@ class BookService:
         """Add a new copy of a book."""
         result = self.client.table('book_copy').insert(book_copy.to_dict()).execute()
         if result.data:
-            return BookCopy.from_dict(result.data[0])
+            created = BookCopy.from_dict(result.data[0])
+            self._notify('copy_added', created)
+            self._changed()
+            return created
         raise Exception("Failed to create book copy")
 
@@ -0,0 +1,156 @@
+"""In-process trigram index for catalog search."""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+# Searchable fields and the enriched book keys they are read from
+INDEXED_FIELDS = {
+    'isbn': 'isbn',
+    'title': 'title',
+    'author': 'authors',
+    'category': 'categories',
+}
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class CatalogIndex:
+    """
+    Trigram postings over book titles, ISBNs, author names and category names.
+
+    Matching follows the case-insensitive substring semantics of the
+    ``ilike '%term%'`` queries it replaces: postings narrow the candidates and
+    each candidate is then checked for the full substring. Terms shorter than
+    three characters fall back to a scan of the indexed values.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._values: Dict[int, Dict[str, List[str]]] = {}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: {} for field in INDEXED_FIELDS}
+        self._lock = threading.RLock()
+        self.ready = False
+
+    def build(self, books: Iterable[Dict]):
+        """
+        Replace the index contents with the given books.
+
+        Args:
+            books: Enriched book rows (with 'authors' and 'categories' lists)
+        """
+        with self._lock:
+            self._values.clear()
+            for postings in self._postings.values():
+                postings.clear()
+            for book in books:
+                self._add(book)
+            self.ready = True
+
+    def add(self, book: Dict):
+        """Index a book, replacing any previous entry for the same ID."""
+        with self._lock:
+            self._remove(book['book_id'])
+            self._add(book)
+
+    def update(self, book_id: int, **values):
+        """
+        Re-index selected fields of a book, keeping the others.
+
+        Args:
+            book_id: ID of the book
+            values: Enriched book keys to replace (e.g. title='...', authors=[...])
+        """
+        with self._lock:
+            current = self._values.get(book_id)
+            if current is None:
+                return
+            book = {'book_id': book_id}
+            for field, key in INDEXED_FIELDS.items():
+                book[key] = values[key] if key in values else current[field]
+            self._remove(book_id)
+            self._add(book)
+
+    def remove(self, book_id: int):
+        """Remove a book from the index."""
+        with self._lock:
+            self._remove(book_id)
+
+    def search(self, isbn: Optional[str] = None, title: Optional[str] = None,
+               author: Optional[str] = None, category: Optional[str] = None) -> List[int]:
+        """
+        Find books matching every given term.
+
+        Returns:
+            Matching book IDs in ascending order
+        """
+        terms = {'isbn': isbn, 'title': title, 'author': author, 'category': category}
+        with self._lock:
+            matches: Optional[Set[int]] = None
+            for field, term in terms.items():
+                if not term:
+                    continue
+                found = self._match(field, term.lower(), matches)
+                matches = found if matches is None else matches & found
+                if not matches:
+                    return []
+            if matches is None:
+                matches = set(self._values)
+            return sorted(matches)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _match(self, field: str, term: str, within: Optional[Set[int]]) -> Set[int]:
+        """Return IDs whose values for field contain term."""
+        if len(term) >= 3:
+            postings = self._postings[field]
+            candidates = None
+            for gram in sorted(trigrams(term), key=lambda g: len(postings.get(g, ()))):
+                ids = postings.get(gram)
+                if not ids:
+                    return set()
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return set()
+        else:
+            candidates = set(self._values)
+
+        if within is not None:
+            candidates &= within
+        return {
+            book_id for book_id in candidates
+            if any(term in value for value in self._values[book_id][field])
+        }
+
+    def _add(self, book: Dict):
+        book_id = book['book_id']
+        values = {}
+        for field, key in INDEXED_FIELDS.items():
+            raw = book.get(key)
+            if raw is None:
+                raw = []
+            elif isinstance(raw, str):
+                raw = [raw]
+            values[field] = [value.lower() for value in raw if value]
+            postings = self._postings[field]
+            for value in values[field]:
+                for gram in trigrams(value):
+                    postings.setdefault(gram, set()).add(book_id)
+        self._values[book_id] = values
+
+    def _remove(self, book_id: int):
+        values = self._values.pop(book_id, None)
+        if values is None:
+            return
+        for field, field_values in values.items():
+            postings = self._postings[field]
+            for value in field_values:
+                for gram in trigrams(value):
+                    ids = postings.get(gram)
+                    if ids is not None:
+                        ids.discard(book_id)
+                        if not ids:
+                            del postings[gram]
@@ -0,0 +1,330 @@
+"""Daily circulation counters rolled up by day, category and librarian."""
+
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from library_system.database.connection import DatabaseConnection
+from library_system.models.loan import Loan
+from library_system.services.book_service import IN_FILTER_CHUNK_SIZE
+from library_system.services.dimension_map import DimensionMap
+from library_system.services.loan_service import LOAN_TABLE_PAGE_SIZE
+from library_system.utils.pagination import fetch_all
+
+# Counters are rebuilt from the loan history at least this often, picking up
+# loans issued and returned by other processes
+DEFAULT_STATS_REBUILD_SECONDS = 3600
+
+# Days covered by a statistics query when no start date is given
+DEFAULT_STATS_DAYS = 30
+
+# Longest date range a statistics query may cover
+MAX_STATS_DAYS = 366
+
+STATS_LOAN_COLUMNS = 'loan_id, copy_id, librarian_id, issue_date, return_date'
+
+
+class _Rollup:
+    """Counters keyed by day ordinal, then by category or librarian."""
+
+    def __init__(self):
+        self.issued: Dict[int, int] = {}
+        self.returned: Dict[int, int] = {}
+        self.category_issued: Dict[int, Dict[int, int]] = {}
+        self.category_returned: Dict[int, Dict[int, int]] = {}
+        self.librarian_issued: Dict[int, Dict[int, int]] = {}
+
+    def add_issue(self, day: int, librarian_id: int, category_ids: Iterable[int]):
+        self.issued[day] = self.issued.get(day, 0) + 1
+        _bump(self.librarian_issued, day, [librarian_id])
+        _bump(self.category_issued, day, category_ids)
+
+    def add_return(self, day: int, category_ids: Iterable[int]):
+        self.returned[day] = self.returned.get(day, 0) + 1
+        _bump(self.category_returned, day, category_ids)
+
+
+def _bump(counters: Dict[int, Dict[int, int]], day: int, keys: Iterable[int]):
+    by_key = counters.get(day)
+    if by_key is None:
+        by_key = counters[day] = {}
+    for key in keys:
+        by_key[key] = by_key.get(key, 0) + 1
+
+
+def _sum_days(counters: Dict[int, Dict[int, int]], days: range) -> Dict[int, int]:
+    totals: Dict[int, int] = {}
+    for day in days:
+        for key, count in counters.get(day, {}).items():
+            totals[key] = totals.get(key, 0) + count
+    return totals
+
+
+class CirculationStats:
+    """
+    Loans issued and returned per day, per category and per librarian.
+
+    The counters are built from the loan history in one streaming pass, a
+    page of loans at a time, and then adjusted in place as loans are issued
+    and returned through the LoanService (registered as a listener). A
+    query sums at most MAX_STATS_DAYS days of counters, so it costs the same
+    whatever the size of the loan table. Loans are counted under the
+    categories their book had when they were counted; rebuild() recounts
+    everything from the database. Loans issued and returned while a rebuild
+    reads the history are buffered and applied to the new counters unless
+    the rebuild already read them.
+    """
+
+    def __init__(self, db: DatabaseConnection, categories: Optional[DimensionMap] = None):
+        """
+        Initialize empty statistics; they are built on first use or by rebuild().
+
+        Args:
+            db: Database connection
+            categories: Shared category map naming the categories
+                (a new one is created if omitted)
+        """
+        self.client = db.get_client()
+        self.categories = categories or DimensionMap(db, 'category', 'category_id', 'name')
+        self._rollup: Optional[_Rollup] = None
+        # Events seen while a rebuild runs: ('issue' | 'return', loan_id, day, librarian_id, category_ids)
+        self._pending: Optional[List[Tuple]] = None
+        self._book_of_copy: Dict[int, int] = {}
+        self._categories_of_book: Dict[int, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+        self.rebuilds = 0
+        self.last_rebuild_loans = 0
+        self.last_rebuild_ms = 0.0
+        self.events = 0
+
+    def rebuild(self) -> int:
+        """
+        Recount every loan in the history and replace the counters.
+
+        Events arriving during the read are buffered. Before the swap each
+        one is checked against the loans the read saw from the day the
+        rebuild started: an issue is applied if its loan was not read, a
+        return if its loan was not read as returned.
+
+        Returns:
+            Number of loans counted
+        """
+        with self._rebuild_lock:
+            start = time.perf_counter()
+            since = date.today().toordinal()
+            with self._lock:
+                self._categories_of_book.clear()
+                self._pending = []
+            rollup = _Rollup()
+            recent: Dict[int, bool] = {}
+            loans = 0
+            last_id = 0
+            try:
+                while True:
+                    rows = self.client.table('loan').select(STATS_LOAN_COLUMNS).gt('loan_id', last_id) \
+                        .order('loan_id').limit(LOAN_TABLE_PAGE_SIZE).execute().data
+                    self._count(rows, rollup, since, recent)
+                    loans += len(rows)
+                    if len(rows) < LOAN_TABLE_PAGE_SIZE:
+                        break
+                    last_id = rows[-1]['loan_id']
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+
+            with self._lock:
+                for kind, loan_id, day, librarian_id, category_ids in self._pending:
+                    if kind == 'issue' and loan_id not in recent:
+                        rollup.add_issue(day, librarian_id, category_ids)
+                    elif kind == 'return' and not recent.get(loan_id):
+                        rollup.add_return(day, category_ids)
+                self._pending = None
+                self._rollup = rollup
+            self.rebuilds += 1
+            self.last_rebuild_loans = loans
+            self.last_rebuild_ms = (time.perf_counter() - start) * 1000
+            return loans
+
+    def circulation(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+        """
+        Loans issued and returned on each day of a date range.
+
+        Args:
+            start: First day (defaults to DEFAULT_STATS_DAYS days before end)
+            end: Last day (defaults to today)
+
+        Returns:
+            Dictionary with the range, one entry per day and the totals
+
+        Raises:
+            ValueError: If start is after end or the range is longer than MAX_STATS_DAYS
+        """
+        start, end, days = self._days(start, end)
+        rollup = self._current()
+        with self._lock:
+            rows = [{
+                'date': date.fromordinal(day).isoformat(),
+                'issued': rollup.issued.get(day, 0),
+                'returned': rollup.returned.get(day, 0),
+            } for day in days]
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'issued': sum(row['issued'] for row in rows),
+            'returned': sum(row['returned'] for row in rows),
+            'days': rows,
+        }
+
+    def by_category(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+        """
+        Loans issued and returned per category over a date range, busiest first.
+
+        A loan of a book in several categories counts once in each of them.
+
+        Raises:
+            ValueError: If start is after end or the range is longer than MAX_STATS_DAYS
+        """
+        start, end, days = self._days(start, end)
+        rollup = self._current()
+        with self._lock:
+            issued = _sum_days(rollup.category_issued, days)
+            returned = _sum_days(rollup.category_returned, days)
+        category_ids = sorted(issued.keys() | returned.keys(),
+                              key=lambda category_id: (-issued.get(category_id, 0), category_id))
+        names = self.categories.names(category_ids) if category_ids else {}
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'categories': [{
+                'category_id': category_id,
+                'name': names.get(category_id),
+                'issued': issued.get(category_id, 0),
+                'returned': returned.get(category_id, 0),
+            } for category_id in category_ids],
+        }
+
+    def by_librarian(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+        """
+        Loans issued per librarian over a date range, busiest first.
+
+        Raises:
+            ValueError: If start is after end or the range is longer than MAX_STATS_DAYS
+        """
+        start, end, days = self._days(start, end)
+        rollup = self._current()
+        with self._lock:
+            issued = _sum_days(rollup.librarian_issued, days)
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'librarians': [{'librarian_id': librarian_id, 'issued': count}
+                           for librarian_id, count in sorted(issued.items(), key=lambda item: (-item[1], item[0]))],
+        }
+
+    def loan_issued(self, loan: Loan, book_id: Optional[int] = None):
+        """LoanService listener: count a new loan on its issue date."""
+        if self._rollup is None and self._pending is None:
+            return
+        if book_id is None:
+            book_id = self._books_of([loan.copy_id]).get(loan.copy_id)
+        category_ids = self._categories_of([book_id]).get(book_id, ()) if book_id is not None else ()
+        day = (loan.issue_date or date.today()).toordinal()
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(('issue', loan.loan_id, day, loan.librarian_id, category_ids))
+            if self._rollup is not None:
+                self._rollup.add_issue(day, loan.librarian_id, category_ids)
+            self.events += 1
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: count a return today."""
+        if self._rollup is None and self._pending is None:
+            return
+        if book_id is None:
+            book_id = self._books_of([copy_id]).get(copy_id)
+        category_ids = self._categories_of([book_id]).get(book_id, ()) if book_id is not None else ()
+        day = date.today().toordinal()
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(('return', loan_id, day, None, category_ids))
+            if self._rollup is not None:
+                self._rollup.add_return(day, category_ids)
+            self.events += 1
+
+    def book_deleted(self, book_id: int):
+        """BookService listener: forget the categories of a deleted book."""
+        with self._lock:
+            self._categories_of_book.pop(book_id, None)
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            days = len(self._rollup.issued.keys() | self._rollup.returned.keys()) if self._rollup else 0
+        return {
+            'rebuilds': self.rebuilds,
+            'last_rebuild_loans': self.last_rebuild_loans,
+            'last_rebuild_ms': round(self.last_rebuild_ms, 2),
+            'days': days,
+            'events': self.events,
+        }
+
+    def _current(self) -> _Rollup:
+        if self._rollup is None:
+            self.rebuild()
+        return self._rollup
+
+    @staticmethod
+    def _days(start: Optional[date], end: Optional[date]) -> Tuple[date, date, range]:
+        end = end or date.today()
+        start = start or end - timedelta(days=DEFAULT_STATS_DAYS - 1)
+        if start > end:
+            raise ValueError("start must not be after end")
+        if (end - start).days >= MAX_STATS_DAYS:
+            raise ValueError(f"Date range must not exceed {MAX_STATS_DAYS} days")
+        return start, end, range(start.toordinal(), end.toordinal() + 1)
+
+    def _count(self, rows: List[Dict], rollup: _Rollup, since: int, recent: Dict[int, bool]):
+        """Count a page of loans, noting in recent whether each one issued or returned since then was returned."""
+        books = self._books_of([row['copy_id'] for row in rows])
+        categories = self._categories_of(list(books.values()))
+        for row in rows:
+            category_ids = categories.get(books.get(row['copy_id']), ())
+            issued = date.fromisoformat(str(row['issue_date'])).toordinal()
+            rollup.add_issue(issued, row['librarian_id'], category_ids)
+            returned = date.fromisoformat(str(row['return_date'])).toordinal() if row.get('return_date') else None
+            if returned is not None:
+                rollup.add_return(returned, category_ids)
+            if issued >= since or (returned is not None and returned >= since):
+                recent[row['loan_id']] = returned is not None
+
+    def _books_of(self, copy_ids: List[int]) -> Dict[int, int]:
+        """Map copy IDs to book IDs, reading through copies not seen before."""
+        with self._lock:
+            missing = [copy_id for copy_id in dict.fromkeys(copy_ids) if copy_id not in self._book_of_copy]
+        for start in range(0, len(missing), IN_FILTER_CHUNK_SIZE):
+            result = self.client.table('book_copy').select('copy_id, book_id') \
+                .in_('copy_id', missing[start:start + IN_FILTER_CHUNK_SIZE]).execute()
+            with self._lock:
+                self._book_of_copy.update((row['copy_id'], row['book_id']) for row in result.data)
+        with self._lock:
+            return {copy_id: self._book_of_copy[copy_id] for copy_id in copy_ids if copy_id in self._book_of_copy}
+
+    def _categories_of(self, book_ids: List[int]) -> Dict[int, Tuple[int, ...]]:
+        """Map book IDs to their category IDs, reading through books not seen before."""
+        with self._lock:
+            missing = [book_id for book_id in dict.fromkeys(book_ids) if book_id not in self._categories_of_book]
+        for start in range(0, len(missing), IN_FILTER_CHUNK_SIZE):
+            chunk = missing[start:start + IN_FILTER_CHUNK_SIZE]
+            links: Dict[int, List[int]] = {book_id: [] for book_id in chunk}
+            rows = fetch_all(lambda: self.client.table('book_category').select('book_id, category_id')
+                             .in_('book_id', chunk), order=['book_id', 'category_id'])
+            for row in rows:
+                links[row['book_id']].append(row['category_id'])
+            with self._lock:
+                self._categories_of_book.update((book_id, tuple(ids)) for book_id, ids in links.items())
+        with self._lock:
+            return {book_id: self._categories_of_book[book_id] for book_id in book_ids
+                    if book_id in self._categories_of_book}
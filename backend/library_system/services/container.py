@@ -0,0 +1,181 @@
+"""Service container holding the shared connection and service instances."""
+
+import os
+from typing import Dict, Optional
+from anyio import CapacityLimiter
+from library_system.database.connection import DatabaseConnection, DEFAULT_POOL_SIZE
+from library_system.services.book_service import BookService
+from library_system.services.catalog_index import CatalogIndex
+from library_system.services.member_service import MemberService
+from library_system.services.loan_service import LoanService
+from library_system.services.auth_service import AuthService
+from library_system.services.reservation_service import ReservationService
+from library_system.services.session_service import SessionService
+from library_system.services.import_service import ImportService
+from library_system.services.overdue_sweeper import OverdueSweeper
+from library_system.services.reservation_sweeper import ReservationSweeper
+from library_system.services.barcode_index import BarcodeIndex
+from library_system.services.availability_service import (
+    AvailabilityService, DEFAULT_AVAILABILITY_CACHE_SIZE, DEFAULT_AVAILABILITY_TTL_SECONDS
+)
+from library_system.services.table_versions import TableVersions, DEFAULT_VERSION_MAX_AGE_SECONDS
+from library_system.services.entity_cache import EntityCache, DEFAULT_ENTITY_CACHE_SIZE, DEFAULT_ENTITY_TTL_SECONDS
+from library_system.services.hold_queue import HoldQueue
+from library_system.services.member_summary import MemberSummaryService
+from library_system.services.fine_service import FineService, DEFAULT_FINES_MAX_AGE_SECONDS
+from library_system.services.circulation_stats import CirculationStats, DEFAULT_STATS_REBUILD_SECONDS
+from library_system.services.async_services import (
+    AsyncBookService, AsyncMemberService, AsyncLoanService,
+    AsyncAuthService, AsyncReservationService, AsyncSessionService, AsyncImportService,
+    AsyncAvailabilityService, AsyncMemberSummaryService, AsyncFineService, AsyncCirculationStats
+)
+from library_system.utils.scheduler import PeriodicTask
+
+DEFAULT_OVERDUE_SWEEP_SECONDS = 60
+DEFAULT_RESERVATION_SWEEP_SECONDS = 60
+
+
+class ServiceContainer:
+    """
+    Owns one database connection and one instance of each service.
+
+    Services hold only the client and process-local caches, so a single
+    container can be shared by every request handled by a worker process.
+    """
+
+    def __init__(self, db: DatabaseConnection, catalog_index: Optional[bool] = None,
+                 threadpool_size: Optional[int] = None):
+        """
+        Initialize services on top of a shared database connection.
+
+        Args:
+            db: Shared database connection
+            catalog_index: Serve book search from an in-process index
+                (defaults to the CATALOG_INDEX env var)
+            threadpool_size: Maximum concurrent database calls from the async services
+                (defaults to DB_THREADPOOL_SIZE, then DB_POOL_SIZE env var, or 10)
+        """
+        if catalog_index is None:
+            catalog_index = os.getenv('CATALOG_INDEX', '').lower() in ('1', 'true', 'yes')
+        if threadpool_size is None:
+            threadpool_size = int(os.getenv('DB_THREADPOOL_SIZE') or os.getenv('DB_POOL_SIZE') or DEFAULT_POOL_SIZE)
+
+        self.db = db
+        self.availability_service = AvailabilityService(
+            db,
+            max_size=int(os.getenv('AVAILABILITY_CACHE_SIZE', DEFAULT_AVAILABILITY_CACHE_SIZE)),
+            ttl_seconds=float(os.getenv('AVAILABILITY_TTL_SECONDS', DEFAULT_AVAILABILITY_TTL_SECONDS))
+        )
+        self.table_versions = TableVersions(
+            max_age_seconds=float(os.getenv('ETAG_MAX_AGE_SECONDS', DEFAULT_VERSION_MAX_AGE_SECONDS))
+        )
+        self.entity_cache = EntityCache(
+            max_size=int(os.getenv('ENTITY_CACHE_SIZE', DEFAULT_ENTITY_CACHE_SIZE)),
+            ttl_seconds=float(os.getenv('ENTITY_CACHE_TTL_SECONDS', DEFAULT_ENTITY_TTL_SECONDS))
+        )
+        self.book_service = BookService(db, catalog_index=CatalogIndex() if catalog_index else None,
+                                        availability=self.availability_service, versions=self.table_versions,
+                                        cache=self.entity_cache)
+        self.barcode_index = BarcodeIndex(db)
+        self.book_service.add_listener(self.barcode_index)
+        self.hold_queue = HoldQueue(db)
+        self.reservation_service = ReservationService(db, cache=self.entity_cache, hold_queue=self.hold_queue)
+        self.reservation_service.add_listener(self.availability_service)
+        self.reservation_service.add_listener(self.table_versions)
+        self.member_service = MemberService(db, versions=self.table_versions, cache=self.entity_cache,
+                                            reservation_service=self.reservation_service)
+        self.loan_service = LoanService(db, book_service=self.book_service, barcode_index=self.barcode_index,
+                                        cache=self.entity_cache, hold_queue=self.hold_queue)
+        self.loan_service.add_listener(self.availability_service)
+        self.loan_service.add_listener(self.table_versions)
+        self.auth_service = AuthService(db)
+        self.session_service = SessionService(self.auth_service)
+        self.import_service = ImportService(db, book_service=self.book_service)
+        self.member_summary_service = MemberSummaryService(db, member_service=self.member_service,
+                                                           hold_queue=self.hold_queue)
+        self.fine_service = FineService(
+            self.loan_service,
+            max_age_seconds=float(os.getenv('FINES_MAX_AGE_SECONDS', DEFAULT_FINES_MAX_AGE_SECONDS))
+        )
+        self.loan_service.add_listener(self.fine_service)
+        self.circulation_stats = CirculationStats(db, categories=self.book_service.categories)
+        self.loan_service.add_listener(self.circulation_stats)
+        self.book_service.add_listener(self.circulation_stats)
+
+        # Async facades for the API server, sharing one bounded threadpool
+        self.limiter = CapacityLimiter(threadpool_size)
+        self.async_book_service = AsyncBookService(self.book_service, self.limiter)
+        self.async_member_service = AsyncMemberService(self.member_service, self.limiter)
+        self.async_loan_service = AsyncLoanService(self.loan_service, self.limiter)
+        self.async_auth_service = AsyncAuthService(self.auth_service, self.limiter)
+        self.async_reservation_service = AsyncReservationService(self.reservation_service, self.limiter)
+        self.async_session_service = AsyncSessionService(self.session_service, self.limiter)
+        self.async_import_service = AsyncImportService(self.import_service, self.limiter)
+        self.async_availability_service = AsyncAvailabilityService(self.availability_service, self.limiter)
+        self.async_member_summary_service = AsyncMemberSummaryService(self.member_summary_service, self.limiter)
+        self.async_fine_service = AsyncFineService(self.fine_service, self.limiter)
+        self.async_circulation_stats = AsyncCirculationStats(self.circulation_stats, self.limiter)
+
+        # Background jobs, started by the API server (OVERDUE_SWEEP_SECONDS=0,
+        # RESERVATION_SWEEP_SECONDS=0 or STATS_REBUILD_SECONDS=0 disables a job)
+        self.overdue_sweeper = OverdueSweeper(self.loan_service)
+        self.loan_service.add_listener(self.overdue_sweeper)
+        self.reservation_sweeper = ReservationSweeper(self.reservation_service)
+        self.tasks: Dict[str, PeriodicTask] = {}
+        sweep_seconds = float(os.getenv('OVERDUE_SWEEP_SECONDS', DEFAULT_OVERDUE_SWEEP_SECONDS))
+        if sweep_seconds > 0:
+            self.tasks['overdue_sweeper'] = PeriodicTask(
+                'overdue_sweeper', self.overdue_sweeper.sweep, sweep_seconds, limiter=self.limiter)
+        sweep_seconds = float(os.getenv('RESERVATION_SWEEP_SECONDS', DEFAULT_RESERVATION_SWEEP_SECONDS))
+        if sweep_seconds > 0:
+            self.tasks['reservation_sweeper'] = PeriodicTask(
+                'reservation_sweeper', self.reservation_sweeper.sweep, sweep_seconds, limiter=self.limiter)
+        rebuild_seconds = float(os.getenv('STATS_REBUILD_SECONDS', DEFAULT_STATS_REBUILD_SECONDS))
+        if rebuild_seconds > 0:
+            self.tasks['circulation_stats'] = PeriodicTask(
+                'circulation_stats', self.circulation_stats.rebuild, rebuild_seconds, limiter=self.limiter)
+
+    @classmethod
+    def from_env(cls, pool_size: Optional[int] = None, keepalive: Optional[float] = None) -> 'ServiceContainer':
+        """Create a container from SUPABASE_URL/SUPABASE_KEY and pool settings."""
+        return cls(DatabaseConnection(pool_size=pool_size, keepalive=keepalive))
+
+    def warm_up(self):
+        """Build in-process indexes before the first request is served."""
+        self.book_service.build_catalog_index()
+        self.barcode_index.load()
+
+    def start_background_tasks(self):
+        """Start the periodic jobs on the running event loop."""
+        for task in self.tasks.values():
+            task.start()
+
+    async def stop_background_tasks(self):
+        """Stop the periodic jobs."""
+        for task in self.tasks.values():
+            await task.stop()
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Metrics of the background jobs and in-process caches."""
+        metrics = {
+            'overdue_sweeper': self.overdue_sweeper.metrics(),
+            'reservation_sweeper': self.reservation_sweeper.metrics(),
+            'availability': self.availability_service.metrics(),
+            'barcode_index': self.barcode_index.metrics(),
+            'table_versions': self.table_versions.metrics(),
+            'entity_cache': self.entity_cache.metrics(),
+            'hold_queue': self.hold_queue.metrics(),
+            'fines': self.fine_service.metrics(),
+            'circulation_stats': self.circulation_stats.metrics(),
+            'dimensions': {
+                'author': self.book_service.authors.metrics(),
+                'category': self.book_service.categories.metrics()
+            }
+        }
+        for name, task in self.tasks.items():
+            metrics.setdefault(name, {})['task'] = task.metrics()
+        return metrics
+
+    def close(self):
+        """Release the underlying connection pool."""
+        self.db.close()
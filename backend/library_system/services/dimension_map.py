@@ -0,0 +1,141 @@
+"""In-memory maps of the small author and category dimension tables."""
+
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from library_system.database.connection import DatabaseConnection
+
+# Rows fetched per request when loading a dimension table
+DIMENSION_PAGE_SIZE = 1000
+
+# Maximum number of unknown IDs read through in a single in_() filter
+READ_THROUGH_CHUNK_SIZE = 500
+
+# Maps are reloaded at least this often, picking up renames made by other processes
+DEFAULT_DIMENSION_TTL_SECONDS = 600
+
+
+class DimensionMap:
+    """
+    id -> name and name -> ids for one dimension table (authors or categories).
+
+    The whole table is loaded on first use and kept until the version is
+    bumped by a write to the table or the TTL passes, so name lookups for
+    enrichment and name filters for search cost no round trip. IDs that are
+    not in the map (rows inserted by another process) are read through and
+    added.
+    """
+
+    def __init__(self, db: DatabaseConnection, table: str, id_column: str, name_column: str,
+                 ttl_seconds: float = DEFAULT_DIMENSION_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize an empty map.
+
+        Args:
+            db: Database connection
+            table: Dimension table name
+            id_column: Primary key column
+            name_column: Column holding the display name
+            ttl_seconds: Seconds before the map is reloaded even without a bump
+            clock: Time source (monotonic by default, replaceable in tests)
+        """
+        self.client = db.get_client()
+        self.table = table
+        self.id_column = id_column
+        self.name_column = name_column
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.version = 0
+        self._loaded_version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._names: Dict[int, str] = {}
+        self._ids: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.read_throughs = 0
+
+    def bump(self):
+        """Record a write to the table; the next lookup reloads the map."""
+        with self._lock:
+            self.version += 1
+
+    def names(self, ids: Iterable[int]) -> Dict[int, str]:
+        """Map IDs to names, reading through IDs not in the map (unknown IDs are left out)."""
+        self._ensure_loaded()
+        ids = set(ids)
+        with self._lock:
+            missing = [row_id for row_id in ids if row_id not in self._names]
+        if missing:
+            self._read_through(missing)
+        with self._lock:
+            return {row_id: self._names[row_id] for row_id in ids if row_id in self._names}
+
+    def ids(self, name: str) -> List[int]:
+        """IDs of the rows with exactly this name."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._ids.get(name, []))
+
+    def first_ids(self) -> Dict[str, int]:
+        """Map every name to its lowest ID (a copy the caller may extend)."""
+        self._ensure_loaded()
+        with self._lock:
+            return {name: ids[0] for name, ids in self._ids.items()}
+
+    def search(self, fragment: str) -> List[int]:
+        """IDs of the rows whose name contains fragment, ignoring case (like ILIKE '%fragment%')."""
+        self._ensure_loaded()
+        fragment = fragment.lower()
+        with self._lock:
+            return [row_id for row_id, name in self._names.items() if fragment in name.lower()]
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                'rows': len(self._names),
+                'version': self.version,
+                'loads': self.loads,
+                'read_throughs': self.read_throughs,
+            }
+
+    def _ensure_loaded(self):
+        with self._lock:
+            version = self.version
+            if self._loaded_version == version and self.clock() - self._loaded_at < self.ttl_seconds:
+                return
+        names = {}
+        last_id = 0
+        while True:
+            result = self.client.table(self.table).select(f'{self.id_column}, {self.name_column}') \
+                .gt(self.id_column, last_id).order(self.id_column).limit(DIMENSION_PAGE_SIZE).execute()
+            for row in result.data:
+                names[row[self.id_column]] = row[self.name_column]
+            if len(result.data) < DIMENSION_PAGE_SIZE:
+                break
+            last_id = result.data[-1][self.id_column]
+        with self._lock:
+            # A bump during the load leaves the map marked stale, so the next lookup reloads again
+            self._names = names
+            self._ids = {}
+            for row_id, name in names.items():
+                self._ids.setdefault(name, []).append(row_id)
+            self._loaded_version = version
+            self._loaded_at = self.clock()
+            self.loads += 1
+
+    def _read_through(self, ids: List[int]):
+        rows = []
+        for start in range(0, len(ids), READ_THROUGH_CHUNK_SIZE):
+            chunk = ids[start:start + READ_THROUGH_CHUNK_SIZE]
+            result = self.client.table(self.table).select(f'{self.id_column}, {self.name_column}') \
+                .in_(self.id_column, chunk).execute()
+            rows.extend(result.data)
+        with self._lock:
+            self.read_throughs += 1
+            for row in sorted(rows, key=lambda row: row[self.id_column]):
+                row_id, name = row[self.id_column], row[self.name_column]
+                if row_id not in self._names:
+                    self._names[row_id] = name
+                    self._ids.setdefault(name, []).append(row_id)
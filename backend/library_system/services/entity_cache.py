@@ -0,0 +1,116 @@
+"""Read-through cache of single rows keyed by table and primary key."""
+
+import threading
+from typing import Callable, Dict, Hashable, Optional
+from library_system.utils.ttl_cache import TTLCache
+
+DEFAULT_ENTITY_CACHE_SIZE = 10_000
+
+# Rows are re-read at least this often, bounding staleness from writes made by
+# other processes
+DEFAULT_ENTITY_TTL_SECONDS = 60
+
+
+class EntityCache:
+    """
+    Rows fetched by primary key, shared by the services of one process.
+
+    get() returns the cached row or calls the loader and stores what it
+    returns. Services invalidate a row on every update or delete of it, and
+    a whole table after bulk or cascading writes whose rows they do not
+    know; inserts need nothing, since missing rows are never cached.
+
+    Rows are kept in a pluggable store: anything with TTLCache's get(key),
+    set(key, value) and pop(key) methods, so the in-process LRU can be
+    swapped for a cache shared between processes.
+
+    A table invalidation moves the table to a new generation that is part
+    of every key, so the store never has to be scanned. A load that races
+    with an invalidation is returned but not stored, so a write can never
+    be hidden by a row read before it.
+    """
+
+    def __init__(self, store=None, max_size: int = DEFAULT_ENTITY_CACHE_SIZE,
+                 ttl_seconds: float = DEFAULT_ENTITY_TTL_SECONDS):
+        """
+        Initialize an empty cache.
+
+        Args:
+            store: Backing store (an in-process TTLCache of max_size entries
+                expiring after ttl_seconds if omitted)
+            max_size: Maximum number of rows kept by the default store
+            ttl_seconds: Seconds a row stays valid in the default store
+        """
+        self.store = store if store is not None else TTLCache(max_size, ttl_seconds)
+        self._generations: Dict[str, int] = {}
+        self._invalidations = 0
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get(self, table: str, key: Hashable, load: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Get one row, loading it on a miss.
+
+        Args:
+            table: Table name
+            key: Primary key value
+            load: Called on a miss; returns the row, or None if it does not exist
+                (missing rows are not cached)
+
+        Returns:
+            The row, or None
+        """
+        with self._lock:
+            cache_key = (table, self._generations.get(table, 0), key)
+            invalidations = self._invalidations
+        row = self.store.get(cache_key)
+        with self._lock:
+            counts = self.hits if row is not None else self.misses
+            counts[table] = counts.get(table, 0) + 1
+        if row is not None:
+            return row
+
+        row = load()
+        if row is not None:
+            with self._lock:
+                if self._invalidations == invalidations:
+                    self.store.set(cache_key, row)
+        return row
+
+    def invalidate(self, table: str, *keys: Hashable):
+        """Drop the cached rows of some keys of a table."""
+        with self._lock:
+            self._invalidations += 1
+            generation = self._generations.get(table, 0)
+            for key in keys:
+                self.store.pop((table, generation, key))
+
+    def invalidate_table(self, table: str):
+        """Drop every cached row of a table."""
+        with self._lock:
+            self._invalidations += 1
+            self._generations[table] = self._generations.get(table, 0) + 1
+
+    def metrics(self) -> Dict:
+        """Hit and miss counters per table."""
+        with self._lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'size': len(self.store) if hasattr(self.store, '__len__') else None,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+                'tables': {
+                    table: {'hits': self.hits.get(table, 0), 'misses': self.misses.get(table, 0)}
+                    for table in sorted(set(self.hits) | set(self.misses))
+                },
+            }
+
+
+def read_through(cache: Optional[EntityCache], table: str, key: Hashable,
+                 load: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+    """Get a row through the cache if there is one, otherwise load it directly."""
+    if cache is None:
+        return load()
+    return cache.get(table, key, load)
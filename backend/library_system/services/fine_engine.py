@@ -0,0 +1,178 @@
+"""Overdue fine computation over column-oriented loan tables."""
+
+import os
+from dataclasses import dataclass, asdict
+from datetime import date
+from itertools import compress
+from typing import Dict, List, Optional
+from library_system.models.loan_table import LoanTable, STATUS_CODES, NO_DATE
+from library_system.utils.enums import LoanStatus
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    numpy = None
+
+DEFAULT_DAILY_RATE_CENTS = 25
+DEFAULT_GRACE_DAYS = 0
+DEFAULT_FINE_CAP_CENTS = 1000
+
+OPEN_STATUS_CODES = (STATUS_CODES[LoanStatus.ACTIVE], STATUS_CODES[LoanStatus.OVERDUE])
+
+
+@dataclass(frozen=True)
+class FinePolicy:
+    """
+    How late loans are charged.
+
+    A loan is charged daily_rate_cents for every day it is late beyond
+    grace_days, up to cap_cents per loan (0 for no cap). Open loans are
+    late up to the day of the computation, returned loans up to their
+    return date.
+    """
+    daily_rate_cents: int = DEFAULT_DAILY_RATE_CENTS
+    grace_days: int = DEFAULT_GRACE_DAYS
+    cap_cents: int = DEFAULT_FINE_CAP_CENTS
+
+    @classmethod
+    def from_env(cls) -> 'FinePolicy':
+        """Read FINE_DAILY_RATE_CENTS, FINE_GRACE_DAYS and FINE_CAP_CENTS."""
+        return cls(
+            daily_rate_cents=int(os.getenv('FINE_DAILY_RATE_CENTS', DEFAULT_DAILY_RATE_CENTS)),
+            grace_days=int(os.getenv('FINE_GRACE_DAYS', DEFAULT_GRACE_DAYS)),
+            cap_cents=int(os.getenv('FINE_CAP_CENTS', DEFAULT_FINE_CAP_CENTS))
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class Fines:
+    """Fines of the loans that owe one, as parallel columns in loan table order."""
+    as_of: date
+    policy: FinePolicy
+    loan_id: List[int]
+    member_id: List[int]
+    days_late: List[int]
+    amount_cents: List[int]
+    open: List[bool]
+
+    def __len__(self) -> int:
+        return len(self.loan_id)
+
+    @property
+    def total_cents(self) -> int:
+        return sum(self.amount_cents)
+
+    def by_member(self) -> Dict[int, int]:
+        """Total fine per member."""
+        totals: Dict[int, int] = {}
+        for member_id, amount in zip(self.member_id, self.amount_cents):
+            totals[member_id] = totals.get(member_id, 0) + amount
+        return totals
+
+    def member_totals(self, limit: Optional[int] = None) -> List[Dict]:
+        """Members with fines, largest total first."""
+        counts: Dict[int, int] = {}
+        for member_id in self.member_id:
+            counts[member_id] = counts.get(member_id, 0) + 1
+        totals = sorted(self.by_member().items(), key=lambda item: (-item[1], item[0]))
+        return [{'member_id': member_id, 'amount_cents': amount, 'loans': counts[member_id]}
+                for member_id, amount in totals[:limit]]
+
+    def rows(self, member_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Fined loans, optionally of one member, largest fine first."""
+        positions = range(len(self))
+        if member_id is not None:
+            positions = compress(positions, map(member_id.__eq__, self.member_id))
+        positions = sorted(positions, key=lambda row: (-self.amount_cents[row], self.loan_id[row]))[:limit]
+        return [{
+            'loan_id': self.loan_id[row],
+            'member_id': self.member_id[row],
+            'days_late': self.days_late[row],
+            'amount_cents': self.amount_cents[row],
+            'open': self.open[row],
+        } for row in positions]
+
+    def summary(self) -> Dict:
+        """Date, policy and totals of the computation."""
+        return {
+            'as_of': self.as_of.isoformat(),
+            'policy': self.policy.to_dict(),
+            'fined_loans': len(self),
+            'fined_members': len(self.by_member()),
+            'total_cents': self.total_cents,
+        }
+
+
+def compute_fines(loans: LoanTable, policy: FinePolicy, today: Optional[date] = None,
+                  use_numpy: Optional[bool] = None) -> Fines:
+    """
+    Compute the fine of every overdue and late-returned loan in one pass.
+
+    Works on the day-ordinal columns of the table directly: with NumPy the
+    columns are viewed as arrays without copying and the fines computed with
+    whole-array operations; without it, the same arithmetic runs in a
+    single loop over the columns.
+
+    Args:
+        loans: Loans to charge (any statuses; loans that are not late are skipped)
+        policy: Rate, grace period and cap
+        today: Day open loans are late up to (defaults to today)
+        use_numpy: Force (True) or avoid (False) NumPy; defaults to using it when installed
+
+    Returns:
+        The loans that owe a fine
+    """
+    today = today or date.today()
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    compute = _compute_numpy if use_numpy else _compute_python
+    return Fines(today, policy, *compute(loans, policy, today.toordinal()))
+
+
+def _compute_numpy(loans: LoanTable, policy: FinePolicy, today: int):
+    if not len(loans):
+        return [], [], [], [], []
+    due = numpy.frombuffer(loans.due_date, dtype=numpy.intc).astype(numpy.int64)
+    returned = numpy.frombuffer(loans.return_date, dtype=numpy.intc)
+    status = numpy.frombuffer(loans.status, dtype=numpy.int8)
+    is_open = numpy.isin(status, OPEN_STATUS_CODES)
+
+    end = numpy.where(is_open, today, returned)
+    late = end - due
+    late[(due == NO_DATE) | (end == NO_DATE)] = 0
+    rows = numpy.flatnonzero(late > policy.grace_days)
+
+    amount = (late[rows] - policy.grace_days) * policy.daily_rate_cents
+    if policy.cap_cents > 0:
+        numpy.minimum(amount, policy.cap_cents, out=amount)
+    return (
+        numpy.frombuffer(loans.loan_id, dtype=numpy.int64)[rows].tolist(),
+        numpy.frombuffer(loans.member_id, dtype=numpy.int64)[rows].tolist(),
+        late[rows].tolist(),
+        amount.tolist(),
+        is_open[rows].tolist(),
+    )
+
+
+def _compute_python(loans: LoanTable, policy: FinePolicy, today: int):
+    loan_ids, member_ids, days_late, amounts, open_flags = [], [], [], [], []
+    grace, rate, cap = policy.grace_days, policy.daily_rate_cents, policy.cap_cents
+    for loan_id, member_id, due, returned, code in zip(loans.loan_id, loans.member_id, loans.due_date,
+                                                        loans.return_date, loans.status):
+        is_open = code in OPEN_STATUS_CODES
+        end = today if is_open else returned
+        if due == NO_DATE or end == NO_DATE:
+            continue
+        late = end - due
+        if late <= grace:
+            continue
+        amount = (late - grace) * rate
+        loan_ids.append(loan_id)
+        member_ids.append(member_id)
+        days_late.append(late)
+        amounts.append(min(amount, cap) if cap > 0 else amount)
+        open_flags.append(is_open)
+    return loan_ids, member_ids, days_late, amounts, open_flags
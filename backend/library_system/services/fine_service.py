@@ -0,0 +1,125 @@
+"""Fine service computing and serving overdue fines for the whole loan history."""
+
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Optional
+from library_system.services.fine_engine import FinePolicy, Fines, compute_fines
+from library_system.services.loan_service import LoanService
+
+# Computed fines are reused for at most this long, picking up returns made by other processes
+DEFAULT_FINES_MAX_AGE_SECONDS = 300
+
+
+class FineService:
+    """
+    Fines of every overdue and late-returned loan.
+
+    The whole loan history is loaded into a LoanTable and charged by
+    compute_fines() in one pass. The result is kept and reused until the
+    day changes or max_age_seconds pass, so fine listings cost no queries
+    between recomputations. A loan returned through the LoanService
+    (registered as a listener) is closed in the kept fines in place.
+    """
+
+    def __init__(self, loan_service: LoanService, policy: Optional[FinePolicy] = None,
+                 max_age_seconds: float = DEFAULT_FINES_MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize fine service.
+
+        Args:
+            loan_service: Service used to load the loan history
+            policy: Rate, grace period and cap (FinePolicy.from_env() if omitted)
+            max_age_seconds: Seconds before computed fines are recomputed
+            clock: Time source (monotonic by default, replaceable in tests)
+        """
+        self.loan_service = loan_service
+        self.policy = policy or FinePolicy.from_env()
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self._fines: Optional[Fines] = None
+        # Position of each fined loan in the kept fines' columns
+        self._rows: Dict[int, int] = {}
+        self._computed_at = 0.0
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+
+        self.runs = 0
+        self.last_loaded_loans = 0
+        self.last_load_ms = 0.0
+        self.last_compute_ms = 0.0
+
+    def compute(self, today: Optional[date] = None) -> Fines:
+        """
+        Load the loan history and charge it now, replacing the kept fines.
+
+        Args:
+            today: Day open loans are late up to (defaults to today)
+
+        Returns:
+            The loans that owe a fine
+        """
+        with self._compute_lock:
+            start = time.perf_counter()
+            loans = self.loan_service.get_loan_table()
+            loaded = time.perf_counter()
+            fines = compute_fines(loans, self.policy, today)
+            rows = {loan_id: row for row, loan_id in enumerate(fines.loan_id)}
+            with self._lock:
+                self._fines = fines
+                self._rows = rows
+                self._computed_at = self.clock()
+                self.runs += 1
+                self.last_loaded_loans = len(loans)
+                self.last_load_ms = (loaded - start) * 1000
+                self.last_compute_ms = (time.perf_counter() - loaded) * 1000
+            return fines
+
+    def current(self) -> Fines:
+        """Fines as of today, recomputed only if the kept ones are out of date."""
+        with self._lock:
+            fines = self._fines
+            fresh = (fines is not None and fines.as_of == date.today()
+                     and self.clock() - self._computed_at < self.max_age_seconds)
+        return fines if fresh else self.compute()
+
+    def member_fines(self, member_id: int) -> Dict:
+        """
+        Fined loans and total of one member.
+
+        Returns:
+            Dictionary with the member ID, total_cents and the fined loans
+        """
+        fines = self.current()
+        rows = fines.rows(member_id=member_id)
+        return {
+            'as_of': fines.as_of.isoformat(),
+            'member_id': member_id,
+            'total_cents': sum(row['amount_cents'] for row in rows),
+            'fines': rows,
+        }
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """
+        LoanService listener: close the returned loan's fine in the kept fines.
+
+        A loan returned today is late up to today, so its fine is what the
+        kept fines already charge it; only its open flag changes. Fines kept
+        from an earlier day are recomputed on the next read anyway.
+        """
+        with self._lock:
+            row = self._rows.get(loan_id)
+            if row is not None and self._fines.as_of == date.today():
+                self._fines.open[row] = False
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'as_of': self._fines.as_of.isoformat() if self._fines else None,
+                'last_loaded_loans': self.last_loaded_loans,
+                'last_load_ms': round(self.last_load_ms, 2),
+                'last_compute_ms': round(self.last_compute_ms, 2),
+            }
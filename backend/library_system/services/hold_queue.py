@@ -0,0 +1,297 @@
+"""Per-book FIFO queues of active reservations, used to hold returned copies."""
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from library_system.database.connection import DatabaseConnection
+from library_system.models.reservation import Reservation
+from library_system.services.book_service import IN_FILTER_CHUNK_SIZE
+from library_system.utils.enums import CopyStatus
+from library_system.utils.pagination import fetch_all
+from library_system.utils.ttl_cache import TTLCache
+
+DEFAULT_HOLD_QUEUE_SIZE = 10_000
+
+# Queues are re-read at least this often, picking up reservations made by other processes
+DEFAULT_HOLD_QUEUE_TTL_SECONDS = 300
+
+# Waiting reservations are ordered by (created_at, reservation_id), as in the database
+QueueKey = Tuple[str, int]
+
+
+@dataclass
+class _BookQueue:
+    """Active reservations of one book."""
+    waiting: List[QueueKey] = field(default_factory=list)
+    keys: Dict[int, QueueKey] = field(default_factory=dict)
+    members: Dict[int, int] = field(default_factory=dict)
+    held: Dict[int, int] = field(default_factory=dict)
+
+
+class HoldQueue:
+    """
+    First come, first served queue of the active reservations of each book.
+
+    A book's queue is read once with a query served by the
+    idx_reservation_queue index (one query for all the books of a lookup)
+    and then kept in order as reservations are
+    made, cancelled and given a copy, so a patron's position is a binary
+    search. Reservations waiting for a copy are kept separately from those a
+    copy is held for (reservation.copy_id set), which no longer count
+    towards anyone's position.
+
+    The return_loans database function does the allocation itself; the
+    queue serves position lookups and the conditional-update fallback used
+    when that function is not installed. Writes based on the queue are
+    guarded by the reservation's state, so a stale queue costs a retry,
+    never a copy held for the wrong patron.
+    """
+
+    def __init__(self, db: DatabaseConnection, max_size: int = DEFAULT_HOLD_QUEUE_SIZE,
+                 ttl_seconds: float = DEFAULT_HOLD_QUEUE_TTL_SECONDS):
+        """
+        Initialize with no queues loaded.
+
+        Args:
+            db: Database connection
+            max_size: Maximum number of books whose queues are kept
+            ttl_seconds: Seconds before a book's queue is re-read
+        """
+        self.db = db
+        self.client = db.get_client()
+        self._queues = TTLCache(max_size, ttl_seconds)
+        self._held_copies: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.allocations = 0
+
+    def position(self, reservation: Reservation) -> Optional[int]:
+        """
+        Position of a reservation in its book's queue.
+
+        Args:
+            reservation: The reservation, as read from the database
+
+        Returns:
+            1 for the next patron to be given a copy, 0 if a copy is already
+            held for the reservation, or None if it is not in the queue
+            (cancelled, collected or expired)
+        """
+        return self.positions([reservation])[reservation.reservation_id]
+
+    def positions(self, reservations: Iterable[Reservation]) -> Dict[int, Optional[int]]:
+        """
+        Positions of several reservations, as position() would return them.
+
+        The queues of all their books that are not loaded yet are read
+        together in one query.
+
+        Returns:
+            Dictionary mapping each reservation ID to its position
+        """
+        today = date.today()
+        waiting = [reservation for reservation in reservations
+                   if reservation.active and not (reservation.expires_at and reservation.expires_at < today)]
+        queues = self._queues_for([reservation.book_id for reservation in waiting])
+        positions = {reservation.reservation_id: None for reservation in reservations}
+        with self._lock:
+            for reservation in waiting:
+                queue = queues[reservation.book_id]
+                if reservation.copy_id is not None or reservation.reservation_id in queue.held:
+                    positions[reservation.reservation_id] = 0
+                    continue
+                key = (reservation.created_at.isoformat(), reservation.reservation_id)
+                if reservation.reservation_id not in queue.keys:
+                    # Made by another process since the queue was loaded
+                    self._insert(queue, key, reservation.member_id)
+                positions[reservation.reservation_id] = bisect.bisect_left(queue.waiting, key) + 1
+        return positions
+
+    def length(self, book_id: int) -> int:
+        """Number of reservations of a book still waiting for a copy."""
+        queue = self._queue(book_id)
+        with self._lock:
+            return len(queue.waiting)
+
+    def held_reservation(self, member_id: int, book_id: int) -> Optional[Tuple[int, int]]:
+        """(reservation_id, copy_id) of the copy of a book held for a member, if any."""
+        return self.held_reservations(member_id, [book_id]).get(book_id)
+
+    def held_reservations(self, member_id: int, book_ids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+        """
+        Copies of several books held for a member, loading missing queues in bulk.
+
+        Returns:
+            Dictionary mapping each book ID with a copy held for the member to
+            (reservation_id, copy_id)
+        """
+        held = {}
+        queues = self._queues_for(list(book_ids))
+        with self._lock:
+            for book_id, queue in queues.items():
+                for reservation_id, copy_id in queue.held.items():
+                    if queue.members.get(reservation_id) == member_id:
+                        held[book_id] = (reservation_id, copy_id)
+                        break
+        return held
+
+    def held_for(self, copy_id: int) -> Optional[int]:
+        """
+        Reservation a copy is known to be held for, without a query.
+
+        Only holds made or loaded by this process are known.
+        """
+        with self._lock:
+            return self._held_copies.get(copy_id)
+
+    def add(self, reservation: Reservation):
+        """Append a new reservation to its book's queue (if the queue is loaded)."""
+        with self._lock:
+            queue = self._queues.get(reservation.book_id)
+            if queue is not None and reservation.reservation_id not in queue.keys:
+                self._insert(queue, (reservation.created_at.isoformat(), reservation.reservation_id),
+                             reservation.member_id)
+
+    def remove(self, reservation_id: int, book_id: int, copy_id: Optional[int] = None):
+        """
+        Take a cancelled, expired or collected reservation out of its book's queue.
+
+        copy_id, the copy held for the reservation if known, also forgets the
+        hold when the book's queue is not loaded.
+        """
+        with self._lock:
+            queue = self._queues.get(book_id)
+            if queue is not None:
+                copy_id = queue.held.get(reservation_id, copy_id)
+                self._discard(queue, reservation_id)
+            if copy_id is not None and self._held_copies.get(copy_id) == reservation_id:
+                del self._held_copies[copy_id]
+
+    def allocate(self, copy_id: int, book_id: int, today: Optional[date] = None) -> Optional[int]:
+        """
+        Hold a copy for the first reservation of a book still waiting.
+
+        Each candidate is updated only while it is still active, waiting
+        and unexpired on today (defaults to today); one cancelled, expired
+        or given a copy elsewhere matches no row and the next is tried. The
+        copy's status is left to the caller.
+
+        Returns:
+            ID of the reservation the copy is now held for, or None if nobody is waiting
+        """
+        queue = self._queue(book_id)
+        while True:
+            with self._lock:
+                if not queue.waiting:
+                    return None
+                reservation_id = queue.waiting[0][1]
+            result = self.client.table('reservation').update({'copy_id': copy_id}, count='exact', returning='minimal') \
+                .eq('reservation_id', reservation_id).eq('active', True).is_('copy_id', 'null') \
+                .gte('expires_at', (today or date.today()).isoformat()).execute()
+            if result.count:
+                self.copy_held(reservation_id, copy_id, book_id)
+                with self._lock:
+                    self.allocations += 1
+                return reservation_id
+            self.remove(reservation_id, book_id)
+
+    def release(self, copy_id: int, book_id: int, today: Optional[date] = None) -> Optional[int]:
+        """
+        Pass a held copy whose reservation ended to the next patron in line.
+
+        Returns:
+            ID of the reservation now holding the copy, or None if nobody is
+            waiting and the copy was made available
+        """
+        reservation_id = self.allocate(copy_id, book_id, today)
+        if reservation_id is None:
+            self.client.table('book_copy').update({'status': CopyStatus.AVAILABLE.value}, returning='minimal') \
+                .eq('copy_id', copy_id).eq('status', CopyStatus.RESERVED.value).execute()
+        return reservation_id
+
+    def copy_held(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: a returned copy is now held for a reservation."""
+        with self._lock:
+            self._held_copies[copy_id] = reservation_id
+            queue = self._queues.get(book_id)
+            if queue is not None:
+                self._unqueue(queue, reservation_id)
+                queue.held[reservation_id] = copy_id
+
+    def hold_collected(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: a held copy was issued to its patron."""
+        self.remove(reservation_id, book_id, copy_id)
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        return {
+            'cached_books': len(self._queues),
+            'held_copies': len(self._held_copies),
+            'loads': self.loads,
+            'allocations': self.allocations,
+        }
+
+    def _queue(self, book_id: int) -> _BookQueue:
+        return self._queues_for([book_id])[book_id]
+
+    def _queues_for(self, book_ids: List[int]) -> Dict[int, _BookQueue]:
+        queues = {}
+        missing = []
+        for book_id in dict.fromkeys(book_ids):
+            queue = self._queues.get(book_id)
+            if queue is None:
+                missing.append(book_id)
+            else:
+                queues[book_id] = queue
+
+        for start in range(0, len(missing), IN_FILTER_CHUNK_SIZE):
+            chunk = missing[start:start + IN_FILTER_CHUNK_SIZE]
+            rows = fetch_all(lambda: self.client.table('reservation')
+                             .select('reservation_id, member_id, book_id, created_at, copy_id')
+                             .in_('book_id', chunk).eq('active', True).gte('expires_at', date.today().isoformat()),
+                             order=['book_id', 'created_at', 'reservation_id'])
+            loaded = {book_id: _BookQueue() for book_id in chunk}
+            for row in rows:
+                queue = loaded[row['book_id']]
+                queue.members[row['reservation_id']] = row['member_id']
+                if row['copy_id'] is not None:
+                    queue.held[row['reservation_id']] = row['copy_id']
+                else:
+                    key = (str(row['created_at']), row['reservation_id'])
+                    queue.keys[row['reservation_id']] = key
+                    queue.waiting.append(key)
+            with self._lock:
+                for book_id, queue in loaded.items():
+                    # Rows arrive in queue order; keep a queue another thread loaded meanwhile
+                    existing = self._queues.get(book_id)
+                    if existing is not None:
+                        queues[book_id] = existing
+                        continue
+                    self._queues.set(book_id, queue)
+                    for reservation_id, copy_id in queue.held.items():
+                        self._held_copies[copy_id] = reservation_id
+                    queues[book_id] = queue
+                    self.loads += 1
+        return queues
+
+    @staticmethod
+    def _insert(queue: _BookQueue, key: QueueKey, member_id: int):
+        queue.keys[key[1]] = key
+        queue.members[key[1]] = member_id
+        bisect.insort(queue.waiting, key)
+
+    @staticmethod
+    def _unqueue(queue: _BookQueue, reservation_id: int):
+        key = queue.keys.pop(reservation_id, None)
+        if key is not None:
+            index = bisect.bisect_left(queue.waiting, key)
+            if index < len(queue.waiting) and queue.waiting[index] == key:
+                del queue.waiting[index]
+
+    @classmethod
+    def _discard(cls, queue: _BookQueue, reservation_id: int):
+        cls._unqueue(queue, reservation_id)
+        queue.held.pop(reservation_id, None)
+        queue.members.pop(reservation_id, None)
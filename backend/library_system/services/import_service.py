@@ -0,0 +1,419 @@
+"""Import service for bulk loading catalog records."""
+
+import csv
+import io
+import json
+import os
+import time
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+from library_system.database.connection import DatabaseConnection
+from library_system.services.book_service import BookService, IN_FILTER_CHUNK_SIZE
+from library_system.services.dimension_map import DimensionMap
+from library_system.utils.enums import CopyStatus
+from library_system.utils.pagination import fetch_all
+
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+
+# Separator for multi-valued CSV columns (authors, categories, barcodes)
+CSV_LIST_SEPARATOR = ';'
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+
+# Record keys holding lists of names or barcodes
+LIST_FIELDS = ('authors', 'categories', 'barcodes')
+
+
+@dataclass
+class ImportProgress:
+    """Running totals of a catalog import."""
+    records_read: int = 0
+    books_created: int = 0
+    books_skipped: int = 0
+    books_invalid: int = 0
+    books_repaired: int = 0
+    authors_created: int = 0
+    categories_created: int = 0
+    copies_created: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Records processed per second so far."""
+        return self.records_read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            **asdict(self),
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'rows_per_second': round(self.rows_per_second, 1)
+        }
+
+
+@dataclass
+class _Checkpoint:
+    """
+    Progress of an import, saved after every batch when a path is given.
+
+    pending_books holds the books a batch created but has not finished
+    linking and stocking; a re-run completes those instead of skipping them.
+    """
+    path: Optional[str] = None
+    records_done: int = 0
+    pending_books: Set[int] = field(default_factory=set)
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> '_Checkpoint':
+        if not path or not os.path.exists(path):
+            return cls(path)
+        with open(path) as f:
+            data = json.load(f)
+        return cls(path, int(data.get('records_done', 0)), set(data.get('pending_books', [])))
+
+    def save(self):
+        if not self.path:
+            return
+        # Write then rename, so a crash never leaves a truncated checkpoint
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'records_done': self.records_done, 'pending_books': sorted(self.pending_books)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict]:
+    """
+    Stream catalog records from CSV or JSON Lines.
+
+    CSV columns: isbn, title, publisher, published_year, description, authors,
+    categories, copies, barcodes. Multi-valued columns are ';'-separated.
+    JSONL objects use the same keys, with lists for the multi-valued ones.
+
+    Raises:
+        ValueError: If the format is unknown
+    """
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {
+                **row,
+                'authors': _split(row.get('authors')),
+                'categories': _split(row.get('categories')),
+                'barcodes': _split(row.get('barcodes'))
+            }
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"Unknown import format '{fmt}'. Use one of: {', '.join(IMPORT_FORMATS)}")
+
+
+def format_from_path(path: str) -> str:
+    """Infer the import format from a file extension."""
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+class _ChunkStream(io.RawIOBase):
+    """Readable binary stream over an iterator of byte chunks (e.g. an upload as it arrives)."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buffer = bytes(chunk)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _split(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [part.strip() for part in value.split(CSV_LIST_SEPARATOR) if part.strip()]
+
+
+class ImportService:
+    """
+    Service for bulk catalog imports.
+
+    Records are inserted in batches: one query per table per batch instead of
+    several per book. Author and category names are resolved through
+    in-memory name -> id maps loaded once per import, and missing names are
+    created in bulk. Records whose barcodes are taken or repeated, whose
+    numbers do not parse or whose authors, categories or barcodes are not
+    lists of names are rejected before anything is written, and a batch
+    whose links or copies fail to insert deletes the books it created.
+    Books whose ISBN already exists are skipped, so an interrupted import can
+    be re-run safely. With a checkpoint file a re-run also skips the records
+    already processed without re-reading them from the database, and
+    completes the books an interrupted batch created but did not finish.
+    """
+
+    def __init__(self, db: DatabaseConnection, book_service: Optional[BookService] = None,
+                 batch_size: int = DEFAULT_IMPORT_BATCH_SIZE):
+        """
+        Initialize import service with database connection.
+
+        Args:
+            db: Database connection
+            book_service: Book service whose catalog index is refreshed after imports
+                and whose author and category maps are shared
+            batch_size: Records inserted per batch
+        """
+        self.db = db
+        self.client = db.get_client()
+        self.book_service = book_service
+        self.batch_size = batch_size
+        if book_service is not None:
+            self.authors, self.categories = book_service.authors, book_service.categories
+        else:
+            self.authors = DimensionMap(db, 'author', 'author_id', 'full_name')
+            self.categories = DimensionMap(db, 'category', 'category_id', 'name')
+
+    def import_catalog(self, records: Iterable[Dict], checkpoint_path: Optional[str] = None,
+                       progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportProgress:
+        """
+        Import catalog records in batches.
+
+        Args:
+            records: Records as produced by read_records()
+            checkpoint_path: File recording how many records have been imported;
+                an existing checkpoint resumes after those records
+            progress: Called with the running totals after every batch
+
+        Returns:
+            Final import totals
+        """
+        start = time.perf_counter()
+        totals = ImportProgress()
+        checkpoint = _Checkpoint.load(checkpoint_path)
+        done = checkpoint.records_done
+        authors = self.authors.first_ids()
+        categories = self.categories.first_ids()
+
+        batch = []
+        position = 0
+        for position, record in enumerate(records, start=1):
+            if position <= done:
+                continue
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, authors, categories, totals, checkpoint)
+                self._finish_batch(position, len(batch), start, totals, checkpoint, progress)
+                batch = []
+        if batch:
+            self._import_batch(batch, authors, categories, totals, checkpoint)
+            self._finish_batch(position, len(batch), start, totals, checkpoint, progress)
+
+        if self.book_service is not None and self.book_service.catalog_index is not None:
+            self.book_service.build_catalog_index()
+        return totals
+
+    def import_stream(self, stream: TextIO, fmt: str, checkpoint_path: Optional[str] = None,
+                      progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportProgress:
+        """Import records read from a CSV or JSONL text stream."""
+        return self.import_catalog(read_records(stream, fmt), checkpoint_path, progress)
+
+    def import_bytes(self, data: bytes, fmt: str,
+                     progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportProgress:
+        """Import records from an uploaded CSV or JSONL document."""
+        return self.import_chunks([data], fmt, progress=progress)
+
+    def import_chunks(self, chunks: Iterable[bytes], fmt: str,
+                      progress: Optional[Callable[[ImportProgress], None]] = None) -> ImportProgress:
+        """Import a CSV or JSONL document read chunk by chunk, importing each batch as soon as it is read."""
+        stream = io.TextIOWrapper(io.BufferedReader(_ChunkStream(chunks)), encoding='utf-8-sig', newline='')
+        return self.import_stream(stream, fmt, progress=progress)
+
+    def _import_batch(self, batch: List[Dict], authors: Dict[str, int], categories: Dict[str, int],
+                      totals: ImportProgress, checkpoint: _Checkpoint):
+        """Insert one batch of books with their author/category links and copies."""
+        records = {}
+        for record in batch:
+            isbn = str(record.get('isbn') or '').strip()
+            if not isbn or not record.get('title') or isbn in records:
+                totals.books_skipped += 1
+                continue
+            records[isbn] = record
+
+        # Existing books are skipped, unless an interrupted run of this import left them unfinished
+        existing = {}
+        for isbn, book_id in self._existing_books(list(records)).items():
+            if book_id in checkpoint.pending_books:
+                existing[isbn] = book_id
+            else:
+                del records[isbn]
+                totals.books_skipped += 1
+
+        invalid, present = self._invalid_records(records, existing)
+        totals.books_invalid += len(invalid)
+        records = {isbn: record for isbn, record in records.items() if isbn not in invalid}
+        if not records:
+            return
+
+        totals.authors_created += self._create_missing(authors, records.values(), 'authors', self.authors)
+        totals.categories_created += self._create_missing(categories, records.values(), 'categories', self.categories)
+
+        book_rows = [
+            {
+                'isbn': isbn,
+                'title': record['title'],
+                'publisher': record.get('publisher') or None,
+                'published_year': int(record['published_year']) if record.get('published_year') else None,
+                'description': record.get('description') or None
+            }
+            for isbn, record in records.items() if isbn not in existing
+        ]
+        book_ids = {}
+        if book_rows:
+            result = self.client.table('book').insert(book_rows).execute()
+            book_ids = {row['isbn']: row['book_id'] for row in result.data}
+            totals.books_created += len(book_ids)
+            # Recorded before the links and copies, so a crash leaves them to be completed
+            checkpoint.pending_books.update(book_ids.values())
+            checkpoint.save()
+        created = list(book_ids.values())
+        book_ids.update((isbn, existing[isbn]) for isbn in records if isbn in existing)
+
+        linked = self._existing_links([existing[isbn] for isbn in records if isbn in existing])
+        author_links, category_links, copies = [], [], []
+        for isbn, record in records.items():
+            book_id = book_ids[isbn]
+            for author_id in dict.fromkeys(authors[name] for name in record.get('authors') or []):
+                if ('author', book_id, author_id) not in linked:
+                    author_links.append({'book_id': book_id, 'author_id': author_id})
+            for category_id in dict.fromkeys(categories[name] for name in record.get('categories') or []):
+                if ('category', book_id, category_id) not in linked:
+                    category_links.append({'book_id': book_id, 'category_id': category_id})
+            for barcode in self._barcodes(isbn, record):
+                if barcode not in present:
+                    copies.append({'book_id': book_id, 'barcode': barcode, 'status': CopyStatus.AVAILABLE.value})
+
+        try:
+            if author_links:
+                self.client.table('book_author').insert(author_links, returning='minimal').execute()
+            if category_links:
+                self.client.table('book_category').insert(category_links, returning='minimal').execute()
+            if copies:
+                self.client.table('book_copy').insert(copies, returning='minimal').execute()
+        except Exception:
+            # Drop the batch's new books (their links and copies cascade) so a re-run creates them whole
+            if created:
+                self.client.table('book').delete(returning='minimal').in_('book_id', created).execute()
+                checkpoint.pending_books.difference_update(created)
+            raise
+        checkpoint.pending_books.difference_update(book_ids.values())
+        totals.copies_created += len(copies)
+        changed = {row['book_id'] for row in author_links + category_links + copies}
+        totals.books_repaired += len(changed.intersection(existing.values()))
+        if self.book_service is not None and self.book_service.availability is not None:
+            for book_id in book_ids.values():
+                self.book_service.availability.invalidate(book_id)
+        if self.book_service is not None and self.book_service.versions is not None:
+            self.book_service.versions.bump('book')
+
+    def _finish_batch(self, position: int, size: int, start: float, totals: ImportProgress,
+                      checkpoint: _Checkpoint, progress: Optional[Callable[[ImportProgress], None]]):
+        totals.records_read += size
+        totals.elapsed_seconds = time.perf_counter() - start
+        checkpoint.records_done = position
+        checkpoint.save()
+        if progress:
+            progress(totals)
+
+    @staticmethod
+    def _barcodes(isbn: str, record: Dict) -> List[str]:
+        """Barcodes given in the record, or '<isbn>-<n>' for a 'copies' count."""
+        if record.get('barcodes'):
+            return list(record['barcodes'])
+        count = int(record.get('copies') or 0)
+        return [f'{isbn}-{n}' for n in range(1, count + 1)]
+
+    def _existing_books(self, isbns: List[str]) -> Dict[str, int]:
+        """Map the ISBNs already in the catalog to their book IDs."""
+        existing = {}
+        for start in range(0, len(isbns), IN_FILTER_CHUNK_SIZE):
+            chunk = isbns[start:start + IN_FILTER_CHUNK_SIZE]
+            result = self.client.table('book').select('isbn, book_id').in_('isbn', chunk).execute()
+            existing.update((row['isbn'], row['book_id']) for row in result.data)
+        return existing
+
+    def _existing_links(self, book_ids: List[int]) -> set:
+        """('author' | 'category', book_id, id) for every link the books already have."""
+        links = set()
+        for start in range(0, len(book_ids), IN_FILTER_CHUNK_SIZE):
+            chunk = book_ids[start:start + IN_FILTER_CHUNK_SIZE]
+            for kind, table, column in (('author', 'book_author', 'author_id'),
+                                        ('category', 'book_category', 'category_id')):
+                rows = fetch_all(lambda: self.client.table(table).select(f'book_id, {column}').in_('book_id', chunk),
+                                 order=['book_id', column])
+                links.update((kind, row['book_id'], row[column]) for row in rows)
+        return links
+
+    def _invalid_records(self, records: Dict[str, Dict], existing: Dict[str, int]) -> Tuple[Set[str], Set[str]]:
+        """
+        Find the records that cannot be inserted whole.
+
+        A record is invalid if its authors, categories or barcodes are not
+        lists of names, its published year or copy count is not a number, or
+        one of its barcodes is repeated in the batch or belongs to another
+        book's copy.
+
+        Args:
+            records: Records by ISBN
+            existing: Book IDs of the records being completed after an interrupted run
+
+        Returns:
+            (ISBNs of the invalid records, barcodes already on their own unfinished book)
+        """
+        invalid = set()
+        owners: Dict[str, List[str]] = {}
+        for isbn, record in records.items():
+            try:
+                for key in LIST_FIELDS:
+                    values = record.get(key) or []
+                    if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+                        raise ValueError(f"'{key}' must be a list of names")
+                int(record.get('published_year') or 0)
+                barcodes = self._barcodes(isbn, record)
+            except (TypeError, ValueError):
+                invalid.add(isbn)
+                continue
+            for barcode in barcodes:
+                owners.setdefault(barcode, []).append(isbn)
+
+        present = set()
+        barcodes = list(owners)
+        for start in range(0, len(barcodes), IN_FILTER_CHUNK_SIZE):
+            chunk = barcodes[start:start + IN_FILTER_CHUNK_SIZE]
+            result = self.client.table('book_copy').select('barcode, book_id').in_('barcode', chunk).execute()
+            for row in result.data:
+                isbns = owners[row['barcode']]
+                if len(isbns) == 1 and existing.get(isbns[0]) == row['book_id']:
+                    present.add(row['barcode'])
+                else:
+                    invalid.update(isbns)
+        invalid.update(isbn for isbns in owners.values() if len(isbns) > 1 for isbn in isbns)
+        return invalid, present
+
+    def _create_missing(self, names: Dict[str, int], records: Iterable[Dict], key: str,
+                        dimension: DimensionMap) -> int:
+        """Insert names referenced by records but absent from the map, and add them to it."""
+        missing = list(dict.fromkeys(
+            name for record in records for name in record.get(key) or [] if name not in names
+        ))
+        if not missing:
+            return 0
+        result = self.client.table(dimension.table).insert([{dimension.name_column: name} for name in missing]).execute()
+        for row in result.data:
+            names[row[dimension.name_column]] = row[dimension.id_column]
+        dimension.bump()
+        return len(result.data)
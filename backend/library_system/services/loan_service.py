@@ -1,27 +1,160 @@
 """Loan service for managing loan operations."""
 
-from typing import List, Optional
+import logging
+import random
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from datetime import date, timedelta
 from library_system.models.loan import Loan
-from library_system.models.bookcopy import BookCopy
+from library_system.models.loan_table import LoanTable, COLUMNS as LOAN_TABLE_COLUMNS
 from library_system.database.connection import DatabaseConnection
 from library_system.utils.enums import LoanStatus, CopyStatus
-from library_system.services.book_service import BookService
+from library_system.services.book_service import BookService, IN_FILTER_CHUNK_SIZE
+from library_system.services.barcode_index import BarcodeIndex, CopyLocation
+from library_system.services.entity_cache import EntityCache, read_through
+from library_system.services.hold_queue import HoldQueue
+from library_system.utils.pagination import Page, paginate, DEFAULT_PAGE_SIZE
+
+# NOT NULL columns loans can be sorted on besides loan_id
+LOAN_SORT_COLUMNS = ('issue_date', 'due_date')
+
+# Columns of a loan row, selected explicitly by listings and LoanTable loads
+LOAN_COLUMNS = ', '.join(LOAN_TABLE_COLUMNS)
+
+# Rows fetched per request when loading a LoanTable
+LOAN_TABLE_PAGE_SIZE = 1000
+
+# Stored procedure claiming a copy and creating the loan in one round trip (see schema.sql)
+ISSUE_LOAN_PROCEDURE = 'issue_loan'
+
+# Stored procedure closing loans and holding each copy for the next reservation (see schema.sql)
+RETURN_LOANS_PROCEDURE = 'return_loans'
+
+# PostgREST error code for a function missing from the schema cache
+MISSING_PROCEDURE_CODE = 'PGRST202'
+
+# Available copies fetched per claim attempt when issuing without the procedure
+CLAIM_CANDIDATES = 5
+CLAIM_ATTEMPTS = 3
+
+# Maximum items in one batch issue or return (a patron's stack at the desk)
+MAX_BATCH_ITEMS = 100
+
+logger = logging.getLogger('library_system.loans')
+
+
+@dataclass
+class BatchIssueResult:
+    """Outcome of one item of a batch issue."""
+    book_id: int
+    loan: Optional[Loan] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {'book_id': self.book_id, 'loan': self.loan.to_dict() if self.loan else None, 'error': self.error}
+
+
+@dataclass
+class BatchReturnResult:
+    """Outcome of one item of a batch return."""
+    loan_id: int
+    returned: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {'loan_id': self.loan_id, 'returned': self.returned, 'error': self.error}
 
 
 class LoanService:
     """Service for loan-related operations."""
     
-    def __init__(self, db: DatabaseConnection):
-        """Initialize loan service with database connection."""
+    def __init__(self, db: DatabaseConnection, book_service: Optional[BookService] = None,
+                 claim_procedure: bool = True, barcode_index: Optional[BarcodeIndex] = None,
+                 cache: Optional[EntityCache] = None, hold_queue: Optional[HoldQueue] = None):
+        """
+        Initialize loan service with database connection.
+        
+        Args:
+            db: Database connection
+            book_service: Shared book service (a new one is created if omitted)
+            claim_procedure: Issue and return loans through the issue_loan and
+                return_loans database functions; each is turned off automatically
+                if it is not installed
+            barcode_index: Shared barcode index used by return_by_barcode (a new,
+                read-through one is created if omitted); registered as a listener
+            cache: Optional shared entity cache serving get_loan, invalidated by
+                every return and status change
+            hold_queue: Shared reservation hold queue (a new one is created if
+                omitted); registered as a listener
+        """
         self.db = db
         self.client = db.get_client()
-        self.book_service = BookService(db)
+        self.book_service = book_service or BookService(db)
+        self.claim_procedure = claim_procedure
+        self.barcode_index = barcode_index or BarcodeIndex(db)
+        self.cache = cache
+        self.hold_queue = hold_queue or HoldQueue(db)
+        self._missing_procedures = set()
+        self._listeners = [self.barcode_index, self.hold_queue]
+    
+    def add_listener(self, listener):
+        """
+        Register an object notified of loan changes made through this service.
+        
+        Listeners may implement loan_issued(loan, book_id),
+        loan_returned(loan_id, copy_id, book_id), copy_held(reservation_id,
+        copy_id, book_id) for a returned copy held for a reservation, and
+        hold_collected(reservation_id, copy_id, book_id) for a held copy
+        issued to its patron (sent before its loan_issued); missing methods
+        are skipped.
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: str, *args):
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+    
+    def _invalidate(self, *loan_ids: int):
+        if self.cache is not None:
+            self.cache.invalidate('loan', *loan_ids)
+    
+    def _call_procedure(self, name: str, params: Dict) -> Optional[List[Dict]]:
+        """
+        Call a database function.
+        
+        Returns:
+            The result rows, or None if procedures are turned off or the
+            function is not installed (remembered, so it is not called again)
+        """
+        if not self.claim_procedure or name in self._missing_procedures:
+            return None
+        try:
+            return self.client.rpc(name, params).execute().data
+        except Exception as e:
+            if getattr(e, 'code', None) != MISSING_PROCEDURE_CODE:
+                raise
+            logger.warning("Database function %s is missing; falling back to conditional updates", name)
+            self._missing_procedures.add(name)
+            return None
+    
+    def _hold_changed(self, event: str, reservation_id: int, copy_id: int, book_id: Optional[int]):
+        if self.cache is not None:
+            self.cache.invalidate('reservation', reservation_id)
+        self._notify(event, reservation_id, copy_id, book_id)
     
     def issue_book(self, member_id: int, book_id: int, librarian_id: int, loan_days: int = 14) -> Optional[Loan]:
         """
         Issue a book to a member if available copy exists.
         
+        The copy is claimed and the loan created by the issue_loan database
+        function in a single round trip, so concurrent issues of the same
+        book never share a copy. Without the function, copies are claimed
+        with a conditional update instead. A copy held for the member by a
+        reservation is issued first, completing the reservation.
+        
         Args:
             member_id: ID of the member
             book_id: ID of the book
@@ -31,72 +164,407 @@ class LoanService:
         Returns:
             Created loan or None if no available copy
         """
-        # Check for available copies
-        available_copies = self.book_service.get_available_copies(book_id)
-        if not available_copies:
-            return None  # No available copies
+        due_date = date.today() + timedelta(days=loan_days)
         
-        # Get first available copy
-        copy = available_copies[0]
+        rows = self._call_procedure(ISSUE_LOAN_PROCEDURE, {
+            'p_member_id': member_id,
+            'p_book_id': book_id,
+            'p_librarian_id': librarian_id,
+            'p_due_date': due_date.isoformat()
+        })
+        if rows is not None:
+            if not rows:
+                return None  # No available copies
+            created = Loan.from_dict(rows[0])
+        else:
+            created = self._issue_with_conditional_update(member_id, book_id, librarian_id, due_date)
+            if created is None:
+                return None
         
-        # Create loan
-        issue_date = date.today()
-        due_date = issue_date + timedelta(days=loan_days)
+        reservation_id = self.hold_queue.held_for(created.copy_id)
+        if reservation_id is not None:
+            self._hold_changed('hold_collected', reservation_id, created.copy_id, book_id)
+        self._notify('loan_issued', created, book_id)
+        return created
+    
+    def _issue_with_conditional_update(self, member_id: int, book_id: int, librarian_id: int,
+                                       due_date: date) -> Optional[Loan]:
+        """
+        Claim a copy with an update guarded by status='available', then create the loan.
+        
+        A copy held for the member is collected instead, by closing its
+        reservation while it is still active.
+        """
+        copy_id = None
+        collected = None
+        held = self.hold_queue.held_reservation(member_id, book_id)
+        if held is not None:
+            closed = self.client.table('reservation').update({'active': False}, count='exact', returning='minimal') \
+                .eq('reservation_id', held[0]).eq('active', True).execute()
+            if closed.count:
+                self.client.table('book_copy').update({'status': CopyStatus.LOANED.value}, returning='minimal') \
+                    .eq('copy_id', held[1]).execute()
+                collected = held
+                copy_id = held[1]
+        if copy_id is None:
+            copy_id = self._claim_copy(book_id)
+        if copy_id is None:
+            return None
         
         loan = Loan(
             member_id=member_id,
-            copy_id=copy.copy_id,
+            copy_id=copy_id,
             librarian_id=librarian_id,
-            issue_date=issue_date,
+            issue_date=date.today(),
             due_date=due_date,
             status=LoanStatus.ACTIVE
         )
-        
-        # Insert loan - exclude loan_id as it's auto-generated
         loan_dict = loan.to_dict()
-        loan_dict.pop('loan_id', None)  # Remove loan_id if present
-        result = self.client.table('loan').insert(loan_dict).execute()
-        if not result.data:
-            raise Exception("Failed to create loan")
+        loan_dict.pop('loan_id', None)
+        try:
+            result = self.client.table('loan').insert(loan_dict).execute()
+            if not result.data:
+                raise Exception("Failed to create loan")
+        except Exception:
+            # Give the copy back so it is not stranded as loaned: a collected hold goes back to its patron
+            if collected is not None:
+                self._restore_holds([collected])
+            else:
+                self._release_copies([copy_id])
+            raise
+        return Loan.from_dict(result.data[0])
+    
+    def _claim_copy(self, book_id: int) -> Optional[int]:
+        """
+        Mark one available copy of a book as loaned.
         
-        # Update copy status
-        self.client.table('book_copy').update({'status': CopyStatus.LOANED.value}).eq('copy_id', copy.copy_id).execute()
+        Each candidate is updated only while it is still available; a copy
+        taken by a concurrent issue matches no row and the next one is tried.
         
-        return Loan.from_dict(result.data[0])
+        Returns:
+            ID of the claimed copy, or None if no copy is available
+        """
+        for _ in range(CLAIM_ATTEMPTS):
+            result = self.client.table('book_copy').select('copy_id').eq('book_id', book_id) \
+                .eq('status', CopyStatus.AVAILABLE.value).order('copy_id').limit(CLAIM_CANDIDATES).execute()
+            if not result.data:
+                return None
+            # Spread concurrent callers over the candidates instead of all racing for the first
+            candidates = [row['copy_id'] for row in result.data]
+            random.shuffle(candidates)
+            for copy_id in candidates:
+                claimed = self.client.table('book_copy') \
+                    .update({'status': CopyStatus.LOANED.value}, count='exact', returning='minimal') \
+                    .eq('copy_id', copy_id).eq('status', CopyStatus.AVAILABLE.value).execute()
+                if claimed.count:
+                    return copy_id
+        return None
     
     def return_book(self, loan_id: int) -> bool:
         """
         Return a book and update loan status and copy availability.
         
+        The copy is held for the next waiting reservation of the book if
+        there is one (see return_books).
+        
+        Returns:
+            True if successful, False if the loan does not exist or is already returned
+        """
+        return self.return_books([loan_id])[0].returned
+    
+    def locate_copy(self, barcode: str) -> Optional[CopyLocation]:
+        """Find the copy with a barcode and the loan it is out on, if any."""
+        return self.barcode_index.lookup(barcode)
+    
+    def return_by_barcode(self, barcode: str) -> Optional[CopyLocation]:
+        """
+        Return the copy with a scanned barcode.
+        
+        The open loan comes from the barcode index, so a check-in is the
+        return writes alone. If the index was stale (the loan was already
+        closed elsewhere), the open loan is read from the database once.
+        
+        Args:
+            barcode: Barcode of the copy
+            
         Returns:
-            True if successful
+            The copy, with loan_id set to the returned loan (None if the copy
+            was not on loan), or None if no copy has this barcode
+        """
+        location = self.barcode_index.lookup(barcode)
+        if location is None:
+            return None
+        if location.loan_id is not None and self.return_books([location.loan_id])[0].returned:
+            return location
+        
+        location.loan_id = self.barcode_index.find_open_loan(location.copy_id)
+        if location.loan_id is not None and not self.return_books([location.loan_id])[0].returned:
+            location.loan_id = None
+        return location
+    
+    def issue_books(self, member_id: int, book_ids: List[int], librarian_id: int,
+                    loan_days: int = 14) -> List[BatchIssueResult]:
         """
-        # Get loan
-        loan_result = self.client.table('loan').select('*').eq('loan_id', loan_id).execute()
-        if not loan_result.data:
-            return False
+        Issue a stack of books to one member.
+        
+        Copies for all items are read in one query and claimed in one
+        update guarded by status='available', and the loans are inserted
+        together, so the number of round trips does not grow with the size
+        of the stack. Copies lost to a concurrent issue are re-claimed, up
+        to CLAIM_ATTEMPTS rounds. Copies held for the member by reservations
+        are collected first, completing those reservations, as in issue_book.
         
-        loan_data = loan_result.data[0]
-        copy_id = loan_data['copy_id']
+        Args:
+            member_id: ID of the member
+            book_ids: ID of the book for each item (repeat an ID for several copies)
+            librarian_id: ID of the librarian processing the loans
+            loan_days: Number of days for the loans (default 14)
+            
+        Returns:
+            One result per item, in request order
+            
+        Raises:
+            ValueError: If more than MAX_BATCH_ITEMS items are given
+        """
+        if len(book_ids) > MAX_BATCH_ITEMS:
+            raise ValueError(f"At most {MAX_BATCH_ITEMS} items can be issued at once")
         
-        # Update loan
-        return_date = date.today()
-        self.client.table('loan').update({
-            'return_date': return_date.isoformat(),
+        wanted = Counter(book_ids)
+        collected = self._collect_holds(member_id, list(wanted))
+        claimed: Dict[int, List[int]] = {book_id: [copy_id] for book_id, (_, copy_id) in collected.items()}
+        for _ in range(CLAIM_ATTEMPTS):
+            missing = {book_id: n - len(claimed.get(book_id, [])) for book_id, n in wanted.items()}
+            missing = {book_id: n for book_id, n in missing.items() if n > 0}
+            if not missing:
+                break
+            candidates = self._pick_available_copies(missing)
+            if not candidates:
+                break
+            rows = self._claim_copies(list(candidates))
+            for row in rows:
+                claimed.setdefault(candidates[row['copy_id']], []).append(row['copy_id'])
+            if len(rows) == len(candidates):
+                break  # Nothing lost to a concurrent issue; any shortfall is real
+        
+        due_date = date.today() + timedelta(days=loan_days)
+        loans_by_copy = {}
+        copy_ids = [copy_id for copies in claimed.values() for copy_id in copies]
+        if copy_ids:
+            rows = [{
+                'member_id': member_id,
+                'copy_id': copy_id,
+                'librarian_id': librarian_id,
+                'issue_date': date.today().isoformat(),
+                'due_date': due_date.isoformat(),
+                'status': LoanStatus.ACTIVE.value
+            } for copy_id in copy_ids]
+            try:
+                result = self.client.table('loan').insert(rows).execute()
+                if len(result.data) != len(rows):
+                    raise Exception("Failed to create loans")
+            except Exception:
+                held_copies = {copy_id for _, copy_id in collected.values()}
+                self._restore_holds(list(collected.values()))
+                self._release_copies([copy_id for copy_id in copy_ids if copy_id not in held_copies])
+                raise
+            loans_by_copy = {row['copy_id']: Loan.from_dict(row) for row in result.data}
+        
+        results = []
+        for book_id in book_ids:
+            copies = claimed.get(book_id)
+            if copies:
+                loan = loans_by_copy[copies.pop(0)]
+                held = collected.get(book_id)
+                if held is not None and held[1] == loan.copy_id:
+                    self._hold_changed('hold_collected', held[0], loan.copy_id, book_id)
+                self._notify('loan_issued', loan, book_id)
+                results.append(BatchIssueResult(book_id, loan=loan))
+            else:
+                results.append(BatchIssueResult(book_id, error="No available copies of this book"))
+        return results
+    
+    def return_books(self, loan_ids: List[int]) -> List[BatchReturnResult]:
+        """
+        Return a stack of loans.
+        
+        Each returned copy goes to its book's hold queue: it is held
+        (status 'reserved') for the oldest active reservation still waiting
+        for the book, or made available if nobody is waiting. The
+        return_loans database function does all of it in one round trip,
+        whatever the size of the stack. Without the function, the loans are
+        closed in one update, the first patron in line is given each copy
+        with a conditional update, and the copies' statuses are set in one
+        more update per status. Loans that do not exist or are already
+        returned are reported and left unchanged.
+        
+        Args:
+            loan_ids: IDs of the loans to return
+            
+        Returns:
+            One result per item, in request order
+            
+        Raises:
+            ValueError: If more than MAX_BATCH_ITEMS items are given
+        """
+        if len(loan_ids) > MAX_BATCH_ITEMS:
+            raise ValueError(f"At most {MAX_BATCH_ITEMS} items can be returned at once")
+        
+        returned = {}
+        unique_ids = list(dict.fromkeys(loan_ids))
+        if unique_ids:
+            rows = self._call_procedure(RETURN_LOANS_PROCEDURE, {'p_loan_ids': unique_ids})
+            if rows is None:
+                rows = self._return_with_conditional_updates(unique_ids)
+            returned = {row['loan_id']: row for row in rows}
+            self._invalidate(*returned)
+        
+        results = []
+        for loan_id in loan_ids:
+            row = returned.pop(loan_id, None)
+            if row is None:
+                results.append(BatchReturnResult(loan_id, error="Loan not found or already returned"))
+                continue
+            self._notify('loan_returned', loan_id, row['copy_id'], row['book_id'])
+            if row['reservation_id'] is not None:
+                self._hold_changed('copy_held', row['reservation_id'], row['copy_id'], row['book_id'])
+            results.append(BatchReturnResult(loan_id, returned=True))
+        return results
+    
+    def _return_with_conditional_updates(self, loan_ids: List[int]) -> List[Dict]:
+        """Close open loans and pass their copies to the hold queues without the return_loans function."""
+        result = self.client.table('loan').update({
+            'return_date': date.today().isoformat(),
             'status': LoanStatus.RETURNED.value
-        }).eq('loan_id', loan_id).execute()
+        }).in_('loan_id', loan_ids).in_('status', [LoanStatus.ACTIVE.value, LoanStatus.OVERDUE.value]).execute()
+        if not result.data:
+            return []
+        
+        copies = self.client.table('book_copy').select('copy_id, book_id') \
+            .in_('copy_id', [row['copy_id'] for row in result.data]).execute()
+        book_by_copy = {row['copy_id']: row['book_id'] for row in copies.data}
+        rows = []
+        by_status: Dict[str, List[int]] = {}
+        for row in result.data:
+            book_id = book_by_copy.get(row['copy_id'])
+            reservation_id = self.hold_queue.allocate(row['copy_id'], book_id) if book_id is not None else None
+            status = CopyStatus.RESERVED if reservation_id is not None else CopyStatus.AVAILABLE
+            by_status.setdefault(status.value, []).append(row['copy_id'])
+            rows.append({'loan_id': row['loan_id'], 'copy_id': row['copy_id'], 'book_id': book_id,
+                         'reservation_id': reservation_id})
+        for status, copy_ids in by_status.items():
+            self.client.table('book_copy').update({'status': status}, returning='minimal') \
+                .in_('copy_id', copy_ids).execute()
+        return rows
+    
+    def _collect_holds(self, member_id: int, book_ids: List[int]) -> Dict[int, Tuple[int, int]]:
+        """
+        Close the member's reservations whose copies are held for them and mark those copies loaned.
+        
+        Each reservation is closed only while it is still active, so a hold
+        expired or cancelled meanwhile is not collected.
+        
+        Returns:
+            Dictionary mapping each book ID whose held copy was collected to
+            (reservation_id, copy_id)
+        """
+        held = self.hold_queue.held_reservations(member_id, book_ids)
+        if not held:
+            return {}
+        rows = self.client.table('reservation').update({'active': False}) \
+            .in_('reservation_id', [reservation_id for reservation_id, _ in held.values()]) \
+            .eq('active', True).execute().data
+        closed = {row['reservation_id'] for row in rows}
+        collected = {book_id: hold for book_id, hold in held.items() if hold[0] in closed}
+        if collected:
+            self.client.table('book_copy').update({'status': CopyStatus.LOANED.value}, returning='minimal') \
+                .in_('copy_id', [copy_id for _, copy_id in collected.values()]).execute()
+        return collected
+    
+    def _pick_available_copies(self, wanted: Dict[int, int]) -> Dict[int, int]:
+        """
+        Choose available copies for several books in one query.
+        
+        Args:
+            wanted: Number of copies needed per book ID
+            
+        Returns:
+            Dictionary mapping each chosen copy ID to its book ID
+        """
+        result = self.client.table('book_copy').select('copy_id, book_id').in_('book_id', list(wanted)) \
+            .eq('status', CopyStatus.AVAILABLE.value).order('copy_id').execute()
+        by_book: Dict[int, List[int]] = {}
+        for row in result.data:
+            by_book.setdefault(row['book_id'], []).append(row['copy_id'])
+        
+        chosen = {}
+        for book_id, copy_ids in by_book.items():
+            for copy_id in random.sample(copy_ids, min(wanted[book_id], len(copy_ids))):
+                chosen[copy_id] = book_id
+        return chosen
+    
+    def _claim_copies(self, copy_ids: List[int]) -> List[Dict]:
+        """Mark copies loaned if still available; returns the rows actually claimed."""
+        return self.client.table('book_copy').update({'status': CopyStatus.LOANED.value}) \
+            .in_('copy_id', copy_ids).eq('status', CopyStatus.AVAILABLE.value).execute().data
+    
+    def _release_copies(self, copy_ids: List[int]):
+        """Make copies claimed from the shelf available again after a failed loan insert."""
+        if copy_ids:
+            self.client.table('book_copy').update({'status': CopyStatus.AVAILABLE.value}, returning='minimal') \
+                .in_('copy_id', copy_ids).execute()
+    
+    def _restore_holds(self, holds: List[Tuple[int, int]]):
+        """
+        Reopen collected reservations and hold their copies again after a failed loan insert.
         
-        # Update copy status to available
-        self.client.table('book_copy').update({'status': CopyStatus.AVAILABLE.value}).eq('copy_id', copy_id).execute()
+        The hold queue is only told about a collection once the loan exists,
+        so it still lists these holds and needs no update.
         
-        return True
+        Args:
+            holds: (reservation_id, copy_id) of each collected hold
+        """
+        if not holds:
+            return
+        self.client.table('reservation').update({'active': True}, returning='minimal') \
+            .in_('reservation_id', [reservation_id for reservation_id, _ in holds]).execute()
+        self.client.table('book_copy').update({'status': CopyStatus.RESERVED.value}, returning='minimal') \
+            .in_('copy_id', [copy_id for _, copy_id in holds]).execute()
     
     def get_loan(self, loan_id: int) -> Optional[Loan]:
         """Get loan by ID."""
-        result = self.client.table('loan').select('*').eq('loan_id', loan_id).execute()
-        if result.data:
-            return Loan.from_dict(result.data[0])
-        return None
+        def load():
+            result = self.client.table('loan').select('*').eq('loan_id', loan_id).execute()
+            return result.data[0] if result.data else None
+        
+        row = read_through(self.cache, 'loan', loan_id, load)
+        return Loan.from_dict(row) if row else None
+    
+    def get_all_loans(self) -> List[Loan]:
+        """Get all loans."""
+        result = self.client.table('loan').select('*').execute()
+        return [Loan.from_dict(row) for row in result.data]
+    
+    def get_loans_page(self, status: Optional[LoanStatus] = None, limit: int = DEFAULT_PAGE_SIZE,
+                       after: Optional[str] = None, sort: Optional[str] = None, raw: bool = False) -> Page:
+        """
+        Get one page of loans, optionally restricted to one status.
+        
+        Args:
+            status: Only return loans with this status
+            limit: Maximum number of loans
+            after: Cursor returned with the previous page
+            sort: 'loan_id' (default), 'issue_date' or 'due_date'; prefix '-' for descending
+            raw: Return the rows as fetched (same keys and values as Loan.to_dict())
+                instead of building Loan objects
+            
+        Returns:
+            Page of Loan objects, or of row dictionaries if raw
+        """
+        query = self.client.table('loan').select(LOAN_COLUMNS)
+        if status:
+            query = query.eq('status', status.value)
+        rows, next_cursor = paginate(query, 'loan_id', limit, after, sort, LOAN_SORT_COLUMNS)
+        return Page(rows if raw else [Loan.from_dict(row) for row in rows], next_cursor)
     
     def get_member_loans(self, member_id: int) -> List[Loan]:
         """Get all loans for a member."""
@@ -116,11 +584,60 @@ class LoanService:
             Number of loans updated
         """
         today = date.today()
+        # Count the updated rows instead of returning them
         result = self.client.table('loan').update({
             'status': LoanStatus.OVERDUE.value
-        }).eq('status', LoanStatus.ACTIVE.value).lt('due_date', today.isoformat()).is_('return_date', 'null').execute()
+        }, count='exact', returning='minimal').eq('status', LoanStatus.ACTIVE.value).lt('due_date', today.isoformat()).is_('return_date', 'null').execute()
         
-        return len(result.data) if result.data else 0
+        # The updated loans are not returned, so none of the cached ones can be trusted
+        if result.count and self.cache is not None:
+            self.cache.invalidate_table('loan')
+        return result.count or 0
+    
+    def mark_overdue(self, loan_ids: List[int]) -> int:
+        """
+        Mark specific loans overdue if they are still active.
+        
+        Args:
+            loan_ids: IDs of loans past their due date
+            
+        Returns:
+            Number of loans updated
+        """
+        updated = 0
+        for start in range(0, len(loan_ids), IN_FILTER_CHUNK_SIZE):
+            chunk = loan_ids[start:start + IN_FILTER_CHUNK_SIZE]
+            result = self.client.table('loan').update({
+                'status': LoanStatus.OVERDUE.value
+            }, count='exact', returning='minimal').in_('loan_id', chunk).eq('status', LoanStatus.ACTIVE.value).execute()
+            self._invalidate(*chunk)
+            updated += result.count or 0
+        return updated
+    
+    def get_loan_table(self, status: Optional[LoanStatus] = None) -> LoanTable:
+        """
+        Load loans into a column-oriented LoanTable, a page at a time.
+        
+        Meant for reports and sweeps over the whole loan history: rows go
+        straight into typed arrays without building Loan objects.
+        
+        Args:
+            status: Only load loans with this status
+            
+        Returns:
+            Table of the matching loans in loan_id order
+        """
+        table = LoanTable()
+        last_id = 0
+        while True:
+            query = self.client.table('loan').select(LOAN_COLUMNS).gt('loan_id', last_id)
+            if status:
+                query = query.eq('status', status.value)
+            result = query.order('loan_id').limit(LOAN_TABLE_PAGE_SIZE).execute()
+            table.extend(result.data)
+            if len(result.data) < LOAN_TABLE_PAGE_SIZE:
+                return table
+            last_id = result.data[-1]['loan_id']
     
     def get_overdue_loans(self) -> List[Loan]:
         """Get all overdue loans."""
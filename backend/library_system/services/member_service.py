@@ -1,18 +1,56 @@
 """Member service for managing member operations."""
 
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 from library_system.models.member import Member
 from library_system.database.connection import DatabaseConnection
+from library_system.services.entity_cache import EntityCache, read_through
+from library_system.services.reservation_service import ReservationService
 from library_system.utils.enums import MemberStatus
+from library_system.utils.pagination import Page, paginate, DEFAULT_PAGE_SIZE
+
+if TYPE_CHECKING:
+    from library_system.services.table_versions import TableVersions
+
+# NOT NULL columns members can be sorted on besides member_id
+MEMBER_SORT_COLUMNS = ('name', 'email', 'join_date')
+
+# Columns of a member row, selected explicitly by listings
+MEMBER_COLUMNS = 'member_id, name, email, phone, status, join_date'
 
 
 class MemberService:
     """Service for member-related operations."""
     
-    def __init__(self, db: DatabaseConnection):
-        """Initialize member service with database connection."""
+    def __init__(self, db: DatabaseConnection, versions: Optional['TableVersions'] = None,
+                 cache: Optional[EntityCache] = None,
+                 reservation_service: Optional[ReservationService] = None):
+        """
+        Initialize member service with database connection.
+        
+        Args:
+            db: Database connection
+            versions: Optional table version counters, bumped by every write
+                so member listings can be revalidated with an ETag
+            cache: Optional shared entity cache serving get_member, invalidated by
+                every update and delete
+            reservation_service: Shared reservation service, used to cancel a deleted
+                member's reservations and pass on their held copies (a new one is
+                created if omitted)
+        """
         self.db = db
         self.client = db.get_client()
+        self.versions = versions
+        self.cache = cache
+        self.reservation_service = reservation_service or ReservationService(db, cache=cache)
+    
+    def _changed(self, member_id: Optional[int] = None, cascade: bool = False):
+        if self.versions is not None:
+            self.versions.bump('member')
+        if self.cache is not None and member_id is not None:
+            self.cache.invalidate('member', member_id)
+            if cascade:
+                # Deleting a member deletes their reservations
+                self.cache.invalidate_table('reservation')
     
     def register_member(self, member: Member) -> Member:
         """Register a new member."""
@@ -21,42 +59,71 @@ class MemberService:
         member_dict.pop('member_id', None)  # Remove member_id if present
         result = self.client.table('member').insert(member_dict).execute()
         if result.data:
+            self._changed()
             return Member.from_dict(result.data[0])
         raise Exception("Failed to register member")
     
     def get_member(self, member_id: int) -> Optional[Member]:
         """Get member by ID."""
-        result = self.client.table('member').select('*').eq('member_id', member_id).execute()
-        if result.data:
-            return Member.from_dict(result.data[0])
-        return None
+        def load():
+            result = self.client.table('member').select('*').eq('member_id', member_id).execute()
+            return result.data[0] if result.data else None
+        
+        row = read_through(self.cache, 'member', member_id, load)
+        return Member.from_dict(row) if row else None
     
     def get_all_members(self) -> List[Member]:
         """Get all members."""
         result = self.client.table('member').select('*').execute()
         return [Member.from_dict(row) for row in result.data]
     
+    def get_members_page(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                         sort: Optional[str] = None, raw: bool = False) -> Page:
+        """
+        Get one page of members.
+        
+        Args:
+            limit: Maximum number of members
+            after: Cursor returned with the previous page
+            sort: 'member_id' (default), 'name', 'email' or 'join_date'; prefix '-' for descending
+            raw: Return the rows as fetched (same keys and values as Member.to_dict())
+                instead of building Member objects
+            
+        Returns:
+            Page of Member objects, or of row dictionaries if raw
+        """
+        query = self.client.table('member').select(MEMBER_COLUMNS)
+        rows, next_cursor = paginate(query, 'member_id', limit, after, sort, MEMBER_SORT_COLUMNS)
+        return Page(rows if raw else [Member.from_dict(row) for row in rows], next_cursor)
+    
     def update_member(self, member_id: int, member: Member) -> Optional[Member]:
         """Update member information."""
         result = self.client.table('member').update(member.to_dict()).eq('member_id', member_id).execute()
         if result.data:
+            self._changed(member_id)
             return Member.from_dict(result.data[0])
         return None
     
     def suspend_member(self, member_id: int) -> bool:
         """Suspend a member account."""
         result = self.client.table('member').update({'status': MemberStatus.SUSPENDED.value}).eq('member_id', member_id).execute()
+        self._changed(member_id)
         return bool(result.data)
     
     def deactivate_member(self, member_id: int) -> bool:
         """Deactivate a member account."""
         result = self.client.table('member').update({'status': MemberStatus.INACTIVE.value}).eq('member_id', member_id).execute()
+        self._changed(member_id)
         return bool(result.data)
     
     def delete_member(self, member_id: int) -> bool:
         """
         Delete member if no active loans exist.
         
+        The member's active reservations are cancelled first, so a copy held
+        for one of them passes to the next patron in the book's hold queue
+        or goes back on the shelf instead of staying reserved for nobody.
+        
         Returns:
             True if deleted, False if member has active loans
         """
@@ -65,7 +132,13 @@ class MemberService:
         if loan_result.data:
             return False  # Member has active loans, cannot delete
         
+        reservations = self.client.table('reservation').select('reservation_id') \
+            .eq('member_id', member_id).eq('active', True).execute()
+        for row in reservations.data:
+            self.reservation_service.cancel_reservation(row['reservation_id'])
+        
         # Delete member (cascade will handle related records)
         self.client.table('member').delete().eq('member_id', member_id).execute()
+        self._changed(member_id, cascade=True)
         return True
 
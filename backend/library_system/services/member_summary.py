@@ -0,0 +1,131 @@
+"""Account summary of one member: record, open loans and holds in one response."""
+
+from datetime import date
+from typing import Dict, List, Optional
+from library_system.database.connection import DatabaseConnection
+from library_system.models.reservation import Reservation
+from library_system.services.barcode_index import OPEN_LOAN_STATUSES
+from library_system.services.book_service import IN_FILTER_CHUNK_SIZE
+from library_system.services.hold_queue import HoldQueue
+from library_system.services.loan_service import LOAN_COLUMNS
+from library_system.services.member_service import MemberService
+from library_system.services.reservation_service import RESERVATION_COLUMNS
+from library_system.utils.enums import LoanStatus
+
+
+class MemberSummaryService:
+    """
+    Builds the desk view of one member from a fixed number of set-based queries.
+
+    Each step is a separate method so the async facade can run independent
+    steps at the same time: the member, open loans and active reservations
+    first, then the books of the loaned copies and the hold queues, then
+    the titles. However many loans and holds the member has, the summary
+    costs at most six queries in three rounds.
+    """
+
+    def __init__(self, db: DatabaseConnection, member_service: Optional[MemberService] = None,
+                 hold_queue: Optional[HoldQueue] = None):
+        """
+        Initialize the summary service.
+
+        Args:
+            db: Database connection
+            member_service: Shared member service, whose cache serves the member
+                record (a new one is created if omitted)
+            hold_queue: Shared reservation hold queue giving queue positions
+                (a new one is created if omitted)
+        """
+        self.db = db
+        self.client = db.get_client()
+        self.member_service = member_service or MemberService(db)
+        self.hold_queue = hold_queue or HoldQueue(db)
+
+    def open_loans(self, member_id: int) -> List[Dict]:
+        """Active and overdue loan rows of a member, oldest due date first."""
+        return self.client.table('loan').select(LOAN_COLUMNS).eq('member_id', member_id) \
+            .in_('status', OPEN_LOAN_STATUSES).order('due_date').order('loan_id').execute().data
+
+    def active_reservations(self, member_id: int) -> List[Dict]:
+        """Active reservation rows of a member, oldest first."""
+        return self.client.table('reservation').select(RESERVATION_COLUMNS).eq('member_id', member_id) \
+            .eq('active', True).order('created_at').order('reservation_id').execute().data
+
+    def books_by_copy(self, copy_ids: List[int]) -> Dict[int, int]:
+        """Map copy IDs to their book IDs."""
+        return self._lookup('book_copy', 'copy_id', 'book_id', copy_ids)
+
+    def titles(self, book_ids: List[int]) -> Dict[int, str]:
+        """Map book IDs to titles."""
+        return self._lookup('book', 'book_id', 'title', book_ids)
+
+    def queue_positions(self, reservations: List[Dict]) -> Dict[int, Optional[int]]:
+        """Hold queue position of each reservation row (see HoldQueue.position)."""
+        return self.hold_queue.positions([Reservation.from_dict(row) for row in reservations])
+
+    def get_summary(self, member_id: int) -> Optional[Dict]:
+        """
+        Get the account summary of a member, running every step in turn.
+
+        Returns:
+            The summary (see assemble), or None if the member does not exist
+        """
+        member = self.member_service.get_member(member_id)
+        if member is None:
+            return None
+        loans = self.open_loans(member_id)
+        reservations = self.active_reservations(member_id)
+        books = self.books_by_copy([loan['copy_id'] for loan in loans])
+        positions = self.queue_positions(reservations)
+        titles = self.titles(list(books.values()) + [row['book_id'] for row in reservations])
+        return self.assemble(member.to_dict(), loans, reservations, books, titles, positions)
+
+    @staticmethod
+    def assemble(member: Dict, loans: List[Dict], reservations: List[Dict], books: Dict[int, int],
+                 titles: Dict[int, str], positions: Dict[int, Optional[int]],
+                 today: Optional[date] = None) -> Dict:
+        """
+        Combine the fetched rows into the summary.
+
+        Returns:
+            Dictionary with the member record, open loans (with book ID, title
+            and days overdue), holds (with title and queue position; 0 means
+            a copy is waiting to be collected) and counts
+        """
+        today = today or date.today()
+        open_loans = []
+        for loan in loans:
+            book_id = books.get(loan['copy_id'])
+            days_overdue = (today - date.fromisoformat(str(loan['due_date']))).days
+            open_loans.append({
+                **loan,
+                'book_id': book_id,
+                'title': titles.get(book_id),
+                'days_overdue': max(days_overdue, 0),
+            })
+        holds = [{
+            **row,
+            'title': titles.get(row['book_id']),
+            'position': positions.get(row['reservation_id']),
+        } for row in reservations]
+        return {
+            'member': member,
+            'loans': open_loans,
+            'holds': holds,
+            'counts': {
+                'open_loans': len(open_loans),
+                'overdue_loans': sum(1 for loan in open_loans
+                                     if loan['status'] == LoanStatus.OVERDUE.value or loan['days_overdue'] > 0),
+                'holds': len(holds),
+                'ready_for_pickup': sum(1 for hold in holds if hold['position'] == 0),
+            },
+        }
+
+    def _lookup(self, table: str, key_column: str, value_column: str, keys: List[int]) -> Dict[int, object]:
+        values = {}
+        keys = list(dict.fromkeys(keys))
+        for start in range(0, len(keys), IN_FILTER_CHUNK_SIZE):
+            chunk = keys[start:start + IN_FILTER_CHUNK_SIZE]
+            result = self.client.table(table).select(f'{key_column}, {value_column}').in_(key_column, chunk).execute()
+            values.update((row[key_column], row[value_column]) for row in result.data)
+        return values
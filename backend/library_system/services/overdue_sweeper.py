@@ -0,0 +1,146 @@
+"""Background sweeper marking loans overdue as their due dates pass."""
+
+import heapq
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from library_system.models.loan import Loan
+from library_system.services.loan_service import LoanService
+from library_system.utils.enums import LoanStatus
+
+DEFAULT_RESYNC_SECONDS = 3600
+
+
+class OverdueSweeper:
+    """
+    Min-heap of active loans keyed by due date (as a day ordinal).
+
+    Each sweep pops only the loans whose due date has passed and marks them
+    overdue in one bulk update, so the cost is proportional to the number of
+    loans that just expired rather than to the size of the loan table.
+
+    The heap is loaded from the database at start-up and kept current through
+    LoanService listener callbacks. Returned loans are dropped lazily: they
+    stay in the heap but are skipped when popped. Loans issued by other
+    processes are picked up by a periodic full reload; loans issued and
+    returned while a reload reads the table are replayed onto its result.
+    """
+
+    def __init__(self, loan_service: LoanService, resync_seconds: float = DEFAULT_RESYNC_SECONDS):
+        """
+        Args:
+            loan_service: Service used to load and update loans
+            resync_seconds: Seconds between full reloads of the active loans
+        """
+        self.loan_service = loan_service
+        self.resync_seconds = resync_seconds
+        self._heap: List[Tuple[int, int]] = []
+        self._due: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # Listener events seen while load() runs: (loan_id, due date ordinal, or None for a return)
+        self._pending: Optional[List[Tuple[int, Optional[int]]]] = None
+
+        self.last_run_at: Optional[float] = None
+        self.last_flipped = 0
+        self.last_duration_ms = 0.0
+        self.total_flipped = 0
+
+    def load(self) -> int:
+        """
+        Rebuild the heap from the active loans in the database.
+
+        Loans issued and returned while the table is read are recorded and
+        applied to the new heap, so the reload cannot drop or revive them.
+
+        Returns:
+            Number of active loans tracked
+        """
+        with self._lock:
+            self._pending = []
+        try:
+            loans = self.loan_service.get_loan_table(LoanStatus.ACTIVE)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        heap = list(zip(loans.due_date, loans.loan_id))
+        due = dict(zip(loans.loan_id, loans.due_date))
+        with self._lock:
+            for loan_id, due_date in self._pending:
+                if due_date is None:
+                    due.pop(loan_id, None)
+                else:
+                    due[loan_id] = due_date
+                    heap.append((due_date, loan_id))
+            heapq.heapify(heap)
+            self._heap = heap
+            self._due = due
+            self._pending = None
+            self._loaded_at = time.monotonic()
+        return len(due)
+
+    def sweep(self, today: Optional[date] = None) -> int:
+        """
+        Mark loans due before today as overdue.
+
+        Args:
+            today: Reference date (defaults to today)
+
+        Returns:
+            Number of loans marked overdue
+        """
+        start = time.perf_counter()
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.resync_seconds:
+            self.load()
+
+        today = (today or date.today()).toordinal()
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < today:
+                due_date, loan_id = heapq.heappop(self._heap)
+                # Skip entries for loans returned or re-dated since they were pushed
+                if self._due.get(loan_id) == due_date:
+                    del self._due[loan_id]
+                    expired.append(loan_id)
+
+        flipped = self.loan_service.mark_overdue(expired) if expired else 0
+
+        self.last_run_at = time.time()
+        self.last_flipped = flipped
+        self.last_duration_ms = (time.perf_counter() - start) * 1000
+        self.total_flipped += flipped
+        return flipped
+
+    def loan_issued(self, loan: Loan, book_id: Optional[int] = None):
+        """LoanService listener: track a new active loan."""
+        if loan.loan_id is None or loan.due_date is None:
+            return
+        due_date = loan.due_date.toordinal()
+        with self._lock:
+            self._due[loan.loan_id] = due_date
+            heapq.heappush(self._heap, (due_date, loan.loan_id))
+            if self._pending is not None:
+                self._pending.append((loan.loan_id, due_date))
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: stop tracking a returned loan."""
+        with self._lock:
+            self._due.pop(loan_id, None)
+            if self._pending is not None:
+                self._pending.append((loan_id, None))
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            tracked = len(self._due)
+            next_due = date.fromordinal(self._heap[0][0]).isoformat() if self._heap else None
+        return {
+            'tracked_loans': tracked,
+            'next_due_date': next_due,
+            'last_run_at': self.last_run_at,
+            'last_flipped': self.last_flipped,
+            'last_duration_ms': round(self.last_duration_ms, 2),
+            'total_flipped': self.total_flipped,
+        }
@@ -1,21 +1,88 @@
 """Reservation service for managing reservation operations."""
 
-from typing import List, Optional
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 from datetime import date, timedelta
 from library_system.models.reservation import Reservation
 from library_system.database.connection import DatabaseConnection
+from library_system.services.entity_cache import EntityCache, read_through
+from library_system.services.hold_queue import HoldQueue
+from library_system.services.loan_service import MISSING_PROCEDURE_CODE
+from library_system.utils.pagination import Page, paginate, DEFAULT_PAGE_SIZE
+
+# NOT NULL columns reservations can be sorted on besides reservation_id
+RESERVATION_SORT_COLUMNS = ('created_at', 'expires_at')
+
+# Columns of a reservation row, selected explicitly by listings
+RESERVATION_COLUMNS = 'reservation_id, member_id, book_id, created_at, expires_at, active, copy_id'
+
+# Stored procedure deactivating expired reservations and passing on their held copies (see schema.sql)
+EXPIRE_RESERVATIONS_PROCEDURE = 'expire_reservations'
+
+logger = logging.getLogger('library_system.reservations')
+
+
+@dataclass
+class ExpiryResult:
+    """Outcome of one expiry sweep."""
+    expired: int = 0
+    released: int = 0
+    passed_on: int = 0
+    duration_ms: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'expired': self.expired,
+            'released': self.released,
+            'passed_on': self.passed_on,
+            'duration_ms': round(self.duration_ms, 2),
+        }
 
 
 class ReservationService:
     """Service for reservation-related operations."""
     
-    def __init__(self, db: DatabaseConnection):
-        """Initialize reservation service with database connection."""
+    def __init__(self, db: DatabaseConnection, cache: Optional[EntityCache] = None,
+                 hold_queue: Optional[HoldQueue] = None, expire_procedure: bool = True):
+        """
+        Initialize reservation service with database connection.
+        
+        Args:
+            db: Database connection
+            cache: Optional shared entity cache serving get_reservation,
+                invalidated by every update
+            hold_queue: Shared reservation hold queue, also used by LoanService
+                (a new one is created if omitted)
+            expire_procedure: Expire reservations through the expire_reservations
+                database function; turned off automatically if it is not installed
+        """
         self.db = db
         self.client = db.get_client()
+        self.cache = cache
+        self.hold_queue = hold_queue or HoldQueue(db)
+        self.expire_procedure = expire_procedure
+        self._listeners = []
+    
+    def add_listener(self, listener):
+        """
+        Register an object notified of hold changes made through this service.
+        
+        Listeners may implement hold_released(reservation_id, copy_id, book_id),
+        sent when a cancelled or expired reservation's held copy is made
+        available because nobody else is waiting; missing methods are skipped.
+        """
+        self._listeners.append(listener)
+    
+    def _notify(self, event: str, *args):
+        for listener in self._listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
     
     def create_reservation(self, member_id: int, book_id: int, days_valid: int = 14) -> Reservation:
-        """Create a new reservation."""
+        """Create a new reservation at the back of the book's hold queue."""
         created_at = date.today()
         expires_at = created_at + timedelta(days=days_valid)
         
@@ -32,23 +99,147 @@ class ReservationService:
         reservation_dict.pop('reservation_id', None)  # Remove reservation_id if present
         result = self.client.table('reservation').insert(reservation_dict).execute()
         if result.data:
-            return Reservation.from_dict(result.data[0])
+            created = Reservation.from_dict(result.data[0])
+            self.hold_queue.add(created)
+            return created
         raise Exception("Failed to create reservation")
     
     def get_reservation(self, reservation_id: int) -> Optional[Reservation]:
         """Get reservation by ID."""
-        result = self.client.table('reservation').select('*').eq('reservation_id', reservation_id).execute()
-        if result.data:
-            return Reservation.from_dict(result.data[0])
-        return None
+        def load():
+            result = self.client.table('reservation').select('*').eq('reservation_id', reservation_id).execute()
+            return result.data[0] if result.data else None
+        
+        row = read_through(self.cache, 'reservation', reservation_id, load)
+        return Reservation.from_dict(row) if row else None
+    
+    def get_all_reservations(self) -> List[Reservation]:
+        """Get all reservations."""
+        result = self.client.table('reservation').select('*').execute()
+        return [Reservation.from_dict(row) for row in result.data]
+    
+    def get_reservations_page(self, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None,
+                              sort: Optional[str] = None, raw: bool = False) -> Page:
+        """
+        Get one page of reservations.
+        
+        Args:
+            limit: Maximum number of reservations
+            after: Cursor returned with the previous page
+            sort: 'reservation_id' (default), 'created_at' or 'expires_at'; prefix '-' for descending
+            raw: Return the rows as fetched (same keys and values as Reservation.to_dict())
+                instead of building Reservation objects
+            
+        Returns:
+            Page of Reservation objects, or of row dictionaries if raw
+        """
+        query = self.client.table('reservation').select(RESERVATION_COLUMNS)
+        rows, next_cursor = paginate(query, 'reservation_id', limit, after, sort, RESERVATION_SORT_COLUMNS)
+        return Page(rows if raw else [Reservation.from_dict(row) for row in rows], next_cursor)
     
     def get_member_reservations(self, member_id: int) -> List[Reservation]:
         """Get all reservations for a member."""
         result = self.client.table('reservation').select('*').eq('member_id', member_id).execute()
         return [Reservation.from_dict(row) for row in result.data]
     
+    def queue_position(self, reservation_id: int) -> Optional[int]:
+        """
+        Position of a reservation in its book's hold queue.
+        
+        Returns:
+            1 for the next patron to be given a returned copy, 0 if a copy is
+            already held for the reservation, or None if the reservation does
+            not exist or is no longer waiting
+        """
+        reservation = self.get_reservation(reservation_id)
+        if reservation is None:
+            return None
+        return self.hold_queue.position(reservation)
+    
     def cancel_reservation(self, reservation_id: int) -> bool:
-        """Cancel a reservation."""
-        result = self.client.table('reservation').update({'active': False}).eq('reservation_id', reservation_id).execute()
-        return bool(result.data)
-
+        """
+        Cancel an active reservation.
+        
+        A copy held for it passes to the next patron in the book's hold
+        queue, or goes back on the shelf if nobody is waiting.
+        """
+        result = self.client.table('reservation').update({'active': False}) \
+            .eq('reservation_id', reservation_id).eq('active', True).execute()
+        if self.cache is not None:
+            self.cache.invalidate('reservation', reservation_id)
+        if not result.data:
+            return False
+        
+        cancelled = Reservation.from_dict(result.data[0])
+        self.hold_queue.remove(reservation_id, cancelled.book_id, cancelled.copy_id)
+        if cancelled.copy_id is not None:
+            next_id = self.hold_queue.release(cancelled.copy_id, cancelled.book_id)
+            if next_id is None:
+                self._notify('hold_released', reservation_id, cancelled.copy_id, cancelled.book_id)
+            elif self.cache is not None:
+                self.cache.invalidate('reservation', next_id)
+        return True
+    
+    def expire_reservations(self, today: Optional[date] = None) -> ExpiryResult:
+        """
+        Deactivate every active reservation that expired before today.
+        
+        All of them are deactivated by one update served by the
+        idx_reservation_expiry index, so a sweep that finds nothing costs
+        one cheap round trip and running it again changes nothing. A copy
+        held for an expired reservation passes to the next patron in the
+        book's hold queue, or goes back on the shelf. The expire_reservations
+        database function does all of it in one round trip; without it, held
+        copies are passed on with conditional updates.
+        
+        Args:
+            today: Reference date (defaults to today)
+            
+        Returns:
+            Number of reservations expired and of held copies released or passed on
+        """
+        start = time.perf_counter()
+        today = today or date.today()
+        rows = None
+        if self.expire_procedure:
+            try:
+                rows = self.client.rpc(EXPIRE_RESERVATIONS_PROCEDURE, {'p_today': today.isoformat()}).execute().data
+            except Exception as e:
+                if getattr(e, 'code', None) != MISSING_PROCEDURE_CODE:
+                    raise
+                logger.warning("Database function %s is missing; expiring reservations with conditional updates",
+                               EXPIRE_RESERVATIONS_PROCEDURE)
+                self.expire_procedure = False
+        if rows is None:
+            rows = self._expire_with_conditional_updates(today)
+        
+        result = ExpiryResult(expired=len(rows))
+        if rows and self.cache is not None:
+            self.cache.invalidate('reservation', *[row['reservation_id'] for row in rows],
+                                  *[row['next_reservation_id'] for row in rows if row['next_reservation_id']])
+        for row in rows:
+            self.hold_queue.remove(row['reservation_id'], row['book_id'], row['copy_id'])
+            if row['copy_id'] is None:
+                continue
+            if row['next_reservation_id'] is not None:
+                self.hold_queue.copy_held(row['next_reservation_id'], row['copy_id'], row['book_id'])
+                result.passed_on += 1
+            else:
+                self._notify('hold_released', row['reservation_id'], row['copy_id'], row['book_id'])
+                result.released += 1
+        result.duration_ms = (time.perf_counter() - start) * 1000
+        return result
+    
+    def _expire_with_conditional_updates(self, today: date) -> List[Dict]:
+        """Deactivate expired reservations and pass on their held copies without the database function."""
+        result = self.client.table('reservation').update({'active': False}) \
+            .eq('active', True).lt('expires_at', today.isoformat()).execute()
+        rows = []
+        for row in result.data:
+            next_id = None
+            if row['copy_id'] is not None:
+                self.hold_queue.remove(row['reservation_id'], row['book_id'], row['copy_id'])
+                next_id = self.hold_queue.release(row['copy_id'], row['book_id'], today)
+            rows.append({'reservation_id': row['reservation_id'], 'book_id': row['book_id'],
+                         'copy_id': row['copy_id'], 'next_reservation_id': next_id})
+        return rows
@@ -0,0 +1,64 @@
+"""Background sweeper deactivating reservations as they expire."""
+
+import threading
+import time
+from datetime import date
+from typing import Dict, Optional
+from library_system.services.reservation_service import ReservationService, ExpiryResult
+
+
+class ReservationSweeper:
+    """
+    Runs ReservationService.expire_reservations() and keeps its counters.
+
+    Each sweep is one set-based update (plus one small update per held copy
+    it frees), and a sweep that finds nothing expired changes nothing, so it
+    can run every minute.
+    """
+
+    def __init__(self, reservation_service: ReservationService):
+        """
+        Args:
+            reservation_service: Service used to expire reservations
+        """
+        self.reservation_service = reservation_service
+        self._lock = threading.Lock()
+
+        self.last_run_at: Optional[float] = None
+        self.last_result = ExpiryResult()
+        self.total_expired = 0
+        self.total_released = 0
+        self.total_passed_on = 0
+
+    def sweep(self, today: Optional[date] = None) -> ExpiryResult:
+        """
+        Expire the reservations that ended before today.
+
+        Args:
+            today: Reference date (defaults to today)
+
+        Returns:
+            Counts and timing of the sweep
+        """
+        result = self.reservation_service.expire_reservations(today)
+        with self._lock:
+            self.last_run_at = time.time()
+            self.last_result = result
+            self.total_expired += result.expired
+            self.total_released += result.released
+            self.total_passed_on += result.passed_on
+        return result
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                'last_run_at': self.last_run_at,
+                'last_expired': self.last_result.expired,
+                'last_released': self.last_result.released,
+                'last_passed_on': self.last_result.passed_on,
+                'last_duration_ms': round(self.last_result.duration_ms, 2),
+                'total_expired': self.total_expired,
+                'total_released': self.total_released,
+                'total_passed_on': self.total_passed_on,
+            }
@@ -0,0 +1,200 @@
+"""Session service issuing signed tokens and caching resolved principals."""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from library_system.models.user import User
+from library_system.services.auth_service import AuthService
+from library_system.utils.enums import RoleName
+from library_system.utils.ttl_cache import TTLCache
+
+DEFAULT_SESSION_TTL_SECONDS = 8 * 60 * 60
+DEFAULT_SESSION_CACHE_SIZE = 10000
+
+# Cached sessions are re-checked against the database at least this often, so a
+# logout or role change on another worker takes effect within this window
+DEFAULT_SESSION_REVALIDATE_SECONDS = 60
+
+
+@dataclass
+class Principal:
+    """An authenticated user together with the data authorization checks need."""
+    user: User
+    librarian_id: Optional[int] = None
+    expires_at: Optional[float] = None
+
+
+class SessionService:
+    """
+    Service for token-based sessions.
+
+    Tokens have the form ``<user_id>.<expires_at>.<nonce>.<signature>`` and are
+    signed with HMAC-SHA256. Resolved principals are cached per token, so a
+    valid token is authorized without touching the database. If a token is
+    not in the cache (e.g. issued by another worker sharing SESSION_SECRET,
+    or cached longer than revalidate_seconds ago), its revocation is checked
+    and the user is reloaded once by ID.
+
+    Logouts are recorded in the revoked_session table until the token
+    expires, so every worker rejects a logged-out token: the worker that
+    logged it out at once, the others within revalidate_seconds.
+    """
+
+    def __init__(self, auth_service: AuthService, secret: Optional[str] = None,
+                 ttl_seconds: Optional[int] = None, cache_size: Optional[int] = None,
+                 revalidate_seconds: Optional[float] = None):
+        """
+        Initialize session service.
+
+        Args:
+            auth_service: Service used to verify credentials and load users
+            secret: Signing key (defaults to SESSION_SECRET env var, or a random
+                per-process key if unset)
+            ttl_seconds: Token lifetime (defaults to SESSION_TTL_SECONDS env var or 8 hours)
+            cache_size: Maximum cached sessions (defaults to SESSION_CACHE_SIZE env var or 10000)
+            revalidate_seconds: Seconds a resolved session is served from the cache
+                (defaults to SESSION_REVALIDATE_SECONDS env var or 60; 0 checks every use)
+        """
+        self.auth_service = auth_service
+        secret = secret or os.getenv('SESSION_SECRET') or secrets.token_hex(32)
+        self._secret = secret.encode()
+        self.ttl_seconds = ttl_seconds or int(os.getenv('SESSION_TTL_SECONDS', DEFAULT_SESSION_TTL_SECONDS))
+        self.cache = TTLCache(
+            max_size=cache_size or int(os.getenv('SESSION_CACHE_SIZE', DEFAULT_SESSION_CACHE_SIZE)),
+            ttl_seconds=self.ttl_seconds
+        )
+        if revalidate_seconds is None:
+            revalidate_seconds = float(os.getenv('SESSION_REVALIDATE_SECONDS', DEFAULT_SESSION_REVALIDATE_SECONDS))
+        self.revalidate_seconds = revalidate_seconds
+        # Hashes of tokens logged out by this worker, kept until the tokens expire
+        self._revoked: Dict[str, int] = {}
+        self._revoked_lock = threading.Lock()
+
+    def login(self, email: str, password: str) -> Optional[Tuple[str, Principal]]:
+        """
+        Authenticate credentials and open a session.
+
+        Returns:
+            (token, principal) if authentication successful, None otherwise
+        """
+        principal = self.authenticate(email, password)
+        if not principal:
+            return None
+
+        principal.expires_at = int(time.time()) + self.ttl_seconds
+        token = self._sign(principal.user.user_id, principal.expires_at)
+        self._cache(token, principal)
+        return token, principal
+
+    def authenticate(self, email: str, password: str) -> Optional[Principal]:
+        """
+        Verify credentials without opening a session.
+
+        Returns:
+            Principal if authentication successful, None otherwise
+        """
+        user = self.auth_service.authenticate(email, password)
+        if not user:
+            return None
+        return Principal(user=user, librarian_id=self._librarian_id(user))
+
+    def resolve(self, token: str) -> Optional[Principal]:
+        """
+        Resolve a token to its principal.
+
+        Returns:
+            Principal if the token is valid, unexpired and not revoked, None otherwise
+        """
+        principal = self.cache.get(token)
+        if principal is not None:
+            if principal.expires_at <= time.time():
+                self.cache.pop(token)
+                return None
+            return principal
+
+        parsed = self._verify(token)
+        if parsed is None or self._is_revoked(self._hash(token)):
+            return None
+
+        user_id, expires_at = parsed
+        user = self.auth_service.get_user(user_id)
+        if not user:
+            return None
+
+        principal = Principal(user=user, librarian_id=self._librarian_id(user), expires_at=expires_at)
+        self._cache(token, principal)
+        return principal
+
+    def logout(self, token: str) -> bool:
+        """End a session on every worker. Returns True if the token was valid and not yet logged out."""
+        parsed = self._verify(token)
+        token_hash = self._hash(token)
+        if parsed is None or self._is_revoked(token_hash):
+            return False
+        user_id, expires_at = parsed
+        self.auth_service.revoke_session(token_hash, user_id, expires_at)
+        now = time.time()
+        with self._revoked_lock:
+            self._revoked = {key: expiry for key, expiry in self._revoked.items() if expiry > now}
+            self._revoked[token_hash] = expires_at
+        self.cache.pop(token)
+        return True
+
+    def evict_user(self, user_id: int) -> int:
+        """
+        Drop cached sessions for a user so their role is reloaded on next use.
+
+        Returns:
+            Number of cached sessions evicted
+        """
+        return self.cache.evict_where(lambda token, principal: principal.user.user_id == user_id)
+
+    def _cache(self, token: str, principal: Principal):
+        ttl_seconds = min(self.revalidate_seconds, principal.expires_at - time.time())
+        if ttl_seconds > 0:
+            self.cache.set(token, principal, ttl_seconds=ttl_seconds)
+
+    def _is_revoked(self, token_hash: str) -> bool:
+        with self._revoked_lock:
+            if token_hash in self._revoked:
+                return True
+        return self.auth_service.is_session_revoked(token_hash)
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _librarian_id(self, user: User) -> Optional[int]:
+        """Look up the employee ID for staff users."""
+        if user.role in [RoleName.LIBRARIAN, RoleName.ADMINISTRATOR]:
+            return self.auth_service.get_librarian_id(user.user_id)
+        return None
+
+    def _signature(self, payload: str) -> str:
+        digest = hmac.new(self._secret, payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+    def _sign(self, user_id: int, expires_at: int) -> str:
+        payload = f"{user_id}.{expires_at}.{secrets.token_urlsafe(12)}"
+        return f"{payload}.{self._signature(payload)}"
+
+    def _verify(self, token: str) -> Optional[Tuple[int, int]]:
+        """Check signature and expiry, returning (user_id, expires_at) if valid."""
+        try:
+            payload, signature = token.rsplit('.', 1)
+            user_id, expires_at, _ = payload.split('.', 2)
+            user_id, expires_at = int(user_id), int(expires_at)
+        except ValueError:
+            return None
+
+        if not hmac.compare_digest(signature, self._signature(payload)):
+            return None
+        if expires_at <= time.time():
+            return None
+        return user_id, expires_at
@@ -0,0 +1,100 @@
+"""Per-table version counters used as ETags for listing endpoints."""
+
+import secrets
+import threading
+import time
+from typing import Callable, Dict, Optional
+from library_system.models.loan import Loan
+
+# ETags also change at least this often, bounding how long a client can be told
+# "not modified" about writes made by another process
+DEFAULT_VERSION_MAX_AGE_SECONDS = 300
+
+
+class TableVersions:
+    """
+    Version counters bumped by the write methods of BookService and MemberService.
+
+    A listing is unchanged while its table's counter is, so the listing's
+    ETag can be produced from the counter alone and a matching If-None-Match
+    answered without reading the table. ETags carry a random per-process
+    token, so counters restarting from zero never match an ETag handed out
+    before the restart, and a time bucket of max_age_seconds, so writes made
+    by other processes are picked up within that time.
+    """
+
+    def __init__(self, max_age_seconds: float = DEFAULT_VERSION_MAX_AGE_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize all counters at zero.
+
+        Args:
+            max_age_seconds: Seconds after which every ETag changes (0 never expires them,
+                for a single process that makes every write)
+            clock: Time source (wall clock by default, replaceable in tests)
+        """
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.token = secrets.token_hex(4)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.not_modified = 0
+
+    def bump(self, table: str) -> int:
+        """Record a write to a table and return its new version."""
+        with self._lock:
+            version = self._versions[table] = self._versions.get(table, 0) + 1
+        return version
+
+    def version(self, table: str) -> int:
+        """Current version of a table."""
+        return self._versions.get(table, 0)
+
+    def etag(self, table: str) -> str:
+        """Strong ETag of the current contents of a table."""
+        tag = f'{table}-{self.token}-{self.version(table)}'
+        if self.max_age_seconds > 0:
+            tag += f'-{int(self.clock() // self.max_age_seconds)}'
+        return f'"{tag}"'
+
+    def matches(self, etag: str, if_none_match: Optional[str]) -> bool:
+        """
+        Check an If-None-Match header against a listing's current ETag.
+
+        Args:
+            etag: Value of etag() taken before the listing would be read
+            if_none_match: Header value: '*' or a comma-separated list of ETags
+
+        Returns:
+            True if the client's copy is current and a 304 can be sent
+        """
+        if not if_none_match:
+            return False
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            # If-None-Match uses the weak comparison, so a W/ prefix added by a proxy still matches
+            if candidate == '*' or candidate.removeprefix('W/') == etag:
+                with self._lock:
+                    self.not_modified += 1
+                return True
+        return False
+
+    def loan_issued(self, loan: Loan, book_id: Optional[int] = None):
+        """LoanService listener: book listings show copy availability."""
+        self.bump('book')
+
+    def loan_returned(self, loan_id: int, copy_id: int, book_id: Optional[int] = None):
+        """LoanService listener: book listings show copy availability."""
+        self.bump('book')
+
+    def hold_released(self, reservation_id: int, copy_id: int, book_id: Optional[int] = None):
+        """ReservationService listener: book listings show copy availability."""
+        self.bump('book')
+
+    def metrics(self) -> Dict:
+        """Counters for monitoring."""
+        with self._lock:
+            return {
+                'versions': dict(self._versions),
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,152 @@
+"""Keyset (cursor-based) pagination helpers."""
+
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+# paginate() fetches one row more than the page size to detect the last page, so
+# pages must stay below PostgREST's max-rows (1000 by default); otherwise a full
+# page would be cut to exactly `limit` rows and reported as the last one
+MAX_PAGE_SIZE = 500
+
+# Rows requested per page by fetch_all(); must not exceed PostgREST's max-rows,
+# since a page shorter than this ends the read
+FETCH_PAGE_SIZE = 1000
+
+
+@dataclass
+class Page:
+    """One page of results and the cursor for the page after it."""
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid pagination cursor")
+    return values
+
+
+def parse_sort(sort: Optional[str], primary_key: str, sortable: Sequence[str]) -> Tuple[str, bool]:
+    """
+    Parse a sort parameter such as 'title' or '-due_date'.
+
+    Returns:
+        (column, descending)
+
+    Raises:
+        ValueError: If the column is not sortable
+    """
+    if not sort:
+        return primary_key, False
+    descending = sort.startswith('-')
+    column = sort.lstrip('-')
+    if column != primary_key and column not in sortable:
+        raise ValueError(f"Cannot sort by '{column}'. Allowed: {', '.join([primary_key, *sortable])}")
+    return column, descending
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside a PostgREST or=() filter."""
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def paginate(query, primary_key: str, limit: int, after: Optional[str] = None,
+             sort: Optional[str] = None, sortable: Sequence[str] = ()) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one keyset page from a select query.
+
+    Rows are ordered by the sort column with the primary key as a tie-breaker,
+    and the next page starts strictly after the (sort value, primary key) of
+    the last row, so each page costs one indexed range scan however deep it is.
+    Sort columns must be NOT NULL.
+
+    Args:
+        query: Select query builder with any filters already applied
+        primary_key: Unique column used as the tie-breaker
+        limit: Maximum number of rows to return
+        after: Cursor from a previous page
+        sort: Sort column, prefixed with '-' for descending order
+        sortable: Columns other than the primary key that may be sorted on
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the sort column or cursor is invalid
+    """
+    column, descending = parse_sort(sort, primary_key, sortable)
+    op = 'lt' if descending else 'gt'
+
+    if after:
+        position = decode_cursor(after)
+        if column not in position or primary_key not in position:
+            raise ValueError("Pagination cursor does not match the requested sort")
+        if column == primary_key:
+            query = getattr(query, op)(primary_key, position[primary_key])
+        else:
+            value = _quote(position[column])
+            query = query.or_(
+                f"{column}.{op}.{value},"
+                f"and({column}.eq.{value},{primary_key}.{op}.{position[primary_key]})"
+            )
+
+    query = query.order(column, desc=descending)
+    if column != primary_key:
+        query = query.order(primary_key, desc=descending)
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).execute().data
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor({column: last[column], primary_key: last[primary_key]})
+
+
+def fetch_all(make_query: Callable[[], Any], order: Sequence[str], page_size: int = FETCH_PAGE_SIZE) -> List[Dict]:
+    """
+    Read every row of a filtered select, one page at a time.
+
+    A single select is cut short at PostgREST's max-rows, so a filter that
+    can match more rows than that (copies or links of hundreds of books) is
+    read in ranges of page_size rows until a shorter page comes back.
+
+    Args:
+        make_query: Returns a new select query builder with the filters applied
+        order: Columns giving the rows a stable order across pages
+        page_size: Rows requested per page
+
+    Returns:
+        All matching rows
+    """
+    rows: List[Dict] = []
+    while True:
+        query = make_query()
+        for column in order:
+            query = query.order(column)
+        page = query.range(len(rows), len(rows) + page_size - 1).execute().data
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
@@ -0,0 +1,85 @@
+"""Periodic background tasks for the API server."""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+from anyio import CapacityLimiter, to_thread
+
+logger = logging.getLogger('library_system.scheduler')
+
+
+class PeriodicTask:
+    """
+    Runs a blocking function every interval on a worker thread.
+
+    Started and stopped from the API server lifespan. A failing run is logged
+    and retried at the next interval; runs never overlap.
+    """
+
+    def __init__(self, name: str, func: Callable[[], object], interval_seconds: float,
+                 limiter: Optional[CapacityLimiter] = None, run_at_start: bool = True):
+        """
+        Args:
+            name: Name used in logs and metrics
+            func: Blocking function to run
+            interval_seconds: Seconds between the end of one run and the start of the next
+            limiter: Limiter shared with request handlers for database calls
+            run_at_start: Run once immediately when started
+        """
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.limiter = limiter
+        self.run_at_start = run_at_start
+        self.runs = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_run_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Schedule the task on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name=self.name)
+
+    async def stop(self):
+        """Cancel the task and wait for it to finish."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self):
+        """Run the function now on a worker thread."""
+        try:
+            await to_thread.run_sync(self.func, limiter=self.limiter)
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.exception("Background task %s failed", self.name)
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+
+    def metrics(self) -> Dict:
+        """Run counters for monitoring."""
+        return {
+            'interval_seconds': self.interval_seconds,
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run_at': self.last_run_at,
+            'last_error': self.last_error,
+        }
+
+    async def _loop(self):
+        if self.run_at_start:
+            await self.run_once()
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.run_once()
@@ -5,21 +5,24 @@ Command-line interface for library operations.
 """
 
 import argparse
+import csv
 import sys
 import os
 from datetime import date, timedelta
 from dotenv import load_dotenv
-from library_system.database.connection import DatabaseConnection
+from library_system.database.connection import DatabaseConnection, configured_backend, BACKEND_LOCAL
 from library_system.services.book_service import BookService
 from library_system.services.member_service import MemberService
 from library_system.services.loan_service import LoanService
 from library_system.services.reservation_service import ReservationService
 from library_system.services.auth_service import AuthService
+from library_system.services.import_service import ImportService, format_from_path
+from library_system.services.fine_service import FineService
 from library_system.models.book import Book
 from library_system.models.member import Member
 from library_system.models.user import User
 from library_system.models.bookcopy import BookCopy
-from library_system.utils.enums import RoleName, MemberStatus, CopyStatus
+from library_system.utils.enums import RoleName, MemberStatus, CopyStatus, LoanStatus
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,6 +30,9 @@ load_dotenv()
 
 def setup_database():
     """Initialize database connection."""
+    if configured_backend() == BACKEND_LOCAL:
+        return DatabaseConnection(backend=BACKEND_LOCAL)
+    
     url = os.getenv('SUPABASE_URL')
     key = os.getenv('SUPABASE_KEY')
     
@@ -35,6 +41,7 @@ def setup_database():
         print("Please create a .env file in the src directory with:")
         print("  SUPABASE_URL=your-supabase-url")
         print("  SUPABASE_KEY=your-supabase-key")
+        print("Or set DATABASE_BACKEND=local to use an embedded SQLite database.")
         sys.exit(1)
     
     return DatabaseConnection(url, key)
@@ -178,13 +185,11 @@ def cmd_issue_book(args, db):
     loan_service = LoanService(db)
     
     # Get librarian ID from user
-    librarian_result = db.get_client().table('librarian').select('employee_id').eq('user_id', user.user_id).execute()
-    if not librarian_result.data:
+    librarian_id = auth_service.get_librarian_id(user.user_id)
+    if not librarian_id:
         print("Error: User is not a librarian.")
         return
     
-    librarian_id = librarian_result.data[0]['employee_id']
-    
     try:
         loan = loan_service.issue_book(args.member_id, args.book_id, librarian_id, args.days or 14)
         if loan:
@@ -226,20 +231,66 @@ def cmd_update_overdue(args, db):
     print(f"Updated {count} overdue loan(s).")
 
 
+def cmd_expire_reservations(args, db):
+    """Deactivate expired reservations."""
+    auth_service = AuthService(db)
+    user = auth_service.authenticate(args.email_auth, args.password_auth)
+    
+    if not user or not auth_service.can_manage_books(user):
+        print("Error: Unauthorized. Librarian or administrator access required.")
+        return
+    
+    reservation_service = ReservationService(db)
+    result = reservation_service.expire_reservations()
+    print(f"Expired {result.expired} reservation(s): {result.passed_on} held copy(ies) passed to the next "
+          f"reservation, {result.released} made available ({result.duration_ms:.1f} ms).")
+
+
+def cmd_compute_fines(args, db):
+    """Compute fines for every overdue and late-returned loan."""
+    auth_service = AuthService(db)
+    user = auth_service.authenticate(args.email_auth, args.password_auth)
+    
+    if not user or not auth_service.can_manage_books(user):
+        print("Error: Unauthorized. Librarian or administrator access required.")
+        return
+    
+    fine_service = FineService(LoanService(db))
+    fines = fine_service.compute()
+    summary = fines.summary()
+    policy = fine_service.policy
+    print(f"Fines as of {summary['as_of']} ({policy.daily_rate_cents} cents/day after {policy.grace_days} "
+          f"grace day(s), capped at {policy.cap_cents or 'no'} cents per loan):")
+    print(f"  {summary['fined_loans']} fined loan(s) of {fine_service.last_loaded_loans}, "
+          f"{summary['fined_members']} member(s), total {summary['total_cents'] / 100:.2f}")
+    print(f"  Loaded in {fine_service.last_load_ms:.0f} ms, computed in {fine_service.last_compute_ms:.0f} ms")
+    
+    for row in fines.member_totals(limit=args.top):
+        print(f"  Member {row['member_id']}: {row['amount_cents'] / 100:.2f} over {row['loans']} loan(s)")
+    
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['loan_id', 'member_id', 'days_late', 'amount_cents', 'open'])
+            writer.writeheader()
+            writer.writerows(fines.rows())
+        print(f"Wrote {len(fines)} fine(s) to {args.output}")
+
+
 def cmd_list_overdue(args, db):
     """List overdue loans."""
     loan_service = LoanService(db)
-    overdue = loan_service.get_overdue_loans()
+    overdue = loan_service.get_loan_table(LoanStatus.OVERDUE)
     
-    if not overdue:
+    if not len(overdue):
         print("No overdue loans.")
         return
     
     print(f"\nFound {len(overdue)} overdue loan(s):\n")
-    for loan in overdue:
-        print(f"Loan ID: {loan.loan_id}")
-        print(f"Member ID: {loan.member_id}")
-        print(f"Due Date: {loan.due_date}")
+    columns = overdue.to_columns()
+    for loan_id, member_id, due_date in zip(columns['loan_id'], columns['member_id'], columns['due_date']):
+        print(f"Loan ID: {loan_id}")
+        print(f"Member ID: {member_id}")
+        print(f"Due Date: {due_date}")
         print("-" * 50)
 
 
@@ -260,6 +311,35 @@ def cmd_delete_book(args, db):
         print(f"Error: Cannot delete book {args.book_id}. Book has active loans.")
 
 
+def cmd_import_catalog(args, db):
+    """Bulk import books, authors, categories and copies from CSV or JSONL."""
+    auth_service = AuthService(db)
+    user = auth_service.authenticate(args.email_auth, args.password_auth)
+    
+    if not user or not auth_service.has_role(user, [RoleName.ADMINISTRATOR]):
+        print("Error: Unauthorized. Administrator access required.")
+        return
+    
+    import_service = ImportService(db, batch_size=args.batch_size)
+    
+    def report(progress):
+        print(f"  {progress.records_read} records, {progress.books_created} books created, "
+              f"{progress.books_skipped} skipped ({progress.rows_per_second:.0f} rows/s)")
+    
+    try:
+        with open(args.file, encoding='utf-8-sig', newline='') as f:
+            totals = import_service.import_stream(f, args.format or format_from_path(args.file),
+                                                  checkpoint_path=args.checkpoint, progress=report)
+        print(f"Import complete: {totals.books_created} books, {totals.copies_created} copies, "
+              f"{totals.authors_created} new authors, {totals.categories_created} new categories, "
+              f"{totals.books_skipped} skipped in {totals.elapsed_seconds:.1f}s "
+              f"({totals.rows_per_second:.0f} rows/s)")
+    except Exception as e:
+        print(f"Error importing catalog: {e}")
+        if args.checkpoint:
+            print(f"Re-run the same command to resume from {args.checkpoint}.")
+
+
 def cmd_delete_member(args, db):
     """Delete a member."""
     auth_service = AuthService(db)
@@ -343,6 +423,18 @@ def main():
     update_overdue_parser.add_argument('--email-auth', required=True, help='Librarian email')
     update_overdue_parser.add_argument('--password-auth', required=True, help='Librarian password')
     
+    # Expire reservations command
+    expire_parser = subparsers.add_parser('expire-reservations', help='Deactivate expired reservations')
+    expire_parser.add_argument('--email-auth', required=True, help='Librarian email')
+    expire_parser.add_argument('--password-auth', required=True, help='Librarian password')
+    
+    # Compute fines command
+    fines_parser = subparsers.add_parser('compute-fines', help='Compute fines for overdue and late-returned loans')
+    fines_parser.add_argument('--email-auth', required=True, help='Librarian email')
+    fines_parser.add_argument('--password-auth', required=True, help='Librarian password')
+    fines_parser.add_argument('--top', type=int, default=10, help='Members with the largest totals to list (default: 10)')
+    fines_parser.add_argument('--output', help='Write every fined loan to this CSV file')
+    
     # List overdue command
     list_overdue_parser = subparsers.add_parser('list-overdue', help='List overdue loans')
     
@@ -358,12 +450,22 @@ def main():
     delete_member_parser.add_argument('--password-auth', required=True, help='Librarian password')
     delete_member_parser.add_argument('--member-id', type=int, required=True, help='Member ID')
     
+    # Import catalog command
+    import_parser = subparsers.add_parser('import-catalog', help='Bulk import books from CSV or JSONL')
+    import_parser.add_argument('--email-auth', required=True, help='Administrator email')
+    import_parser.add_argument('--password-auth', required=True, help='Administrator password')
+    import_parser.add_argument('file', help='CSV or JSONL file to import')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], help='Input format (default: from file extension)')
+    import_parser.add_argument('--batch-size', type=int, default=1000, help='Records per batch (default: 1000)')
+    import_parser.add_argument('--checkpoint', help='Checkpoint file for resuming an interrupted import')
+    
     # Handle common mistakes where users use -- before command
     if len(sys.argv) > 1 and sys.argv[1].startswith('--'):
         cmd = sys.argv[1].lstrip('--')
         if cmd in ['list-overdue', 'create-book', 'search-books', 'register-member', 
                    'update-member', 'suspend-member', 'issue-book', 'return-book',
-                   'update-overdue', 'delete-book', 'delete-member']:
+                   'update-overdue', 'expire-reservations', 'compute-fines', 'delete-book',
+                   'delete-member', 'import-catalog']:
             print(f"Error: '{sys.argv[1]}' is a command, not a flag.")
             print(f"Correct usage: python main.py {cmd}")
             print(f"\nFor help: python main.py {cmd} --help")
@@ -393,9 +495,12 @@ def main():
         'issue-book': cmd_issue_book,
         'return-book': cmd_return_book,
         'update-overdue': cmd_update_overdue,
+        'expire-reservations': cmd_expire_reservations,
+        'compute-fines': cmd_compute_fines,
         'list-overdue': cmd_list_overdue,
         'delete-book': cmd_delete_book,
         'delete-member': cmd_delete_member,
+        'import-catalog': cmd_import_catalog,
     }
     
     handler = command_handlers.get(args.command)
@@ -5,6 +5,7 @@ import os
 from unittest.mock import Mock, MagicMock
 from datetime import date, timedelta
 from library_system.database.connection import DatabaseConnection
+from library_system.database.local_backend import LocalClient
 from library_system.services.book_service import BookService
 from library_system.services.member_service import MemberService
 from library_system.services.loan_service import LoanService
@@ -35,6 +36,40 @@ def mock_db_connection(mock_db_client):
     return mock_db
 
 
+@pytest.fixture
+def local_db():
+    """Create a connection to a fresh in-memory local database."""
+    db = DatabaseConnection(local_client=LocalClient(':memory:'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def local_library(local_db):
+    """
+    Local database with a small library: librarian 1, members 1-2,
+    book 1 with copies 1-2 and book 2 with copy 3 (all available).
+    """
+    client = local_db.get_client()
+    client.table('user').insert({'user_id': 1, 'name': 'Librarian', 'email': 'librarian@example.com',
+                                 'password_hash': 'x', 'role': 'librarian'}).execute()
+    client.table('librarian').insert({'employee_id': 1, 'user_id': 1}).execute()
+    client.table('member').insert([
+        {'member_id': 1, 'name': 'John Doe', 'email': 'john@example.com'},
+        {'member_id': 2, 'name': 'Jane Smith', 'email': 'jane@example.com'}
+    ]).execute()
+    client.table('book').insert([
+        {'book_id': 1, 'isbn': '978-0-06-231500-7', 'title': 'The Alchemist'},
+        {'book_id': 2, 'isbn': '978-0-06-112241-5', 'title': 'Brida'}
+    ]).execute()
+    client.table('book_copy').insert([
+        {'copy_id': 1, 'book_id': 1, 'barcode': 'BC001'},
+        {'copy_id': 2, 'book_id': 1, 'barcode': 'BC002'},
+        {'copy_id': 3, 'book_id': 2, 'barcode': 'BC003'}
+    ]).execute()
+    return local_db
+
+
 @pytest.fixture
 def book_service(mock_db_connection):
     """Create a BookService instance with mock database."""
@@ -19,7 +19,8 @@ else:
     if env_path.exists():
         load_dotenv(env_path)
 
-from library_system.database.connection import DatabaseConnection
+from library_system.database.connection import DatabaseConnection, configured_backend, BACKEND_LOCAL
+from library_system.database.local_backend import LocalClient
 from library_system.services.book_service import BookService
 from library_system.services.member_service import MemberService
 from library_system.services.loan_service import LoanService
@@ -40,7 +41,12 @@ def db_connection():
     
     Requires SUPABASE_URL and SUPABASE_KEY environment variables.
     For integration tests, you should use a test database.
+    With DATABASE_BACKEND=local the tests run against a fresh in-memory
+    SQLite database instead.
     """
+    if configured_backend() == BACKEND_LOCAL:
+        return DatabaseConnection(local_client=LocalClient(':memory:'))
+    
     url = os.getenv('SUPABASE_URL') 
     key = os.getenv('SUPABASE_KEY') 
     
@@ -88,9 +94,16 @@ def cleanup_test_data(db_connection):
     
     # Delete test loans (clean up in reverse dependency order)
     try:
-        # Get test loans (you may want to tag test data with a prefix or use a test schema)
-        client.table('loan').delete().like('member_id', '202%').execute()
-        client.table('loan').delete().like('copy_id', '999%').execute()
+        # Loans restrict deleting their copy, member and librarian, so remove
+        # every loan on a test copy or held by a test member first
+        copies = client.table('book_copy').select('copy_id').like('barcode', 'TEST%').execute()
+        copy_ids = [row['copy_id'] for row in copies.data]
+        if copy_ids:
+            client.table('loan').delete().in_('copy_id', copy_ids).execute()
+        members = client.table('member').select('member_id').like('email', 'test%').execute()
+        member_ids = [row['member_id'] for row in members.data]
+        if member_ids:
+            client.table('loan').delete().in_('member_id', member_ids).execute()
     except:
         pass
     
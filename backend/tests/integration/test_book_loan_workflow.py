@@ -87,7 +87,10 @@ class TestBookLoanWorkflow:
             'password_hash': 'test_hash',
             'role': 'librarian'
         }).execute()
-        librarian_id = librarian_result.data[0]['user_id']
+        librarian_result = client.table('librarian').insert({
+            'user_id': librarian_result.data[0]['user_id']
+        }).execute()
+        librarian_id = librarian_result.data[0]['employee_id']
         
         # Issue the book
         loan = loan_service.issue_book(
@@ -155,12 +158,15 @@ class TestBookLoanWorkflow:
             'password_hash': 'test_hash',
             'role': 'librarian'
         }).execute()
+        librarian_result = client.table('librarian').insert({
+            'user_id': librarian_result.data[0]['user_id']
+        }).execute()
         
         # Attempt to issue book with no copies
         loan = loan_service.issue_book(
             member_id=created_member.member_id,
             book_id=created_book.book_id,
-            librarian_id=librarian_result.data[0]['user_id']
+            librarian_id=librarian_result.data[0]['employee_id']
         )
         
         # Should return None because no copies available
@@ -215,7 +221,13 @@ class TestBookLoanWorkflow:
             'password_hash': 'test_hash',
             'role': 'librarian'
         }).execute()
-        librarian_id = librarian_result.data[0]['user_id']
+        
+        librarian_result = client.table('librarian').insert({
+        
+            'user_id': librarian_result.data[0]['user_id']
+        
+        }).execute()
+        librarian_id = librarian_result.data[0]['employee_id']
         
         # Issue first loan
         loan1 = loan_service.issue_book(
@@ -56,11 +56,17 @@ class TestBookMemberDeletion:
             'role': 'librarian'
         }).execute()
         
+        librarian_result = client.table('librarian').insert({
+        
+            'user_id': librarian_result.data[0]['user_id']
+        
+        }).execute()
+        
         # Issue loan
         loan = loan_service.issue_book(
             member_id=created_member.member_id,
             book_id=created_book.book_id,
-            librarian_id=librarian_result.data[0]['user_id']
+            librarian_id=librarian_result.data[0]['employee_id']
         )
         
         assert loan is not None
@@ -74,6 +80,10 @@ class TestBookMemberDeletion:
         # Return the book
         loan_service.return_book(loan.loan_id)
         
+        # The returned loan stays as history, and loan rows restrict deleting
+        # their copy and member, so clear it before deleting
+        client.table('loan').delete().eq('loan_id', loan.loan_id).execute()
+        
         # Now deletion should succeed
         delete_result_after_return = book_service.delete_book(created_book.book_id)
         assert delete_result_after_return is True
@@ -120,11 +130,17 @@ class TestBookMemberDeletion:
             'role': 'librarian'
         }).execute()
         
+        librarian_result = client.table('librarian').insert({
+        
+            'user_id': librarian_result.data[0]['user_id']
+        
+        }).execute()
+        
         # Issue loan
         loan = loan_service.issue_book(
             member_id=created_member.member_id,
             book_id=created_book.book_id,
-            librarian_id=librarian_result.data[0]['user_id']
+            librarian_id=librarian_result.data[0]['employee_id']
         )
         
         assert loan is not None
@@ -138,6 +154,10 @@ class TestBookMemberDeletion:
         # Return the book
         loan_service.return_book(loan.loan_id)
         
+        # The returned loan stays as history, and loan rows restrict deleting
+        # their copy and member, so clear it before deleting
+        client.table('loan').delete().eq('loan_id', loan.loan_id).execute()
+        
         # Now deletion should succeed
         delete_result_after_return = member_service.delete_member(created_member.member_id)
         assert delete_result_after_return is True
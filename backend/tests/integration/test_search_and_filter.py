@@ -5,6 +5,7 @@ These tests verify that BookService search and filter work with real database da
 """
 
 import pytest
+from library_system.models.book import Book
 from library_system.utils.enums import CopyStatus
 
 
@@ -5,14 +5,31 @@ Test Cases:
 - TC1.1: Add New Book
 - TC1.2: Edit Existing Book
 - TC1.3: Delete Book Record
+- TC1.4: Bulk Import Catalog
+- TC1.5: Version Book and Member Listings for ETags
+- TC1.6: Serve Single Records from the Entity Cache
+- TC1.7: Validate Import Records Before Writing
+- TC1.8: Complete Books Left Unfinished by an Interrupted Import
 """
 
+import io
+import json
+from datetime import date
 import pytest
 from unittest.mock import MagicMock
+from library_system.database.connection import DatabaseConnection
+from library_system.database.instrumentation import track_queries
+from library_system.database.local_backend import LocalClient
+from library_system.services.book_service import BookService
+from library_system.services.entity_cache import EntityCache
+from library_system.services.import_service import ImportService, read_records
+from library_system.services.member_service import MemberService
+from library_system.services.table_versions import TableVersions
 from library_system.models.book import Book
 from library_system.models.author import Author
 from library_system.models.category import Category
-from library_system.utils.enums import CopyStatus
+from library_system.models.member import Member
+from library_system.utils.enums import CopyStatus, MemberStatus
 
 
 class TestFR1BookManagement:
@@ -176,4 +193,285 @@ class TestFR1BookManagement:
         
         # Verify: Delete was called
         mock_delete_table.delete.assert_called_once()
-
+    
+    def test_tc1_4_bulk_import_catalog(self, tmp_path):
+        """
+        TC1.4: Bulk Import Catalog
+        
+        Test Item: ImportService.import_catalog()
+        Input Specification:
+            CSV with 4 records (one repeated ISBN, one shared author, copy counts
+            and explicit barcodes), batch size 2, checkpoint file; then the same
+            file imported again
+        Expected Output:
+            3 books with their authors, categories and copies are created and the
+            repeated ISBN is skipped; the second run resumes from the checkpoint
+            and creates nothing
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        csv_data = (
+            "isbn,title,published_year,authors,categories,copies,barcodes\n"
+            "111,The Alchemist,1988,Paulo Coelho,Fiction;Philosophy,2,\n"
+            "222,Brida,1990,Paulo Coelho,Fiction,,B-1;B-2;B-3\n"
+            "111,The Alchemist (duplicate),1988,Paulo Coelho,,1,\n"
+            "333,A Brief History of Time,1988,Stephen Hawking,Science,1,\n"
+        )
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        client = db.get_client()
+        client.table('category').insert({'name': 'Fiction'}).execute()
+        import_service = ImportService(db, batch_size=2)
+        checkpoint = str(tmp_path / 'import.json')
+        batches = []
+        
+        # Execute
+        totals = import_service.import_catalog(
+            read_records(io.StringIO(csv_data), 'csv'), checkpoint_path=checkpoint, progress=batches.append
+        )
+        
+        # Verify: Records inserted in two batches, duplicate skipped, names resolved once
+        assert len(batches) == 2
+        assert totals.records_read == 4
+        assert totals.books_created == 3
+        assert totals.books_skipped == 1
+        assert totals.authors_created == 2
+        assert totals.categories_created == 2
+        assert totals.copies_created == 6
+        book = client.table('book').select('*').eq('isbn', '111').execute().data[0]
+        assert book['title'] == 'The Alchemist'
+        assert len(client.table('book_category').select('*').eq('book_id', book['book_id']).execute().data) == 2
+        barcodes = {row['barcode'] for row in client.table('book_copy').select('barcode').execute().data}
+        assert {'111-1', '111-2', 'B-1', 'B-2', 'B-3', '333-1'} == barcodes
+        
+        # Execute: Resume from the checkpoint
+        rerun = import_service.import_catalog(read_records(io.StringIO(csv_data), 'csv'), checkpoint_path=checkpoint)
+        
+        # Verify: Nothing left to import
+        assert rerun.records_read == 0
+        assert len(client.table('book').select('book_id').execute().data) == 3
+        db.close()
+    
+    def test_tc1_5_version_listings_for_etags(self):
+        """
+        TC1.5: Version Book and Member Listings for ETags
+        
+        Test Item: TableVersions with BookService and MemberService writes
+        Input Specification:
+            ETags taken before and after creating, updating and deleting a
+            book and registering a member; If-None-Match headers with the
+            old and new ETags; a clock moved past max_age_seconds
+        Expected Output:
+            Each write changes only its own table's ETag; only the current
+            ETag (or '*', or a weak W/ copy) matches; every ETag changes
+            once max_age_seconds have passed
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        now = [1000.0]
+        versions = TableVersions(max_age_seconds=60, clock=lambda: now[0])
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        book_service = BookService(db, versions=versions)
+        member_service = MemberService(db, versions=versions)
+        book_etag, member_etag = versions.etag('book'), versions.etag('member')
+        
+        # Verify: Unchanged tables keep their ETag
+        assert versions.etag('book') == book_etag
+        assert versions.matches(book_etag, book_etag)
+        assert versions.matches(book_etag, f'"other", W/{book_etag}')
+        assert versions.matches(book_etag, '*')
+        assert not versions.matches(book_etag, None)
+        
+        # Execute: Book writes
+        book = book_service.create_book(Book(isbn='111', title='The Alchemist'), [], [])
+        created_etag = versions.etag('book')
+        book_service.update_book(book.book_id, Book(book_id=book.book_id, isbn='111', title='Brida'))
+        updated_etag = versions.etag('book')
+        assert book_service.delete_book(book.book_id)
+        
+        # Verify: Each book write moves the book ETag, not the member one
+        assert len({book_etag, created_etag, updated_etag, versions.etag('book')}) == 4
+        assert not versions.matches(versions.etag('book'), book_etag)
+        assert versions.etag('member') == member_etag
+        
+        # Execute: Member write
+        member_service.register_member(Member(name='Jane', email='jane@example.com', status=MemberStatus.ACTIVE,
+                                              join_date=date.today()))
+        
+        # Verify
+        assert versions.etag('member') != member_etag
+        assert versions.version('book') == 3 and versions.version('member') == 1
+        
+        # Execute: Time moves into the next max_age window
+        current = versions.etag('member')
+        now[0] += 60
+        
+        # Verify: ETags expire even without local writes
+        assert versions.etag('member') != current
+        assert versions.metrics()['not_modified'] == 3
+        db.close()
+    
+    def test_tc1_6_serve_records_from_entity_cache(self):
+        """
+        TC1.6: Serve Single Records from the Entity Cache
+        
+        Test Item: EntityCache with BookService.get_book and MemberService.get_member
+        Input Specification:
+            A book and a member read twice, then updated, suspended and deleted;
+            a load racing with an update; a plain-dict store plugged in
+        Expected Output:
+            Repeated reads cost no query; every write is visible on the next
+            read; a row loaded before a concurrent write is not cached;
+            hits and misses are counted per table
+        Environmental / Special Requirements: Instrumented in-memory SQLite database
+        """
+        class DictStore(dict):
+            def set(self, key, value):
+                self[key] = value
+            
+            def pop(self, key):
+                return super().pop(key, None)
+        
+        store = DictStore()
+        cache = EntityCache(store=store)
+        db = DatabaseConnection(local_client=LocalClient(':memory:'), instrument=True)
+        book_service = BookService(db, cache=cache)
+        member_service = MemberService(db, cache=cache)
+        book = book_service.create_book(Book(isbn='111', title='The Alchemist'), [], [])
+        member = member_service.register_member(Member(name='Jane', email='jane@example.com',
+                                                       status=MemberStatus.ACTIVE, join_date=date.today()))
+        
+        # Execute: Read each record twice
+        with track_queries() as stats:
+            assert book_service.get_book(book.book_id).title == 'The Alchemist'
+            assert book_service.get_book(book.book_id).title == 'The Alchemist'
+            assert member_service.get_member(member.member_id).name == 'Jane'
+            assert member_service.get_member(member.member_id).name == 'Jane'
+            assert book_service.get_book(999) is None
+        
+        # Verify: One query per record, missing rows not cached
+        assert stats.count == 3
+        assert len(store) == 2
+        
+        # Execute: Writes through the services
+        book_service.update_book(book.book_id, Book(book_id=book.book_id, isbn='111', title='Brida'))
+        member_service.suspend_member(member.member_id)
+        
+        # Verify: Next reads see the writes
+        assert book_service.get_book(book.book_id).title == 'Brida'
+        assert member_service.get_member(member.member_id).status == MemberStatus.SUSPENDED
+        
+        # Execute: A load that started before a write finishes after it
+        cache.invalidate('book', book.book_id)
+        stale = {**book.to_dict(), 'title': 'Stale'}
+        
+        def racing_load():
+            book_service.update_book(book.book_id, Book(book_id=book.book_id, isbn='111', title='Fresh'))
+            return stale
+        
+        # Verify: The stale row is returned to its caller only
+        assert cache.get('book', book.book_id, racing_load) is stale
+        assert book_service.get_book(book.book_id).title == 'Fresh'
+        
+        # Execute: Deletes
+        assert book_service.delete_book(book.book_id)
+        assert member_service.delete_member(member.member_id)
+        
+        # Verify: Deleted records are gone, and the counters add up
+        assert book_service.get_book(book.book_id) is None
+        assert member_service.get_member(member.member_id) is None
+        metrics = cache.metrics()
+        assert metrics['tables']['book'] == {'hits': 1, 'misses': 6}
+        assert metrics['tables']['member'] == {'hits': 1, 'misses': 3}
+        assert metrics['hits'] == 2 and metrics['size'] == 0
+        db.close()
+    
+    def test_tc1_7_validate_import_records(self):
+        """
+        TC1.7: Validate Import Records Before Writing
+        
+        Test Item: ImportService.import_chunks()
+        Input Specification:
+            A catalog book with no copies and an existing copy barcode, then a
+            JSONL upload split into small chunks with that book, a taken
+            barcode, a barcode repeated across two records, an unparsable
+            year, authors given as a string and one valid record
+        Expected Output:
+            The catalog book is left alone, the five invalid records are
+            rejected without writing anything, and the valid one is created
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        records = [
+            {'isbn': '444', 'title': 'Veronika Decides to Die', 'authors': ['Paulo Coelho'], 'copies': 2},
+            {'isbn': '555', 'title': 'The Zahir', 'barcodes': ['X-1']},
+            {'isbn': '666', 'title': 'Aleph', 'barcodes': ['D-1']},
+            {'isbn': '777', 'title': 'Adultery', 'barcodes': ['D-1']},
+            {'isbn': '888', 'title': 'Hippie', 'published_year': 'soon'},
+            {'isbn': '900', 'title': 'Eleven Minutes', 'authors': 'Paulo Coelho'},
+            {'isbn': '999', 'title': 'The Spy', 'authors': ['Paulo Coelho'], 'copies': 1},
+        ]
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode()
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        client = db.get_client()
+        catalog = client.table('book').insert({'isbn': '444', 'title': 'Veronika Decides to Die'}).execute().data[0]
+        other = client.table('book').insert({'isbn': '100', 'title': 'Brida'}).execute().data[0]
+        client.table('book_copy').insert({'book_id': other['book_id'], 'barcode': 'X-1', 'status': 'available'}).execute()
+        import_service = ImportService(db, batch_size=10)
+        
+        # Execute: Upload arriving 7 bytes at a time
+        totals = import_service.import_chunks((data[i:i + 7] for i in range(0, len(data), 7)), 'jsonl')
+        
+        # Verify: Only the valid record written, with one author
+        assert totals.records_read == 7
+        assert (totals.books_skipped, totals.books_invalid, totals.books_created) == (1, 5, 1)
+        assert (totals.books_repaired, totals.authors_created, totals.copies_created) == (0, 1, 1)
+        assert client.table('book_author').select('*').eq('book_id', catalog['book_id']).execute().data == []
+        barcodes = {row['barcode'] for row in client.table('book_copy').select('barcode').execute().data}
+        assert barcodes == {'X-1', '999-1'}
+        isbns = {row['isbn'] for row in client.table('book').select('isbn').execute().data}
+        assert isbns == {'100', '444', '999'}
+        assert [row['full_name'] for row in client.table('author').select('full_name').execute().data] == ['Paulo Coelho']
+        db.close()
+    
+    def test_tc1_8_complete_interrupted_import(self, tmp_path):
+        """
+        TC1.8: Complete Books Left Unfinished by an Interrupted Import
+        
+        Test Item: ImportService.import_catalog() with a checkpoint
+        Input Specification:
+            Checkpoint of a run that created books 111 (one of its two copies
+            inserted, no author) and 222 (no copies asked for) and then
+            stopped; the same records imported again, then once more without
+            the checkpoint
+        Expected Output:
+            Book 111 gets its author and missing copy and counts as repaired,
+            book 222 has nothing missing and does not; the last run skips both
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        records = [
+            {'isbn': '111', 'title': 'The Alchemist', 'authors': ['Paulo Coelho'], 'copies': 2},
+            {'isbn': '222', 'title': 'Brida', 'copies': 0},
+        ]
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        client = db.get_client()
+        books = client.table('book').insert([{'isbn': record['isbn'], 'title': record['title']}
+                                             for record in records]).execute().data
+        client.table('book_copy').insert({'book_id': books[0]['book_id'], 'barcode': '111-1',
+                                          'status': 'available'}).execute()
+        checkpoint = tmp_path / 'import.json'
+        checkpoint.write_text(json.dumps({'records_done': 0, 'pending_books': [book['book_id'] for book in books]}))
+        import_service = ImportService(db)
+        
+        # Execute: Resume the interrupted run
+        totals = import_service.import_catalog(records, checkpoint_path=str(checkpoint))
+        
+        # Verify: Missing author and copy added once, nothing left pending
+        assert (totals.books_created, totals.books_repaired, totals.copies_created) == (0, 1, 1)
+        assert len(client.table('book_author').select('*').eq('book_id', books[0]['book_id']).execute().data) == 1
+        barcodes = sorted(row['barcode'] for row in client.table('book_copy').select('barcode').execute().data)
+        assert barcodes == ['111-1', '111-2']
+        assert json.loads(checkpoint.read_text()) == {'records_done': 2, 'pending_books': []}
+        
+        # Execute: Import again from scratch
+        rerun = import_service.import_catalog(records)
+        
+        # Verify: Finished books are skipped
+        assert (rerun.books_skipped, rerun.books_repaired, rerun.copies_created) == (2, 0, 0)
+        db.close()
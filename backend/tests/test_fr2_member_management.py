@@ -5,11 +5,24 @@ Test Cases:
 - TC2.1: Register New Member
 - TC2.2: Update Member Information
 - TC2.3: Deactivate Membership
+- TC2.4: Member Account Summary in a Fixed Number of Queries
+- TC2.5: Deleting a Member Releases Their Held Copies
 """
 
+import asyncio
 import pytest
+from datetime import date, timedelta
 from unittest.mock import MagicMock
+from anyio import CapacityLimiter
+from library_system.database.instrumentation import track_queries
 from library_system.models.member import Member
+from library_system.services.async_services import AsyncMemberSummaryService
+from library_system.services.availability_service import AvailabilityService
+from library_system.services.hold_queue import HoldQueue
+from library_system.services.loan_service import LoanService
+from library_system.services.member_service import MemberService
+from library_system.services.member_summary import MemberSummaryService
+from library_system.services.reservation_service import ReservationService
 from library_system.utils.enums import MemberStatus
 
 
@@ -144,4 +157,99 @@ class TestFR2MemberManagement:
         update_call_args = mock_table.update.call_args[0][0]
         assert update_call_args['status'] == MemberStatus.INACTIVE.value
         mock_table.update.return_value.eq.assert_called_once_with('member_id', 202)
-
+    
+    def test_tc2_4_member_account_summary(self, local_library):
+        """
+        TC2.4: Member Account Summary in a Fixed Number of Queries
+        
+        Test Item: MemberSummaryService, AsyncMemberSummaryService.get_summary()
+        Input Specification:
+            Member ID=1 with a loan of book 1 and an overdue loan of book 2,
+            waiting for book 1 behind member 3, whose copy is held; member 99
+            does not exist
+        Expected Output:
+            Member record, both open loans with titles (the overdue one
+            flagged), the hold at position 1 and the counts; member 3's hold
+            is ready for pickup (position 0); the async summary matches the
+            synchronous one and takes at most six queries; None for member 99
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        client = local_library.get_client()
+        client.table('member').insert({'member_id': 3, 'name': 'Ann Lee', 'email': 'ann@example.com'}).execute()
+        hold_queue = HoldQueue(local_library)
+        loan_service = LoanService(local_library, hold_queue=hold_queue)
+        reservation_service = ReservationService(local_library, hold_queue=hold_queue)
+        loan = loan_service.issue_book(1, 1, 1)
+        client.table('loan').insert({
+            'member_id': 1, 'copy_id': 3, 'librarian_id': 1, 'status': 'overdue',
+            'issue_date': (date.today() - timedelta(days=20)).isoformat(),
+            'due_date': (date.today() - timedelta(days=6)).isoformat()
+        }).execute()
+        client.table('book_copy').update({'status': 'loaned'}).eq('copy_id', 3).execute()
+        returned = loan_service.issue_book(2, 1, 1)
+        first = reservation_service.create_reservation(3, 1)
+        second = reservation_service.create_reservation(1, 1)
+        loan_service.return_book(returned.loan_id)
+        service = MemberSummaryService(local_library, hold_queue=hold_queue)
+        async_service = AsyncMemberSummaryService(service, CapacityLimiter(4))
+        
+        # Execute
+        summary = service.get_summary(1)
+        with track_queries() as stats:
+            async_summary = asyncio.run(async_service.get_summary(1))
+        
+        # Verify: Loans with titles, hold with position, counts
+        assert summary['member']['name'] == 'John Doe'
+        assert [(row['loan_id'] == loan.loan_id, row['title'], row['days_overdue']) for row in summary['loans']] == [
+            (False, 'Brida', 6), (True, 'The Alchemist', 0)
+        ]
+        assert [(row['reservation_id'], row['title'], row['position']) for row in summary['holds']] == [
+            (second.reservation_id, 'The Alchemist', 1)
+        ]
+        assert summary['counts'] == {'open_loans': 2, 'overdue_loans': 1, 'holds': 1, 'ready_for_pickup': 0}
+        assert async_summary == summary
+        assert 0 < stats.count <= 6
+        
+        # Verify: Held copy ready for member 3, unknown member
+        held = service.get_summary(3)
+        assert held['holds'][0]['reservation_id'] == first.reservation_id
+        assert held['holds'][0]['copy_id'] == 2
+        assert held['counts']['ready_for_pickup'] == 1
+        assert service.get_summary(99) is None
+        assert asyncio.run(async_service.get_summary(99)) is None
+    
+    def test_tc2_5_delete_member_releases_holds(self, local_library):
+        """
+        TC2.5: Deleting a Member Releases Their Held Copies
+        
+        Test Item: MemberService.delete_member()
+        Input Specification:
+            Book ID=2 (one copy) returned while member 2 waits for it, so the
+            copy is held for member 2; member 2 is then deleted
+        Expected Output:
+            Member deleted; the copy goes back to available, the hold queue
+            and availability counters follow, and member 1 can borrow it
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        client = local_library.get_client()
+        availability = AvailabilityService(local_library)
+        hold_queue = HoldQueue(local_library)
+        loan_service = LoanService(local_library, hold_queue=hold_queue)
+        loan_service.add_listener(availability)
+        reservation_service = ReservationService(local_library, hold_queue=hold_queue)
+        reservation_service.add_listener(availability)
+        member_service = MemberService(local_library, reservation_service=reservation_service)
+        loan = loan_service.issue_book(1, 2, 1)
+        reservation_service.create_reservation(2, 2)
+        loan_service.return_book(loan.loan_id)
+        assert availability.get(2).reserved == 1
+        
+        # Execute: Delete the member the copy is held for
+        assert member_service.delete_member(2) is True
+        
+        # Verify: Copy back on the shelf and borrowable
+        assert client.table('book_copy').select('status').eq('copy_id', 3).execute().data[0]['status'] == 'available'
+        assert hold_queue.held_for(3) is None
+        assert hold_queue.length(2) == 0
+        assert (availability.get(2).available, availability.get(2).reserved) == (1, 0)
+        assert loan_service.issue_book(1, 2, 1).copy_id == 3
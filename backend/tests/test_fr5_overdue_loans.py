@@ -3,12 +3,34 @@ FR5: Detect Overdue Loans
 
 Test Cases:
 - TC5.1: Detect Overdue Book
+- TC5.2: Sweep Expired Loans from the Due-Date Heap
+- TC5.3: Filter the Loan History in a Column-Oriented LoanTable
+- TC5.4: Sweep Expired Reservations and Pass On Their Held Copies
+- TC5.5: Compute Overdue Fines over the Loan History
+- TC5.6: Keep Loans Circulated While the Sweeper Reloads
+- TC5.7: Close a Returned Loan's Fine Without Recomputing
 """
 
+import hashlib
 import pytest
 from unittest.mock import MagicMock
+from fastapi.testclient import TestClient
+import api_server
 from datetime import date, timedelta
 from library_system.utils.enums import LoanStatus
+from library_system.models.loan import Loan
+from library_system.models.loan_table import LoanTable
+from library_system.database.instrumentation import track_queries
+from library_system.services.availability_service import AvailabilityService
+from library_system.services.book_service import BookService
+from library_system.services import fine_engine
+from library_system.services.fine_engine import FinePolicy, compute_fines
+from library_system.services.fine_service import FineService
+from library_system.services.loan_service import LoanService
+from library_system.services.hold_queue import HoldQueue
+from library_system.services.overdue_sweeper import OverdueSweeper
+from library_system.services.reservation_service import ReservationService
+from library_system.services.reservation_sweeper import ReservationSweeper
 
 
 class TestFR5OverdueLoans:
@@ -40,6 +62,7 @@ class TestFR5OverdueLoans:
         # Mock update result
         mock_update_result = MagicMock()
         mock_update_result.data = [overdue_loan_data]  # Simulate updated loans
+        mock_update_result.count = 1
         
         # Mock get overdue loans result
         mock_overdue_result = MagicMock()
@@ -74,4 +97,320 @@ class TestFR5OverdueLoans:
         # Verify: Overdue loans retrieved
         # Note: This will return empty list with current mock, but structure is correct
         assert isinstance(overdue_loans, list)
-
+    
+    def test_tc5_2_sweep_expired_loans(self, local_library):
+        """
+        TC5.2: Sweep Expired Loans from the Due-Date Heap
+        
+        Test Item: OverdueSweeper.sweep()
+        Input Specification:
+            One loan due yesterday already in the database when the sweeper loads;
+            two loans issued through LoanService afterwards (14 and 7 days), one
+            of which is returned
+        Expected Output:
+            First sweep marks only the loan due yesterday; a sweep 10 days later
+            marks the 7-day loan and skips the returned one; metrics report the counts
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        client = local_library.get_client()
+        loan_service = LoanService(local_library, book_service=BookService(local_library))
+        today = date.today()
+        client.table('loan').insert({
+            'loan_id': 100, 'member_id': 1, 'copy_id': 3, 'librarian_id': 1,
+            'issue_date': (today - timedelta(days=15)).isoformat(),
+            'due_date': (today - timedelta(days=1)).isoformat(), 'status': 'active'
+        }).execute()
+        sweeper = OverdueSweeper(loan_service)
+        loan_service.add_listener(sweeper)
+        
+        # Execute: Load, then issue and return through the service
+        sweeper.load()
+        returned = loan_service.issue_book(1, 1, 1, loan_days=14)
+        kept = loan_service.issue_book(2, 1, 1, loan_days=7)
+        loan_service.return_book(returned.loan_id)
+        first = sweeper.sweep(today)
+        later = sweeper.sweep(today + timedelta(days=10))
+        
+        # Verify
+        statuses = {row['loan_id']: row['status'] for row in client.table('loan').select('loan_id, status').execute().data}
+        assert first == 1
+        assert later == 1
+        assert statuses == {100: 'overdue', returned.loan_id: 'returned', kept.loan_id: 'overdue'}
+        metrics = sweeper.metrics()
+        assert metrics['total_flipped'] == 2
+        assert metrics['last_flipped'] == 1
+        assert metrics['tracked_loans'] == 0
+    
+    def test_tc5_3_loan_table(self, local_library):
+        """
+        TC5.3: Filter the Loan History in a Column-Oriented LoanTable
+        
+        Test Item: LoanService.get_loan_table(), LoanTable
+        Input Specification:
+            Three loans: active and past due (member 1), active and not yet
+            due (member 2), returned (member 1)
+        Expected Output:
+            Filters by status, due date and member select the expected rows;
+            rows serialize exactly like Loan.to_dict(); about 45 bytes per loan
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        today = date.today()
+        local_library.get_client().table('loan').insert([
+            {'loan_id': 1, 'member_id': 1, 'copy_id': 1, 'librarian_id': 1, 'issue_date': (today - timedelta(days=20)).isoformat(),
+             'due_date': (today - timedelta(days=6)).isoformat(), 'status': 'active'},
+            {'loan_id': 2, 'member_id': 2, 'copy_id': 2, 'librarian_id': 1, 'issue_date': today.isoformat(),
+             'due_date': (today + timedelta(days=14)).isoformat(), 'status': 'active'},
+            {'loan_id': 3, 'member_id': 1, 'copy_id': 3, 'librarian_id': 1, 'issue_date': (today - timedelta(days=30)).isoformat(),
+             'due_date': (today - timedelta(days=16)).isoformat(), 'return_date': (today - timedelta(days=17)).isoformat(),
+             'status': 'returned'}
+        ]).execute()
+        loan_service = LoanService(local_library)
+        
+        # Execute: Load the history and filter it
+        table = loan_service.get_loan_table()
+        overdue = table.where(status=LoanStatus.ACTIVE, due_before=today)
+        
+        # Verify: Filters
+        assert len(table) == 3
+        assert [table.loan_id[row] for row in overdue] == [1]
+        assert table.where(member_id=1) == [0, 2]
+        assert table.count(due_before=today) == 2
+        assert len(loan_service.get_loan_table(LoanStatus.RETURNED)) == 1
+        assert table.filter(member_id=2).loan(0).due_date == today + timedelta(days=14)
+        
+        # Verify: Serialization matches the Loan model
+        loans = [Loan.from_dict(row) for row in local_library.get_client().table('loan').select('*').order('loan_id').execute().data]
+        assert table.to_dicts() == [loan.to_dict() for loan in loans]
+        assert list(table) == loans
+        assert table.nbytes == 3 * 45
+        assert len(LoanTable.from_rows(table.to_dicts())) == 3
+    
+    @pytest.mark.parametrize('use_procedure', [True, False], ids=['procedure', 'conditional_update'])
+    def test_tc5_4_sweep_expired_reservations(self, local_library, use_procedure):
+        """
+        TC5.4: Sweep Expired Reservations and Pass On Their Held Copies
+        
+        Test Item: ReservationService.expire_reservations(), ReservationSweeper
+        Input Specification:
+            Book ID=2 (one copy) returned while members 2 (valid 14 days) and
+            3 (valid 30 days) wait for it; member 1 waits for book 1 (valid 1
+            day); sweeps 20 days later (twice) and 40 days later
+        Expected Output:
+            First sweep expires members 1 and 2's reservations and passes the
+            copy held for member 2 to member 3; the repeated sweep changes
+            nothing in a single round trip with the database function; the
+            last sweep expires member 3's reservation and puts the copy back
+            on the shelf; availability counters and metrics follow
+        Environmental / Special Requirements: In-memory SQLite database, with
+            and without the database functions
+        """
+        client = local_library.get_client()
+        client.table('member').insert({'member_id': 3, 'name': 'Ann Lee', 'email': 'ann@example.com'}).execute()
+        availability = AvailabilityService(local_library)
+        hold_queue = HoldQueue(local_library)
+        loan_service = LoanService(local_library, claim_procedure=use_procedure, hold_queue=hold_queue)
+        loan_service.add_listener(availability)
+        reservation_service = ReservationService(local_library, hold_queue=hold_queue, expire_procedure=use_procedure)
+        reservation_service.add_listener(availability)
+        sweeper = ReservationSweeper(reservation_service)
+        loan = loan_service.issue_book(1, 2, 1)
+        held = reservation_service.create_reservation(2, 2, days_valid=14)
+        waiting = reservation_service.create_reservation(3, 2, days_valid=30)
+        short = reservation_service.create_reservation(1, 1, days_valid=1)
+        loan_service.return_book(loan.loan_id)
+        today = date.today()
+        
+        # Execute: Sweep after the first two reservations expired, then again
+        first = sweeper.sweep(today + timedelta(days=20))
+        with track_queries() as stats:
+            repeated = sweeper.sweep(today + timedelta(days=20))
+        
+        # Verify: Expired once, copy passed to the next patron
+        assert (first.expired, first.passed_on, first.released) == (2, 1, 0)
+        assert repeated.expired == 0
+        if use_procedure:
+            assert stats.count == 1
+        assert reservation_service.get_reservation(held.reservation_id).active is False
+        assert reservation_service.get_reservation(short.reservation_id).active is False
+        assert reservation_service.get_reservation(waiting.reservation_id).copy_id == 3
+        assert client.table('book_copy').select('status').eq('copy_id', 3).execute().data[0]['status'] == 'reserved'
+        assert availability.get(2).reserved == 1
+        
+        # Verify: Last reservation expires and the copy goes back on the shelf
+        last = sweeper.sweep(today + timedelta(days=40))
+        assert (last.expired, last.passed_on, last.released) == (1, 0, 1)
+        assert client.table('book_copy').select('status').eq('copy_id', 3).execute().data[0]['status'] == 'available'
+        assert (availability.get(2).available, availability.get(2).reserved) == (1, 0)
+        assert client.table('reservation').select('reservation_id').eq('active', True).execute().data == []
+        metrics = sweeper.metrics()
+        assert (metrics['total_expired'], metrics['total_passed_on'], metrics['total_released']) == (3, 1, 1)
+        assert metrics['last_expired'] == 1
+    
+    @pytest.mark.parametrize('use_numpy', [
+        pytest.param(True, marks=pytest.mark.skipif(fine_engine.numpy is None, reason='numpy not installed')),
+        False
+    ], ids=['numpy', 'python'])
+    def test_tc5_5_compute_fines(self, local_library, use_numpy):
+        """
+        TC5.5: Compute Overdue Fines over the Loan History
+        
+        Test Item: compute_fines(), FineService
+        Input Specification:
+            Policy of 25 cents a day after 2 days' grace, capped at 1000;
+            loans 6 days overdue (member 1), not yet due (member 2), returned
+            6 days late (member 1) and 100 days overdue (member 2)
+        Expected Output:
+            Three loans fined 100, 100 and 1000 (capped); totals per member;
+            the service reuses the fines until they grow older than
+            max_age_seconds, closing a returned loan's fine without a query
+        Environmental / Special Requirements: In-memory SQLite database, with
+            and without NumPy
+        """
+        today = date.today()
+        local_library.get_client().table('loan').insert([
+            {'loan_id': 1, 'member_id': 1, 'copy_id': 1, 'librarian_id': 1, 'issue_date': (today - timedelta(days=20)).isoformat(),
+             'due_date': (today - timedelta(days=6)).isoformat(), 'status': 'active'},
+            {'loan_id': 2, 'member_id': 2, 'copy_id': 2, 'librarian_id': 1, 'issue_date': today.isoformat(),
+             'due_date': (today + timedelta(days=14)).isoformat(), 'status': 'active'},
+            {'loan_id': 3, 'member_id': 1, 'copy_id': 3, 'librarian_id': 1, 'issue_date': (today - timedelta(days=30)).isoformat(),
+             'due_date': (today - timedelta(days=16)).isoformat(), 'return_date': (today - timedelta(days=10)).isoformat(),
+             'status': 'returned'},
+            {'loan_id': 4, 'member_id': 2, 'copy_id': 3, 'librarian_id': 1, 'issue_date': (today - timedelta(days=114)).isoformat(),
+             'due_date': (today - timedelta(days=100)).isoformat(), 'status': 'overdue'}
+        ]).execute()
+        policy = FinePolicy(daily_rate_cents=25, grace_days=2, cap_cents=1000)
+        loan_service = LoanService(local_library)
+        
+        # Execute: Charge the history
+        fines = compute_fines(loan_service.get_loan_table(), policy, today, use_numpy=use_numpy)
+        
+        # Verify: Grace, cap and open flags
+        assert fines.rows() == [
+            {'loan_id': 4, 'member_id': 2, 'days_late': 100, 'amount_cents': 1000, 'open': True},
+            {'loan_id': 1, 'member_id': 1, 'days_late': 6, 'amount_cents': 100, 'open': True},
+            {'loan_id': 3, 'member_id': 1, 'days_late': 6, 'amount_cents': 100, 'open': False}
+        ]
+        assert fines.member_totals() == [
+            {'member_id': 2, 'amount_cents': 1000, 'loans': 1},
+            {'member_id': 1, 'amount_cents': 200, 'loans': 2}
+        ]
+        assert fines.summary()['total_cents'] == 1200
+        assert fines == compute_fines(loan_service.get_loan_table(), policy, today, use_numpy=not use_numpy) \
+            or fine_engine.numpy is None
+        
+        # Verify: The service reuses the fines until a return or max age
+        now = [0.0]
+        fine_service = FineService(loan_service, policy, max_age_seconds=60, clock=lambda: now[0])
+        loan_service.add_listener(fine_service)
+        assert fine_service.member_fines(1)['total_cents'] == 200
+        with track_queries() as stats:
+            assert fine_service.current().total_cents == 1200
+        assert stats.count == 0
+        loan_service.return_book(1)
+        with track_queries() as stats:
+            assert fine_service.member_fines(1)['total_cents'] == 200
+            assert [row['open'] for row in fine_service.member_fines(1)['fines']] == [False, False]
+        assert stats.count == 0
+        assert fine_service.metrics()['runs'] == 1
+        now[0] = 61.0
+        assert [row['open'] for row in fine_service.member_fines(1)['fines']] == [False, False]
+        assert fine_service.metrics()['runs'] == 2
+        assert fine_service.metrics()['last_loaded_loans'] == 4
+    
+    def test_tc5_6_circulate_during_sweeper_load(self, local_library):
+        """
+        TC5.6: Keep Loans Circulated While the Sweeper Reloads
+        
+        Test Item: OverdueSweeper.load()
+        Input Specification:
+            One loan due yesterday in the database and one issued through the
+            LoanService; while load() reads the active loans, a 7-day loan is
+            issued and the earlier service loan is returned
+        Expected Output:
+            The reloaded heap tracks the loan due yesterday and the new loan but
+            not the returned one; a sweep 10 days later marks both overdue
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        client = local_library.get_client()
+        loan_service = LoanService(local_library)
+        today = date.today()
+        client.table('loan').insert({
+            'loan_id': 100, 'member_id': 1, 'copy_id': 3, 'librarian_id': 1,
+            'issue_date': (today - timedelta(days=15)).isoformat(),
+            'due_date': (today - timedelta(days=1)).isoformat(), 'status': 'active'
+        }).execute()
+        sweeper = OverdueSweeper(loan_service)
+        loan_service.add_listener(sweeper)
+        returned = loan_service.issue_book(1, 1, 1, loan_days=14)
+        get_loan_table = loan_service.get_loan_table
+        issued = []
+        
+        def read_and_circulate(status=None):
+            table = get_loan_table(status)
+            issued.append(loan_service.issue_book(2, 2, 1, loan_days=7))
+            loan_service.return_book(returned.loan_id)
+            return table
+        
+        loan_service.get_loan_table = read_and_circulate
+        
+        # Execute
+        tracked = sweeper.load()
+        loan_service.get_loan_table = get_loan_table
+        flipped = sweeper.sweep(today + timedelta(days=10))
+        
+        # Verify: New loan kept, returned loan dropped
+        assert tracked == 2
+        assert flipped == 2
+        statuses = {row['loan_id']: row['status'] for row in client.table('loan').select('loan_id, status').execute().data}
+        assert statuses == {100: 'overdue', returned.loan_id: 'returned', issued[0].loan_id: 'overdue'}
+        assert sweeper.metrics()['tracked_loans'] == 0
+    
+    def test_tc5_7_close_returned_fine_without_recompute(self, monkeypatch):
+        """
+        TC5.7: Close a Returned Loan's Fine Without Recomputing
+        
+        Test Item: FineService.loan_returned() through GET /api/fines and POST /api/loans/return
+        Input Specification:
+            API on an in-memory local database with background jobs off; a
+            loan 10 days overdue; fines listed, the loan returned, fines listed again
+        Expected Output:
+            The loan is listed open, then closed with the same amount; the
+            second listing neither recomputes the fines nor queries the database
+        Environmental / Special Requirements: In-memory SQLite database, FastAPI test client
+        """
+        for name in ('LOCAL_DB_PATH', 'LOCAL_DB_SEED', 'WEB_CONCURRENCY'):
+            monkeypatch.delenv(name, raising=False)
+        for name in ('OVERDUE_SWEEP_SECONDS', 'RESERVATION_SWEEP_SECONDS', 'STATS_REBUILD_SECONDS'):
+            monkeypatch.setenv(name, '0')
+        monkeypatch.setenv('DATABASE_BACKEND', 'local')
+        today = date.today()
+        
+        with TestClient(api_server.app) as client:
+            container = api_server.app.state.container
+            db_client = container.db.get_client()
+            db_client.table('user').insert({'user_id': 1, 'name': 'Librarian', 'email': 'librarian@example.com',
+                                            'password_hash': hashlib.sha256(b'pw').hexdigest(),
+                                            'role': 'librarian'}).execute()
+            db_client.table('librarian').insert({'employee_id': 1, 'user_id': 1}).execute()
+            db_client.table('member').insert({'member_id': 1, 'name': 'John Doe', 'email': 'john@example.com'}).execute()
+            db_client.table('book').insert({'book_id': 1, 'isbn': '111', 'title': 'The Alchemist'}).execute()
+            db_client.table('book_copy').insert({'copy_id': 1, 'book_id': 1, 'barcode': 'BC001',
+                                                 'status': 'loaned'}).execute()
+            db_client.table('loan').insert({
+                'loan_id': 1, 'member_id': 1, 'copy_id': 1, 'librarian_id': 1,
+                'issue_date': (today - timedelta(days=24)).isoformat(),
+                'due_date': (today - timedelta(days=10)).isoformat(), 'status': 'active'
+            }).execute()
+            token = client.post('/api/auth/login', json={'email': 'librarian@example.com', 'password': 'pw'}).json()['token']
+            headers = {'Authorization': f'Bearer {token}'}
+            
+            # Execute: List, return, list again
+            before = client.get('/api/fines', headers=headers).json()['fines']
+            assert client.post('/api/loans/return', json={'loan_id': 1}, headers=headers).status_code == 200
+            response = client.get('/api/fines', headers=headers)
+            
+            # Verify: Closed in place, same amount, no recomputation
+            assert [(row['loan_id'], row['open']) for row in before] == [(1, True)]
+            assert response.json()['fines'] == [{**before[0], 'open': False}]
+            assert response.headers['X-DB-Queries'] == '0'
+            assert container.fine_service.metrics()['runs'] == 1
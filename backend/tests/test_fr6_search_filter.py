@@ -4,10 +4,35 @@ FR6: Search and Filter Books
 Test Cases:
 - TC6.1: Search by Title
 - TC6.2: Filter by Category
+- TC6.3: Enrich Books in Bulk
+- TC6.4: Search from Catalog Index
+- TC6.5: Page Through Books with a Cursor
+- TC6.6: Search and Page on the Local Backend
+- TC6.7: Record Database Round-Trips of a Search
+- TC6.8: Search Through the Async Service
+- TC6.9: List Raw Rows Without the Model Round Trip
+- TC6.10: Resolve Author and Category Names from Memory
+- TC6.11: Enrich Books Past the Database's Row Cap
 """
 
+import asyncio
+import json
+import threading
 import pytest
 from unittest.mock import MagicMock
+from anyio import CapacityLimiter
+from library_system.database.connection import DatabaseConnection
+from library_system.database.instrumentation import track_queries
+from library_system.database.local_backend import LocalClient
+from library_system.services.book_service import BookService
+from library_system.services.async_services import AsyncBookService
+from library_system.services.catalog_index import CatalogIndex
+from library_system.services.import_service import ImportService
+from library_system.services.loan_service import LoanService
+from library_system.services.member_service import MemberService
+from library_system.services.reservation_service import ReservationService
+from library_system.utils.json_response import dumps
+from library_system.utils.pagination import decode_cursor
 
 
 class TestFR6SearchFilter:
@@ -145,3 +170,391 @@ class TestFR6SearchFilter:
         # The results should contain books in the Fiction category
         # Note: The actual filtering logic is tested, but exact results depend on mock data
 
+        
+    def test_tc6_3_enrich_books_in_bulk(self, book_service, mock_db_client):
+        """
+        TC6.3: Enrich Books in Bulk
+        
+        Test Item: BookService.get_books_enriched()
+        Input Specification:
+            Book IDs: [102, 101] where both titles contain 'Alchemist'
+        Expected Output:
+            Each book carries its own authors and categories, in request order,
+            using a fixed number of queries; author and category names are
+            loaded once and then served from memory
+        Environmental / Special Requirements: None
+        """
+        results = {
+            'book': [
+                {'book_id': 101, 'isbn': '1234567890', 'title': 'The Alchemist'},
+                {'book_id': 102, 'isbn': '0987654321', 'title': 'The Alchemist Companion'}
+            ],
+            'book_author': [{'book_id': 101, 'author_id': 1}, {'book_id': 102, 'author_id': 2}],
+            'author': [{'author_id': 1, 'full_name': 'Paulo Coelho'}, {'author_id': 2, 'full_name': 'Jane Reader'}],
+            'book_category': [{'book_id': 101, 'category_id': 1}],
+            'category': [{'category_id': 1, 'name': 'Fiction'}]
+        }
+        
+        def table_side_effect(table_name):
+            mock_table = MagicMock()
+            mock_result = MagicMock()
+            mock_result.data = results[table_name]
+            mock_table.select.return_value.in_.return_value.execute.return_value = mock_result
+            mock_table.select.return_value.in_.return_value.order.return_value.order.return_value \
+                .range.return_value.execute.return_value = mock_result
+            mock_table.select.return_value.gt.return_value.order.return_value.limit.return_value \
+                .execute.return_value = mock_result
+            return mock_table
+        
+        mock_db_client.table.side_effect = table_side_effect
+        
+        # Execute: Enrich two books sharing a title substring
+        enriched = book_service.get_books_enriched([102, 101])
+        
+        # Verify: Order follows the request and each book has its own links
+        assert [book['book_id'] for book in enriched] == [102, 101]
+        assert enriched[0]['authors'] == ['Jane Reader']
+        assert enriched[0]['categories'] == []
+        assert enriched[1]['authors'] == ['Paulo Coelho']
+        assert enriched[1]['categories'] == ['Fiction']
+        
+        # Verify: One query per table, independent of the number of books
+        assert mock_db_client.table.call_count == 5
+        
+        # Execute: Enrich again
+        mock_db_client.table.reset_mock()
+        assert book_service.get_books_enriched([102, 101]) == enriched
+        
+        # Verify: Names come from the dimension maps, only book and junction tables are queried
+        assert [call.args[0] for call in mock_db_client.table.call_args_list] == ['book', 'book_author', 'book_category']
+        
+    def test_tc6_4_search_from_catalog_index(self, mock_db_connection, mock_db_client):
+        """
+        TC6.4: Search from Catalog Index
+        
+        Test Item: CatalogIndex.search() / BookService.search_books()
+        Input Specification:
+            Indexed books; searches by title, author, category and a short ISBN fragment
+        Expected Output:
+            Case-insensitive substring matches answered from the index, kept
+            current on update and delete, with only matching rows hydrated
+        Environmental / Special Requirements: None
+        """
+        index = CatalogIndex()
+        index.build([
+            {'book_id': 101, 'isbn': '1234567890', 'title': 'The Alchemist',
+             'authors': ['Paulo Coelho'], 'categories': ['Fiction']},
+            {'book_id': 102, 'isbn': '0987654321', 'title': 'Brida',
+             'authors': ['Paulo Coelho'], 'categories': ['Fiction', 'Fantasy']},
+            {'book_id': 103, 'isbn': '5550001112', 'title': 'A Brief History of Time',
+             'authors': ['Stephen Hawking'], 'categories': ['Science']}
+        ])
+        
+        # Verify: Substring matches per field, combined with AND
+        assert index.search(title='alchem') == [101]
+        assert index.search(author='COELHO') == [101, 102]
+        assert index.search(author='coelho', category='fantasy') == [102]
+        assert index.search(isbn='55') == [103]
+        assert index.search(title='bri') == [102, 103]
+        assert index.search(title='nothing') == []
+        
+        # Execute: Incremental maintenance
+        index.update(103, title='The Universe in a Nutshell')
+        index.remove(101)
+        
+        # Verify: Changes are visible without a rebuild
+        assert index.search(title='brief') == []
+        assert index.search(title='nutshell') == [103]
+        assert index.search(author='hawking') == [103]
+        assert index.search(author='coelho') == [102]
+        
+        # Execute: BookService answers from the index and hydrates only matches
+        book_service = BookService(mock_db_connection, catalog_index=index)
+        book_service.get_books_enriched = MagicMock(return_value=[{'book_id': 102, 'title': 'Brida'}])
+        
+        results = book_service.search_books(category='fantasy')
+        
+        # Verify: No search query went to the database
+        book_service.get_books_enriched.assert_called_once_with([102])
+        assert results == [{'book_id': 102, 'title': 'Brida'}]
+        assert not mock_db_client.table.called
+        
+    def test_tc6_5_page_through_books_with_cursor(self, book_service, mock_db_client):
+        """
+        TC6.5: Page Through Books with a Cursor
+        
+        Test Item: BookService.get_books_page()
+        Input Specification:
+            limit=2 sorted by title; then the next page using the returned cursor
+        Expected Output:
+            First page has 2 books and a cursor; the next page query starts after
+            (title, book_id) of the last row; an unknown sort column is rejected
+        Environmental / Special Requirements: None
+        """
+        query = MagicMock()
+        query.or_.return_value = query
+        query.order.return_value = query
+        query.limit.return_value.execute.return_value.data = [
+            {'book_id': 7, 'title': 'Alpha'},
+            {'book_id': 3, 'title': 'Beta, "Second"'},
+            {'book_id': 9, 'title': 'Gamma'}
+        ]
+        mock_db_client.table.return_value.select.return_value = query
+        
+        # Execute: First page
+        page = book_service.get_books_page(limit=2, sort='title')
+        
+        # Verify: One extra row is fetched to detect the next page
+        query.limit.assert_called_once_with(3)
+        assert [book.book_id for book in page.items] == [7, 3]
+        assert decode_cursor(page.next_cursor) == {'title': 'Beta, "Second"', 'book_id': 3}
+        
+        # Execute: Next page
+        query.limit.return_value.execute.return_value.data = [{'book_id': 9, 'title': 'Gamma'}]
+        next_page = book_service.get_books_page(limit=2, after=page.next_cursor, sort='title')
+        
+        # Verify: Keyset condition on (title, book_id) with quoted value
+        query.or_.assert_called_once_with(
+            'title.gt."Beta, \\"Second\\"",and(title.eq."Beta, \\"Second\\"",book_id.gt.3)'
+        )
+        assert [book.book_id for book in next_page.items] == [9]
+        assert next_page.next_cursor is None
+        
+        # Verify: Unsupported sort columns are rejected
+        with pytest.raises(ValueError):
+            book_service.get_books_page(sort='description')
+    
+    def test_tc6_6_search_and_page_on_local_backend(self):
+        """
+        TC6.6: Search and Page on the Local Backend
+        
+        Test Item: BookService on LocalClient (DATABASE_BACKEND=local)
+        Input Specification:
+            Three books with authors in an in-memory database; search by author,
+            then page through all books sorted by title with limit=2
+        Expected Output:
+            Search returns the enriched matching book; pages follow title order
+            across titles containing commas and quotes
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        service = BookService(db)
+        client = db.get_client()
+        books = client.table('book').insert([
+            {'isbn': '111', 'title': 'Gamma'},
+            {'isbn': '222', 'title': 'Beta, "Second"'},
+            {'isbn': '333', 'title': 'Alpha'}
+        ]).execute().data
+        author = client.table('author').insert({'full_name': 'Paulo Coelho'}).execute().data[0]
+        client.table('book_author').insert({'book_id': books[0]['book_id'], 'author_id': author['author_id']}).execute()
+        
+        # Execute: Search by author
+        results = service.search_books(author='coelho')
+        
+        # Verify: Matching book is enriched with its author
+        assert [book['title'] for book in results] == ['Gamma']
+        assert results[0]['authors'] == ['Paulo Coelho']
+        
+        # Execute: Page through all books by title
+        first = service.get_books_page(limit=2, sort='title')
+        second = service.get_books_page(limit=2, after=first.next_cursor, sort='title')
+        
+        # Verify: Keyset condition is evaluated by the local backend
+        assert [book.title for book in first.items] == ['Alpha', 'Beta, "Second"']
+        assert [book.title for book in second.items] == ['Gamma']
+        assert second.next_cursor is None
+        db.close()
+    
+    def test_tc6_7_record_round_trips_of_search(self):
+        """
+        TC6.7: Record Database Round-Trips of a Search
+        
+        Test Item: InstrumentedClient, track_queries()
+        Input Specification:
+            Title search over an instrumented in-memory database
+        Expected Output:
+            One round-trip per table is recorded and reported in the
+            Server-Timing header value; queries outside track_queries() are not
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:'), instrument=True)
+        service = BookService(db)
+        db.get_client().table('book').insert({'isbn': '111', 'title': 'The Alchemist'}).execute()
+        
+        # Execute: Search inside a tracked request
+        with track_queries() as stats:
+            results = service.search_books(title='alchemist')
+        service.search_books(title='alchemist')
+        
+        # Verify: Book row plus the two link lookups (no names to resolve), counted once
+        assert len(results) == 1
+        assert stats.count == 3
+        assert set(stats.tables) == {'book', 'book_author', 'book_category'}
+        assert stats.server_timing(12.0).startswith('db;dur=')
+        assert stats.server_timing(12.0).endswith('app;dur=12.0')
+        assert 'db-book;' in stats.server_timing()
+        db.close()
+    
+    def test_tc6_8_search_through_async_service(self):
+        """
+        TC6.8: Search Through the Async Service
+        
+        Test Item: AsyncBookService.search_books()
+        Input Specification:
+            Title search awaited on the event loop with a limiter of 2 threads
+        Expected Output:
+            Same results as the synchronous service; author and category
+            lookups run at the same time on worker threads
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:'))
+        service = BookService(db)
+        client = db.get_client()
+        book = client.table('book').insert({'isbn': '111', 'title': 'The Alchemist'}).execute().data[0]
+        author = client.table('author').insert({'full_name': 'Paulo Coelho'}).execute().data[0]
+        client.table('book_author').insert({'book_id': book['book_id'], 'author_id': author['author_id']}).execute()
+        
+        # Both lookups must be in flight together to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        author_names, category_names = service.author_names, service.category_names
+        service.author_names = lambda ids: (barrier.wait(), author_names(ids))[1]
+        service.category_names = lambda ids: (barrier.wait(), category_names(ids))[1]
+        async_service = AsyncBookService(service, CapacityLimiter(2))
+        
+        # Execute
+        results = asyncio.run(async_service.search_books(title='alchemist'))
+        
+        # Verify
+        assert results == [{**book, 'authors': ['Paulo Coelho'], 'categories': []}]
+        db.close()
+    
+    def test_tc6_9_list_raw_rows_without_model_round_trip(self):
+        """
+        TC6.9: List Raw Rows Without the Model Round Trip
+        
+        Test Item: get_*_page(raw=True) of the book, member, loan and
+            reservation services; json_response.dumps()
+        Input Specification:
+            One book, member, loan and reservation in an in-memory database,
+            listed with raw=True and with model objects
+        Expected Output:
+            Raw rows carry exactly the keys and values of Model.to_dict(),
+            and encode to the same JSON document
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:', seed=True))
+        client = db.get_client()
+        member = client.table('member').select('member_id').limit(1).execute().data[0]
+        book = client.table('book').select('book_id').limit(1).execute().data[0]
+        client.table('reservation').insert({
+            'member_id': member['member_id'], 'book_id': book['book_id'],
+            'created_at': '2026-01-05', 'expires_at': '2026-01-12', 'active': True
+        }).execute()
+        services = [
+            BookService(db).get_books_page,
+            MemberService(db).get_members_page,
+            LoanService(db).get_loans_page,
+            ReservationService(db).get_reservations_page,
+        ]
+        
+        for get_page in services:
+            # Execute
+            raw = get_page(raw=True)
+            models = get_page()
+            
+            # Verify: Same rows, same cursor, same encoded document
+            expected = [item.to_dict() for item in models.items]
+            assert expected
+            assert raw.items == expected
+            assert raw.next_cursor == models.next_cursor
+            assert json.loads(dumps({'items': raw.items})) == {'items': expected}
+        db.close()
+    
+    def test_tc6_10_resolve_names_from_memory(self):
+        """
+        TC6.10: Resolve Author and Category Names from Memory
+        
+        Test Item: DimensionMap via BookService.search_books() and ImportService
+        Input Specification:
+            Author and category searches repeated over an instrumented database;
+            an author linked by another process; a catalog import adding a
+            new author and category
+        Expected Output:
+            The author and category tables are read once, later searches and
+            enrichment do not touch them; unknown IDs are read through; the
+            import's new names are found after its version bump
+        Environmental / Special Requirements: Instrumented in-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:'), instrument=True)
+        service = BookService(db)
+        client = db.get_client()
+        book = client.table('book').insert({'isbn': '111', 'title': 'The Alchemist'}).execute().data[0]
+        author = client.table('author').insert({'full_name': 'Paulo Coelho'}).execute().data[0]
+        category = client.table('category').insert({'name': 'Fiction'}).execute().data[0]
+        client.table('book_author').insert({'book_id': book['book_id'], 'author_id': author['author_id']}).execute()
+        client.table('book_category').insert({'book_id': book['book_id'], 'category_id': category['category_id']}).execute()
+        
+        # Execute: Same searches twice
+        with track_queries() as first:
+            assert [b['title'] for b in service.search_books(author='COELHO', category='fict')] == ['The Alchemist']
+        with track_queries() as second:
+            results = service.search_books(author='coelho', category='fiction')
+        
+        # Verify: Dimension tables loaded once, then served from memory
+        assert first.tables['author'].count == 1 and first.tables['category'].count == 1
+        assert 'author' not in second.tables and 'category' not in second.tables
+        assert results[0]['authors'] == ['Paulo Coelho'] and results[0]['categories'] == ['Fiction']
+        
+        # Execute: Another process adds and links a second author
+        other = client.table('author').insert({'full_name': 'Alan R. Clarke'}).execute().data[0]
+        client.table('book_author').insert({'book_id': book['book_id'], 'author_id': other['author_id']}).execute()
+        
+        # Verify: The unknown ID is read through during enrichment
+        assert sorted(service.get_books_enriched([book['book_id']])[0]['authors']) == ['Alan R. Clarke', 'Paulo Coelho']
+        assert service.authors.metrics()['read_throughs'] == 1
+        
+        # Execute: Import a book with a new author and category
+        ImportService(db, book_service=service).import_catalog([
+            {'isbn': '222', 'title': 'Brida', 'authors': ['Jorge Amado'], 'categories': ['Romance']}
+        ])
+        
+        # Verify: The maps were bumped and reload with the new names
+        assert service.authors.version == 1 and service.categories.version == 1
+        assert [b['title'] for b in service.search_books(author='amado', category='romance')] == ['Brida']
+        assert service.authors.metrics()['loads'] == 2
+        db.close()
+    
+    def test_tc6_11_enrich_books_past_row_cap(self):
+        """
+        TC6.11: Enrich Books Past the Database's Row Cap
+        
+        Test Item: BookService.get_books_enriched()
+        Input Specification:
+            Database returning at most 1000 rows per select (PostgREST's
+            default max-rows); 400 books with 3 authors and 3 categories each
+        Expected Output:
+            Every book carries all 3 authors and categories; each junction
+            table is read in two pages
+        Environmental / Special Requirements: Instrumented in-memory SQLite database
+        """
+        db = DatabaseConnection(local_client=LocalClient(':memory:', max_rows=1000), instrument=True)
+        client = db.get_client()
+        book_ids = list(range(1, 401))
+        client.table('book').insert([{'book_id': book_id, 'isbn': str(book_id), 'title': f'Book {book_id}'}
+                                     for book_id in book_ids], returning='minimal').execute()
+        client.table('author').insert([{'author_id': n, 'full_name': f'Author {n}'} for n in (1, 2, 3)]).execute()
+        client.table('category').insert([{'category_id': n, 'name': f'Category {n}'} for n in (1, 2, 3)]).execute()
+        client.table('book_author').insert([{'book_id': book_id, 'author_id': n}
+                                            for book_id in book_ids for n in (1, 2, 3)], returning='minimal').execute()
+        client.table('book_category').insert([{'book_id': book_id, 'category_id': n}
+                                              for book_id in book_ids for n in (1, 2, 3)], returning='minimal').execute()
+        service = BookService(db)
+        
+        # Execute
+        with track_queries() as stats:
+            enriched = service.get_books_enriched(book_ids)
+        
+        # Verify: No links cut off by the row cap
+        assert all(len(book['authors']) == 3 and len(book['categories']) == 3 for book in enriched)
+        assert stats.tables['book_author'].count == 2 and stats.tables['book_category'].count == 2
+        db.close()
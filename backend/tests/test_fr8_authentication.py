@@ -4,11 +4,16 @@ FR8: Authentication and Role-Based Access
 Test Cases:
 - TC8.1: Librarian Login Success
 - TC8.2: Member Access Restricted
+- TC8.3: Session Token Authorizes Without Database
+- TC8.4: Logout and Role Change Invalidate Sessions
+- TC8.5: Logouts Are Shared Between Workers and Outlive the Session Cache
 """
 
 import pytest
 from unittest.mock import MagicMock
 from library_system.models.user import User
+from library_system.services.auth_service import AuthService
+from library_system.services.session_service import SessionService
 from library_system.utils.enums import RoleName
 
 
@@ -99,3 +104,105 @@ class TestFR8Authentication:
         can_librarian_manage = auth_service.can_manage_books(librarian_user)
         assert can_librarian_manage is True
 
+        
+    def test_tc8_3_session_token_authorizes_without_database(self, auth_service, mock_db_client, sample_librarian_user):
+        """
+        TC8.3: Session Token Authorizes Without Database
+        
+        Test Item: SessionService.login() / SessionService.resolve()
+        Input Specification:
+            Librarian logs in once, then presents the issued token
+        Expected Output:
+            Token resolves to the librarian and employee ID with no further queries
+        Environmental / Special Requirements: None
+        """
+        auth_service.authenticate = MagicMock(return_value=sample_librarian_user)
+        auth_service.get_librarian_id = MagicMock(return_value=7)
+        session_service = SessionService(auth_service, secret='test-secret')
+        
+        # Execute: Login issues a token
+        token, principal = session_service.login('librarian@library.com', '12345')
+        assert principal.librarian_id == 7
+        
+        mock_db_client.reset_mock()
+        
+        # Execute: Resolve the token
+        resolved = session_service.resolve(token)
+        
+        # Verify: Principal served from the cache
+        assert resolved.user.user_id == sample_librarian_user.user_id
+        assert resolved.librarian_id == 7
+        assert not mock_db_client.table.called
+        
+        # Verify: Tampered tokens are rejected
+        assert session_service.resolve(token[:-2] + 'xx') is None
+        
+    def test_tc8_4_logout_and_role_change_invalidate_sessions(self, auth_service, sample_librarian_user, sample_member_user):
+        """
+        TC8.4: Logout and Role Change Invalidate Sessions
+        
+        Test Item: SessionService.logout() / SessionService.evict_user()
+        Input Specification:
+            Two sessions for the same user; the user is demoted, then one session logs out
+        Expected Output:
+            Evicted session reloads the new role; logged-out token no longer resolves
+        Environmental / Special Requirements: None
+        """
+        auth_service.authenticate = MagicMock(return_value=sample_librarian_user)
+        auth_service.get_librarian_id = MagicMock(return_value=7)
+        auth_service.is_session_revoked = MagicMock(return_value=False)
+        auth_service.revoke_session = MagicMock()
+        session_service = SessionService(auth_service, secret='test-secret')
+        
+        first_token, _ = session_service.login('librarian@library.com', '12345')
+        second_token, _ = session_service.login('librarian@library.com', '12345')
+        
+        # Execute: Role change evicts both cached sessions
+        demoted = User(user_id=sample_librarian_user.user_id, name='Librarian',
+                       email='librarian@library.com', role=RoleName.MEMBER)
+        auth_service.get_user = MagicMock(return_value=demoted)
+        assert session_service.evict_user(sample_librarian_user.user_id) == 2
+        
+        # Verify: Next use reloads the user with the new role
+        resolved = session_service.resolve(first_token)
+        assert resolved.user.role == RoleName.MEMBER
+        assert resolved.librarian_id is None
+        
+        # Execute: Logout
+        assert session_service.logout(second_token) is True
+        
+        # Verify: Logged-out token is rejected even though its signature is valid
+        assert session_service.resolve(second_token) is None
+        
+    def test_tc8_5_logout_shared_between_workers(self, local_library):
+        """
+        TC8.5: Logouts Are Shared Between Workers and Outlive the Session Cache
+        
+        Test Item: SessionService.logout() / SessionService.resolve()
+        Input Specification:
+            Two session services (workers) sharing a secret, each caching at
+            most two sessions; the librarian logs in three times on the first
+            worker, every token is used on the second, then all three log out
+            on the first
+        Expected Output:
+            Both workers reject every logged-out token, including the oldest
+            one after later logouts filled the cache; a second logout of a
+            token fails
+        Environmental / Special Requirements: In-memory SQLite database
+        """
+        auth_service = AuthService(local_library)
+        local_library.get_client().table('user').update({'password_hash': auth_service.hash_password('pw')}) \
+            .eq('user_id', 1).execute()
+        first = SessionService(auth_service, secret='shared', cache_size=2)
+        second = SessionService(AuthService(local_library), secret='shared', cache_size=2, revalidate_seconds=0)
+        tokens = [first.login('librarian@example.com', 'pw')[0] for _ in range(3)]
+        assert all(second.resolve(token).librarian_id == 1 for token in tokens)
+        
+        # Execute: Log out every session on the first worker
+        assert all(first.logout(token) for token in tokens)
+        
+        # Verify: Rejected on both workers, and only logged out once
+        assert [first.resolve(token) for token in tokens] == [None, None, None]
+        assert [second.resolve(token) for token in tokens] == [None, None, None]
+        assert second.logout(tokens[0]) is False
+
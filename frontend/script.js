@@ -3,8 +3,7 @@ let API_BASE_URL = 'http://localhost:8000';
 
 // Current user session
 let currentUser = null;
-let authEmail = null;
-let authPassword = null;
+let authToken = null;
 
 // Update API URL when user changes it
 document.getElementById('apiUrl').addEventListener('change', (e) => {
@@ -29,8 +28,7 @@ async function login() {
         });
         
         currentUser = data.user;
-        authEmail = email;
-        authPassword = password;
+        authToken = data.token;
         
         // Update UI
         document.getElementById('logged-in-user').textContent = `${currentUser.name} (${currentUser.email})`;
@@ -54,9 +52,15 @@ async function login() {
 }
 
 function logout() {
+    if (authToken) {
+        // End the server-side session; the UI logs out regardless of the result
+        fetch(`${API_BASE_URL}/api/auth/logout`, {
+            method: 'POST',
+            headers: { 'Authorization': `Bearer ${authToken}` }
+        }).catch(() => {});
+    }
     currentUser = null;
-    authEmail = null;
-    authPassword = null;
+    authToken = null;
     document.querySelector('.login-card').style.display = 'block';
     document.getElementById('user-info').style.display = 'none';
     document.getElementById('login-email').value = '';
@@ -70,10 +74,10 @@ function logout() {
 }
 
 function requireAuth() {
-    if (!authEmail || !authPassword) {
+    if (!authToken) {
         throw new Error('Please login first');
     }
-    return { email: authEmail, password: authPassword };
+    return { 'Authorization': `Bearer ${authToken}` };
 }
 
 // Tab management
@@ -96,6 +100,10 @@ function showTab(tabName) {
 }
 
 // API Helper Functions
+
+// Last response of each GET URL that came with an ETag, reused when the server answers 304
+const etagCache = {};
+
 async function apiCall(endpoint, options = {}) {
     const url = `${API_BASE_URL}${endpoint}`;
     const defaultOptions = {
@@ -105,6 +113,11 @@ async function apiCall(endpoint, options = {}) {
     };
     
     const config = { ...defaultOptions, ...options };
+    const isGet = !config.method || config.method === 'GET';
+    const cached = isGet ? etagCache[url] : undefined;
+    if (cached) {
+        config.headers = { ...config.headers, 'If-None-Match': cached.etag };
+    }
     
     try {
         showLoading();
@@ -112,12 +125,21 @@ async function apiCall(endpoint, options = {}) {
         hideSuccess();
         
         const response = await fetch(url, config);
+        if (response.status === 304 && cached) {
+            hideLoading();
+            return cached.data;
+        }
         const data = await response.json();
         
         if (!response.ok) {
             throw new Error(data.detail || `HTTP error! status: ${response.status}`);
         }
         
+        const etag = response.headers.get('ETag');
+        if (etag && isGet) {
+            etagCache[url] = { etag, data };
+        }
+        
         hideLoading();
         return data;
     } catch (error) {
@@ -126,6 +148,37 @@ async function apiCall(endpoint, options = {}) {
     }
 }
 
+// Paged list helpers: list endpoints return one page plus a next_cursor
+const PAGE_SIZE = 50;
+const pagedLists = {};
+
+async function loadPagedList(resultsId, endpoint, key, display, append = false) {
+    const previous = pagedLists[resultsId];
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (append && previous && previous.nextCursor) {
+        params.append('after', previous.nextCursor);
+    }
+    
+    const data = await apiCall(`${endpoint}?${params.toString()}`);
+    const items = (append && previous ? previous.items : []).concat(data[key] || []);
+    pagedLists[resultsId] = { endpoint, key, display, items, nextCursor: data.next_cursor };
+    
+    display(items);
+    if (data.next_cursor) {
+        document.getElementById(resultsId).insertAdjacentHTML('beforeend',
+            `<div class="action-buttons"><button onclick="loadMore('${resultsId}')" class="btn btn-secondary">Load more</button></div>`);
+    }
+}
+
+async function loadMore(resultsId) {
+    const list = pagedLists[resultsId];
+    try {
+        await loadPagedList(resultsId, list.endpoint, list.key, list.display, true);
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
 function showLoading() {
     document.getElementById('loading').style.display = 'block';
 }
@@ -160,8 +213,7 @@ function hideSuccess() {
 // Books Functions
 async function getAllBooks() {
     try {
-        const data = await apiCall('/api/books');
-        displayBooks(data.books || []);
+        await loadPagedList('books-results', '/api/books', 'books', displayBooks);
     } catch (error) {
         showError(error.message);
     }
@@ -264,11 +316,10 @@ async function createBook() {
             return;
         }
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/books?${params.toString()}`, {
+        const data = await apiCall(`/api/books`, {
             method: 'POST',
             body: JSON.stringify(bookData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Book created successfully!');
@@ -313,11 +364,10 @@ async function updateBook() {
             description: document.getElementById('update-book-description').value.trim() || null
         };
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/books/${bookId}?${params.toString()}`, {
+        const data = await apiCall(`/api/books/${bookId}`, {
             method: 'PUT',
             body: JSON.stringify(bookData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Book updated successfully!');
@@ -335,10 +385,9 @@ async function deleteBook(bookId) {
     
     try {
         const auth = requireAuth();
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        await apiCall(`/api/books/${bookId}?${params.toString()}`, {
+        await apiCall(`/api/books/${bookId}`, {
             method: 'DELETE',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Book deleted successfully!');
@@ -363,8 +412,7 @@ function hideSearchBooks() {
 // Members Functions
 async function getAllMembers() {
     try {
-        const data = await apiCall('/api/members');
-        displayMembers(data.members || []);
+        await loadPagedList('members-results', '/api/members', 'members', displayMembers);
     } catch (error) {
         showError(error.message);
     }
@@ -435,11 +483,10 @@ async function registerMember() {
             return;
         }
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/members?${params.toString()}`, {
+        const data = await apiCall(`/api/members`, {
             method: 'POST',
             body: JSON.stringify(memberData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Member registered successfully!');
@@ -479,11 +526,10 @@ async function updateMember() {
             phone: document.getElementById('update-member-phone').value.trim() || null
         };
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/members/${memberId}?${params.toString()}`, {
+        const data = await apiCall(`/api/members/${memberId}`, {
             method: 'PUT',
             body: JSON.stringify(memberData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Member updated successfully!');
@@ -501,10 +547,9 @@ async function suspendMember(memberId) {
     
     try {
         const auth = requireAuth();
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        await apiCall(`/api/members/${memberId}/suspend?${params.toString()}`, {
+        await apiCall(`/api/members/${memberId}/suspend`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Member suspended successfully!');
@@ -521,10 +566,9 @@ async function deleteMember(memberId) {
     
     try {
         const auth = requireAuth();
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        await apiCall(`/api/members/${memberId}?${params.toString()}`, {
+        await apiCall(`/api/members/${memberId}`, {
             method: 'DELETE',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Member deleted successfully!');
@@ -537,8 +581,7 @@ async function deleteMember(memberId) {
 // Loans Functions
 async function getAllLoans() {
     try {
-        const data = await apiCall('/api/loans');
-        displayLoans(data.loans || []);
+        await loadPagedList('loans-results', '/api/loans', 'loans', displayLoans);
     } catch (error) {
         showError(error.message);
     }
@@ -546,8 +589,7 @@ async function getAllLoans() {
 
 async function getActiveLoans() {
     try {
-        const data = await apiCall('/api/loans/active');
-        displayLoans(data.loans || []);
+        await loadPagedList('loans-results', '/api/loans/active', 'loans', displayLoans);
     } catch (error) {
         showError(error.message);
     }
@@ -555,8 +597,7 @@ async function getActiveLoans() {
 
 async function getOverdueLoans() {
     try {
-        const data = await apiCall('/api/loans/overdue');
-        displayLoans(data.loans || []);
+        await loadPagedList('loans-results', '/api/loans/overdue', 'loans', displayLoans);
     } catch (error) {
         showError(error.message);
     }
@@ -621,11 +662,10 @@ async function issueBook() {
             return;
         }
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/loans/issue?${params.toString()}`, {
+        const data = await apiCall(`/api/loans/issue`, {
             method: 'POST',
             body: JSON.stringify(loanData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Book issued successfully!');
@@ -658,11 +698,10 @@ async function returnBook() {
             return;
         }
         
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        await apiCall(`/api/loans/return?${params.toString()}`, {
+        await apiCall(`/api/loans/return`, {
             method: 'POST',
             body: JSON.stringify(loanData),
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess('Book returned successfully!');
@@ -676,10 +715,9 @@ async function returnBook() {
 async function updateOverdueLoans() {
     try {
         const auth = requireAuth();
-        const params = new URLSearchParams({ email: auth.email, password: auth.password });
-        const data = await apiCall(`/api/loans/update-overdue?${params.toString()}`, {
+        const data = await apiCall(`/api/loans/update-overdue`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' }
+            headers: { 'Content-Type': 'application/json', ...auth }
         });
         
         showSuccess(data.message || 'Overdue loans updated successfully!');
@@ -692,8 +730,7 @@ async function updateOverdueLoans() {
 // Reservations Functions
 async function getAllReservations() {
     try {
-        const data = await apiCall('/api/reservations');
-        displayReservations(data.reservations || []);
+        await loadPagedList('reservations-results', '/api/reservations', 'reservations', displayReservations);
     } catch (error) {
         showError(error.message);
     }